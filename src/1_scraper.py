@@ -6,7 +6,7 @@ Author: Lei Wu, Lister Zhu, Lao Biao
 Date: 2025-12-25
 """
 
-import time
+import argparse
 import os
 import pandas as pd
 from selenium import webdriver
@@ -14,12 +14,24 @@ from selenium.webdriver.edge.service import Service
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
+import http_fetcher
+import instrumentation
+import scraper_engine
+from crawler import CHECKPOINT_NAME, CrawlCheckpoint, RecordStore, crawl_window, unit_key
+from window_planner import HostRateLimiter, WindowPlan, plan_windows, probe_hits, schedule
+
 # --- Configuration ---
 TARGET_URL = "https://elib.cuc.edu.cn/go?id=12"  # Entry point for the database
 KEYWORDS = ["神经衰弱", "补脑", "减肥", "函授"]  # Keywords: Neurasthenia, Brain Tonic, Weight Loss, Correspondence Course
 DATE_START = "1927.01.01"
 DATE_END = "1937.07.01"
-OUTPUT_DIR = "../data/raw_ads"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "..", "data", "raw_ads")
+SESSION_FILE = os.path.join(SCRIPT_DIR, "..", "data", "cache", "scraper_session.json")  # Captured login (cookies + search page URL)
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, CHECKPOINT_NAME)  # Last completed page per keyword/date window
+PLAN_FILE = os.path.join(OUTPUT_DIR, "_window_plan.json")  # Date windows per keyword
+MAX_WINDOW_HITS = 500  # Windows with more hits are split, keeping queries clear of the pagination cap
+REQUESTS_PER_SECOND = 2.0  # Per host, shared by all workers (0 = unlimited)
 
 def init_driver():
     """Initialize Edge WebDriver."""
@@ -31,6 +43,8 @@ def init_driver():
 def run_scraper():
     """Main execution flow for the scraper."""
     driver = init_driver()
+    store = RecordStore(OUTPUT_DIR)
+    checkpoint = CrawlCheckpoint(CHECKPOINT_FILE)
     
     try:
         driver.get(TARGET_URL)
@@ -38,6 +52,9 @@ def run_scraper():
         input("[-] Press [Enter] after the 'Advertisement Search' page is loaded...")
 
         for keyword in KEYWORDS:
+            if checkpoint.get(unit_key(keyword, DATE_START, DATE_END)).get("done"):
+                print(f"[=] Already collected: {keyword}")
+                continue
             print(f"[*] Starting collection for keyword: {keyword}")
             
             # --- Step 1: Reset Page State ---
@@ -57,24 +74,140 @@ def run_scraper():
                 driver.find_element(By.NAME, "endtime").send_keys(DATE_END)
                 
                 # Submit
+                browser = scraper_engine.BrowserSession.attach(driver)
                 driver.find_element(By.NAME, "image1").click()
-                time.sleep(5) # Wait for server response
+                first_html = browser.wait_results()  # Wait for server response
             except Exception as e:
                 print(f"[!] Error during form submission: {e}")
                 continue
 
             # --- Step 3: Deep Scraping Loop ---
-            # Logic for iterating through pages and extracting full text is omitted for brevity.
-            # (Insert the deep scraping logic from previous versions here if needed)
+            # Every page is appended to OUTPUT_DIR as soon as it is fetched; the checkpoint
+            # lets an interrupted keyword resume from its last completed page.
+            crawl_window(browser, store, checkpoint, keyword, DATE_START, DATE_END, first_html=first_html)
+            if not checkpoint.get(unit_key(keyword, DATE_START, DATE_END)).get("done"):
+                print(f"[!] Incomplete: {keyword} ({store.count(keyword)} records so far, rerun to resume)")
+                continue
+            store.export_xlsx(keyword)
             
-            print(f"[+] Completed: {keyword}")
+            print(f"[+] Completed: {keyword} ({store.count(keyword)} records)")
 
     except Exception as e:
         print(f"[!] Critical Error: {e}")
     finally:
         driver.quit()
 
+def capture_login(target_url=TARGET_URL, interactive=True):
+    """
+    Logs in once in a visible browser and saves the session for the engine.
+    interactive=False skips the manual confirmation (e.g. for the local mock).
+    """
+    driver = init_driver() if interactive else scraper_engine.make_driver("chrome", headless=True)
+    try:
+        driver.get(target_url)
+        if interactive:
+            print("[-] Please verify VPN login manually and open the 'Advertisement Search' page.")
+            input("[-] Press [Enter] once the search form is shown (only needed once)...")
+        session = scraper_engine.capture_session(driver)
+    finally:
+        driver.quit()
+    scraper_engine.save_session(session, SESSION_FILE)
+    print(f"[+] Session captured: {session['url']} ({len(session['cookies'])} cookies)")
+    return session
+
+def plan_keyword(browser, keyword, plan, max_hits):
+    """Engine task: splits one keyword's date range into windows below max_hits."""
+    windows = plan.get(keyword, DATE_START, DATE_END, max_hits)
+    if windows is None:
+        windows = plan_windows(lambda *q: probe_hits(browser, *q), keyword, DATE_START, DATE_END, max_hits)
+        plan.put(keyword, DATE_START, DATE_END, max_hits, windows)
+    print(f"[+] {keyword}: {sum(w['hits'] for w in windows)} hits in {len(windows)} windows")
+    return windows
+
+def crawl_unit(browser, window, store, checkpoint):
+    """Engine task: crawls every results page of one keyword/date window, resuming from the checkpoint."""
+    return crawl_window(browser, store, checkpoint, window["keyword"], window["begin"], window["end"])
+
+def run_engine(keywords=KEYWORDS, workers=4, browser="chrome", headless=True,
+               target_url=TARGET_URL, reuse_session=True, interactive=True,
+               max_hits=MAX_WINDOW_HITS, rate=REQUESTS_PER_SECOND, http=False):
+    """
+    Parallel scraper: one captured login, several headless sessions, explicit waits.
+    Keyword ranges are split into date windows, which are crawled as independent work units.
+    http=True replays the login over pooled HTTP connections instead of browsers.
+    """
+    session = scraper_engine.load_session(SESSION_FILE) if reuse_session else None
+    if session is None:
+        session = capture_login(target_url, interactive)
+    else:
+        print(f"[*] Reusing captured session from {SESSION_FILE}")
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    session_factory = None
+    if http:
+        pool = http_fetcher.make_pool(size=workers)
+        session_factory = lambda: http_fetcher.HttpSession(session, pool)
+    engine = scraper_engine.ScraperEngine(
+        session, workers=workers, browser=browser, headless=headless,
+        driver_path=os.path.join(current_dir, "msedgedriver.exe") if browser == "edge" else None,
+        session_factory=session_factory,
+    )
+    store = RecordStore(OUTPUT_DIR)
+    checkpoint = CrawlCheckpoint(CHECKPOINT_FILE)
+    plan = WindowPlan(PLAN_FILE)
+    limiter = HostRateLimiter(rate)
+
+    with engine:
+        print(f"[*] Planning date windows for {len(keywords)} keywords (max {max_hits} hits each)...")
+        with instrumentation.span("plan"):
+            plans = engine.run(keywords, lambda b, kw: plan_keyword(limiter.wrap(b), kw, plan, max_hits))
+        units = schedule(p for p in plans if p)
+        instrumentation.count("windows_planned", len(units))
+        print(f"[*] Crawling {len(units)} windows with {engine.workers} {'HTTP' if http else 'browser'} sessions...")
+        with instrumentation.span("crawl"):
+            engine.run(units, lambda b, w: crawl_unit(limiter.wrap(b), w, store, checkpoint))
+
+    for keyword, windows in zip(keywords, plans):
+        if windows is None:
+            continue
+        complete = all(checkpoint.get(unit_key(keyword, w["begin"], w["end"])).get("done") for w in windows)
+        if not complete:
+            # The workbook read by 2_data_coding.py is only replaced by a finished crawl
+            print(f"[!] {keyword}: {store.count(keyword)} records so far (incomplete, rerun to resume; workbook not updated)")
+            continue
+        with instrumentation.span("export"):
+            store.export_xlsx(keyword)
+        print(f"[+] {keyword}: {store.count(keyword)} records collected")
+    return plans
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shen Bao advertisement scraper.")
+    parser.add_argument("--engine", action="store_true",
+                        help="Use the parallel headless engine instead of the interactive single-window flow.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent browser sessions (default: 4).")
+    parser.add_argument("--http", action="store_true",
+                        help="Engine fast path: log in with Selenium once, then fetch pages over pooled HTTP.")
+    parser.add_argument("--browser", choices=["chrome", "firefox", "edge"], default="chrome")
+    parser.add_argument("--show-browser", action="store_true", help="Run the engine's browsers with a window.")
+    parser.add_argument("--target-url", default=TARGET_URL, help="Database entry point (e.g. a local mock).")
+    parser.add_argument("--relogin", action="store_true", help="Ignore the saved session and log in again.")
+    parser.add_argument("--auto-login", action="store_true",
+                        help="Capture the session without manual confirmation (local mock / SSO without prompts).")
+    parser.add_argument("--keywords", nargs="+", default=KEYWORDS)
+    parser.add_argument("--max-hits", type=int, default=MAX_WINDOW_HITS,
+                        help=f"Split date windows with more hits than this (default: {MAX_WINDOW_HITS}).")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND,
+                        help=f"Requests per second per host across all workers (default: {REQUESTS_PER_SECOND}, 0 = unlimited).")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
 if __name__ == "__main__":
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
-    run_scraper()
\ No newline at end of file
+    args = parse_args()
+    with instrumentation.run("1_scraper", profile=args.profile):
+        if args.engine:
+            run_engine(args.keywords, args.workers, args.browser, not args.show_browser,
+                       args.target_url, not args.relogin, not args.auto_login, args.max_hits, args.rate, args.http)
+        else:
+            run_scraper()
\ No newline at end of file
@@ -2,18 +2,42 @@
 Module: Data Coding
 Description: Merges raw Excel files and applies '3S Marketing Strategy' coding 
              (Scare, Science, Success) based on keyword dictionary matching.
+             Output is the Parquet corpus store (data/corpus); the CSV is an optional export.
 """
 
+import argparse
 import pandas as pd
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import corpus_store
+import instrumentation
+import ngram_index
+from coding_cache import CodingCache, file_digest, forget_corpus
+from segmentation import Segmenter
+from strategy_cube import StrategyCube
+from zh_convert import convert_series
+import strategy_matcher
+from strategy_matcher import UNCLASSIFIED, StrategyClassifier, matched_terms
+from excel_stream import BATCH_SIZE, TitleDeduplicator, iter_excel_batches
+import near_dedup
 
 # --- Configuration ---
+# Paths are resolved from this file, so the stage also runs from the pipeline or another directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
 INPUT_FILES = {
-    "Beauty": "../data/raw_ads/申报_美容_数据.xlsx",
-    "Health": "../data/raw_ads/申报_补脑_数据.xlsx",
-    "Education": "../data/raw_ads/申报_函授_数据.xlsx"
+    "Beauty": os.path.join(DATA_DIR, "raw_ads", "申报_美容_数据.xlsx"),
+    "Health": os.path.join(DATA_DIR, "raw_ads", "申报_补脑_数据.xlsx"),
+    "Education": os.path.join(DATA_DIR, "raw_ads", "申报_函授_数据.xlsx")
 }
-OUTPUT_FILE = "../data/encoded_ads.csv"
+OUTPUT_FILE = os.path.join(DATA_DIR, "encoded_ads.csv")  # Optional CSV export (--export-csv)
+STORE_DIR = os.path.join(DATA_DIR, "corpus")  # Columnar corpus store read by stages 3 and 4
+CACHE_DIR = os.path.join(DATA_DIR, "cache", "coded")  # Per-workbook coded frames + build manifest
+CUBE_FILE = os.path.join(DATA_DIR, "strategy_cube.csv")  # Category x Keyword x Year x Strategy counts for charts
+
+# Headlines per classification task when running with --workers
+SHARD_SIZE = 20000
 
 # Dictionary for 'Dictionary-based Approach'
 # Keys represent the marketing strategies, values are associated keywords (in Traditional/Simplified Chinese).
@@ -33,60 +57,336 @@ CODE_DICT = {
     ]
 }
 
+_CLASSIFIER = None
+
+def get_classifier():
+    """Returns the Aho-Corasick classifier compiled from CODE_DICT (built once per process)."""
+    global _CLASSIFIER
+    if _CLASSIFIER is None:
+        _CLASSIFIER = StrategyClassifier(CODE_DICT)
+    return _CLASSIFIER
+
 def determine_strategy(text):
     """
     Classifies text into one of the 3 strategies based on keyword frequency.
     Returns: '0_Unclassified' if no keywords match.
     """
-    if not isinstance(text, str):
-        return "0_Unclassified"
-    
-    scores = {key: 0 for key in CODE_DICT}
-    
-    for category, keywords in CODE_DICT.items():
-        for kw in keywords:
-            if kw in text:
-                scores[category] += 1
-    
-    # Select the category with the highest score
-    max_score = max(scores.values())
-    if max_score == 0:
-        return "0_Unclassified"
-    
-    # Priority Rule: Fear > Vision > Science (if scores are equal)
-    if scores["1_Fear_Appeal"] == max_score:
-        return "1_Fear_Appeal"
-    elif scores["3_Vision_Desire"] == max_score:
-        return "3_Vision_Desire"
-    else:
-        return "2_Scientific_Authority"
-
-def main():
-    print("[*] Starting data integration and coding...")
+    return get_classifier().classify_one(text)["strategy"]
+
+def make_pool(workers):
+    """Process pool whose workers each hold their own compiled classifier."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=strategy_matcher.init_worker,
+        initargs=(CODE_DICT,),
+    )
+
+def coding_texts(df, simplify=False):
+    """Headlines to classify; with simplify, Traditional forms are converted first."""
+    # Assuming '完整标题' is the column name for the full headline
+    titles = df['完整标题']
+    if simplify:
+        titles = convert_series(titles)
+    return titles.tolist()
+
+def code_frame(df, pool=None, simplify=False):
+    """
+    Adds 'Strategy' and 'Matched_Terms' columns to a frame of headlines.
+    With a pool, distinct headlines are split into shards and classified in
+    parallel; results are mapped back in the original row order.
+    """
+    titles = coding_texts(df, simplify)
+    if pool is None:
+        results = get_classifier().classify(titles)
+        df['Strategy'] = [res["strategy"] for res in results]
+        df['Matched_Terms'] = [matched_terms(res) for res in results]
+        return df
+
+    unique = list(dict.fromkeys(t if isinstance(t, str) else None for t in titles))
+    labels = {}
+    shards = list(strategy_matcher.iter_shards(unique, SHARD_SIZE))
+    for shard, coded in zip(shards, pool.map(strategy_matcher.classify_shard, shards)):
+        labels.update(zip(shard, coded))
+
+    coded = [labels[t if isinstance(t, str) else None] for t in titles]
+    df['Strategy'] = [c[0] for c in coded]
+    df['Matched_Terms'] = [c[1] for c in coded]
+    return df
+
+def load_inputs(items, pool=None):
+    """
+    Reads the given (category, path) workbooks, tagging rows with their category.
+    With a pool, workbooks are parsed in parallel; the returned list keeps
+    the input order so that keep='first' deduplication is unchanged.
+    """
+    paths = [path for _, path in items]
+    frames = pool.map(pd.read_excel, paths) if pool else map(pd.read_excel, paths)
+
     all_dfs = []
-    
-    for category, filepath in INPUT_FILES.items():
-        if os.path.exists(filepath):
-            df = pd.read_excel(filepath)
-            df['Category'] = category
-            all_dfs.append(df)
-            print(f"    Loaded {category}: {len(df)} records")
-            
-    if not all_dfs:
+    for (category, path), df in zip(items, frames):
+        df['Category'] = category
+        df['Source_File'] = os.path.basename(path)
+        all_dfs.append(df)
+        print(f"    Loaded {category}: {len(df)} records")
+    return all_dfs
+
+def save_outputs(master_df, export_csv=False):
+    """Writes the corpus store, the strategy cube and, if requested, the CSV export."""
+    with instrumentation.span("write"):
+        corpus_store.write_corpus(master_df, STORE_DIR)
+        print(f"[+] Successfully saved corpus store to: {STORE_DIR}")
+        StrategyCube.from_corpus(master_df).save(CUBE_FILE)
+        print(f"[+] Updated strategy cube: {CUBE_FILE}")
+        if export_csv:
+            master_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
+            print(f"[+] Exported CSV to: {OUTPUT_FILE}")
+    instrumentation.count("rows_written", len(master_df))
+
+def warm_token_cache(titles, workers=1):
+    """Segments coded headlines into the shared token cache used by the word cloud stage."""
+    with instrumentation.span("segment"), Segmenter(workers=workers) as segmenter:
+        segmenter.segment_titles(titles)
+        print(f"    Token cache: {segmenter.misses} headlines segmented, {segmenter.hits} already cached.")
+        instrumentation.count("token_cache_hits", segmenter.hits)
+        instrumentation.count("token_cache_misses", segmenter.misses)
+
+def commit_index(update):
+    """Applies an ngram_index update (new headlines as a new segment) and reports it."""
+    with instrumentation.span("ngram_index"):
+        added, removed = update.commit()
+    print(f"[+] Updated headline index: {added} added, {removed} removed ({ngram_index.INDEX_DIR})")
+    instrumentation.count("index_rows_added", added)
+    instrumentation.count("index_rows_removed", removed)
+
+def main(workers=1, export_csv=False, full=False, segment=False, simplify=False, near_dup=None):
+    """
+    Incremental build: workbooks whose content hash matches the manifest reuse
+    their cached coded frames; only new or changed workbooks are parsed and coded.
+    A CODE_DICT change (or --full) recodes everything.
+    near_dup: MinHash similarity threshold for collapsing reprinted ads (None = exact dedup only).
+    Returns the coded corpus, or None when nothing had to be rebuilt.
+    """
+    print("[*] Starting data integration and coding...")
+    items = [(cat, path) for cat, path in INPUT_FILES.items() if os.path.exists(path)]
+    if not items:
         print("[!] No data found.")
         return
 
+    cache = CodingCache(CACHE_DIR, CODE_DICT, {"simplify": simplify})
+    if full:
+        cache.clear()
+    digests = {cat: file_digest(path) for cat, path in items}
+    corpus_inputs = dict(digests)
+    if near_dup is not None:
+        corpus_inputs["near_dedup"] = near_dup
+    corpus_key = CodingCache.corpus_key(corpus_inputs)
+
+    with instrumentation.span("load_cache"):
+        coded = {cat: cache.load(cat, digests[cat]) for cat, _ in items}
+    stale = [(cat, path) for cat, path in items if coded[cat] is None]
+    instrumentation.count("workbooks_reused", len(items) - len(stale))
+    instrumentation.count("workbooks_recoded", len(stale))
+
+    outputs_exist = corpus_store.store_exists(STORE_DIR) and os.path.exists(CUBE_FILE)
+    if not stale and cache.manifest.get("corpus") == corpus_key and outputs_exist:
+        if not export_csv or os.path.exists(OUTPUT_FILE):
+            print("[+] All inputs unchanged, corpus store is up to date.")
+            return
+
+    for cat, _ in items:
+        if coded[cat] is not None:
+            print(f"    Reused cached coding for {cat}: {len(coded[cat])} records")
+
+    pool = make_pool(workers) if workers > 1 and stale else None
+    try:
+        with instrumentation.span("load"):
+            frames = load_inputs(stale, pool)
+        for (category, path), df in zip(stale, frames):
+            # Apply Coding (per workbook, so the result can be cached on its own)
+            with instrumentation.span("code"):
+                code_frame(df, pool, simplify)
+            cache.store(category, path, digests[category], df)
+            coded[category] = df
+    finally:
+        if pool:
+            pool.shutdown()
+
     # Merge and Deduplicate
-    master_df = pd.concat(all_dfs, ignore_index=True)
-    master_df.drop_duplicates(subset=['完整标题'], keep='first', inplace=True)
-    
-    # Apply Coding
-    # Assuming '完整标题' is the column name for the full headline
-    master_df['Strategy'] = master_df['完整标题'].apply(determine_strategy)
-    
-    # Save to CSV
-    master_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
-    print(f"[+] Successfully saved encoded data to: {OUTPUT_FILE}")
+    with instrumentation.span("dedup"):
+        master_df = pd.concat([coded[cat] for cat, _ in items], ignore_index=True)
+        loaded = len(master_df)
+        if near_dup is not None:
+            # Exact reprints still count towards Cluster_Size after drop_duplicates
+            copies = master_df.groupby('完整标题', sort=False, dropna=False)['完整标题'].transform('size')
+        master_df.drop_duplicates(subset=['完整标题'], keep='first', inplace=True)
+        instrumentation.count("rows_loaded", loaded)
+        instrumentation.count("rows_deduplicated", loaded - len(master_df))
+    if near_dup is not None:
+        before = len(master_df)
+        with instrumentation.span("near_dedup"):
+            master_df = near_dedup.collapse_near_duplicates(master_df, '完整标题', near_dup,
+                                                            copies=copies.loc[master_df.index])
+        print(f"    Near-duplicate headlines collapsed: {before} -> {len(master_df)} records")
+        instrumentation.count("rows_near_duplicate", before - len(master_df))
+    instrumentation.count("rows_unclassified", int((master_df['Strategy'] == UNCLASSIFIED).sum()))
+
+    save_outputs(master_df, export_csv)
+    cache.save(corpus_key)
+    update = ngram_index.NgramIndex().updater()
+    update.add(master_df)
+    commit_index(update)
+    print(f"    Cache: {cache.hits} reused, {len(stale)} recoded.")
+
+    if segment:
+        warm_token_cache(master_df['完整标题'].tolist(), workers)
+    return master_df
+
+def main_stream(batch_size=BATCH_SIZE, workers=1, export_csv=False, segment=False, simplify=False):
+    """
+    Streaming variant of main(): reads each workbook in row batches, deduplicates
+    through a hashed seen-set, codes the batch and appends it to the corpus store
+    (and the CSV export, if requested).
+    Peak memory is bounded by batch_size instead of the corpus size.
+    With workers > 1, batches are classified in a process pool while the next
+    ones are read; at most 2 * workers batches are in flight, written in order.
+    """
+    print(f"[*] Starting streaming data coding (batch size: {batch_size})...")
+    dedup = TitleDeduplicator()
+    part_file = OUTPUT_FILE + ".part"
+    columns = None
+    total_rows = 0
+    written_rows = 0
+    pool = make_pool(workers) if workers > 1 else None
+    pending = deque()
+    writer = corpus_store.CorpusWriter(STORE_DIR)
+    cube = StrategyCube()
+    segmenter = Segmenter() if segment else None
+    index_update = ngram_index.NgramIndex().updater()
+
+    def write_batch(batch):
+        nonlocal columns, written_rows
+        instrumentation.count("rows_written", len(batch))
+        instrumentation.count("rows_unclassified", int((batch['Strategy'] == UNCLASSIFIED).sum()))
+        with instrumentation.span("write"):
+            writer.write(batch)
+            cube.add(batch)
+            index_update.add(batch)
+        written_rows += len(batch)
+        if segmenter:
+            with instrumentation.span("segment"):
+                segmenter.segment_titles(batch['完整标题'].tolist())
+        if not export_csv:
+            return
+        # The first batch fixes the column layout of the CSV export
+        with instrumentation.span("export_csv"):
+            if columns is None:
+                columns = batch.columns.tolist()
+                batch.to_csv(part_file, index=False, encoding='utf-8-sig')
+            else:
+                batch.reindex(columns=columns).to_csv(
+                    part_file, mode='a', header=False, index=False, encoding='utf-8'
+                )
+
+    def flush_oldest():
+        batch, future = pending.popleft()
+        with instrumentation.span("code_wait"):
+            coded = future.result()
+        batch['Strategy'] = [c[0] for c in coded]
+        batch['Matched_Terms'] = [c[1] for c in coded]
+        write_batch(batch)
+
+    try:
+        for category, filepath in INPUT_FILES.items():
+            if not os.path.exists(filepath):
+                continue
+            loaded = 0
+            batches = iter_excel_batches(filepath, batch_size)
+            while True:
+                with instrumentation.span("read"):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                loaded += len(batch)
+                instrumentation.count("rows_loaded", len(batch))
+                batch['Category'] = category
+                batch['Source_File'] = os.path.basename(filepath)
+                with instrumentation.span("dedup"):
+                    kept = dedup.filter(batch, '完整标题')
+                instrumentation.count("rows_deduplicated", len(batch) - len(kept))
+                batch = kept
+                if batch.empty:
+                    continue
+                if pool is None:
+                    with instrumentation.span("code"):
+                        coded_batch = code_frame(batch, simplify=simplify)
+                    write_batch(coded_batch)
+                    continue
+                future = pool.submit(strategy_matcher.classify_shard, coding_texts(batch, simplify))
+                pending.append((batch, future))
+                if len(pending) >= 2 * workers:
+                    flush_oldest()
+            total_rows += loaded
+            print(f"    Streamed {category}: {loaded} records")
+
+        while pending:
+            flush_oldest()
+    except Exception:
+        writer.abort()
+        raise
+    finally:
+        if pool:
+            pool.shutdown()
+        if segmenter:
+            segmenter.close()
+
+    if written_rows == 0:
+        writer.abort()
+        print("[!] No data found.")
+        return
+
+    writer.commit()
+    cube.save(CUBE_FILE)
+    # The store no longer matches the manifest's corpus key; the next batch run rebuilds it
+    forget_corpus(CACHE_DIR)
+    commit_index(index_update)
+    print(f"    Kept {written_rows} of {total_rows} records after deduplication.")
+    print(f"[+] Successfully saved corpus store to: {STORE_DIR}")
+    print(f"[+] Updated strategy cube: {CUBE_FILE}")
+    if export_csv:
+        os.replace(part_file, OUTPUT_FILE)
+        print(f"[+] Exported CSV to: {OUTPUT_FILE}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge raw ad exports and apply 3S strategy coding.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read workbooks in row batches and append results as they are coded "
+                             "(bypasses the incremental cache).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Rows per batch in --stream mode (default: {BATCH_SIZE}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for file parsing and classification (default: 1).")
+    parser.add_argument("--export-csv", action="store_true",
+                        help=f"Also write {OUTPUT_FILE} (for SmartPLS and manual inspection).")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the build manifest and recode every workbook.")
+    parser.add_argument("--segment", action="store_true",
+                        help="Pre-segment coded headlines into the shared jieba token cache.")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Convert headlines to Simplified Chinese before keyword matching.")
+    instrumentation.add_arguments(parser)
+    parser.add_argument("--near-dedup", type=float, nargs="?", const=near_dedup.THRESHOLD, default=None,
+                        metavar="THRESHOLD",
+                        help="Collapse reprinted ads / OCR variants with MinHash-LSH and record Cluster_Size "
+                             f"(similarity threshold, default: {near_dedup.THRESHOLD}).")
+    args = parser.parse_args()
+    if args.stream and args.near_dedup is not None:
+        parser.error("--near-dedup needs the whole corpus and cannot be combined with --stream")
+    return args
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    with instrumentation.run("2_data_coding", profile=args.profile):
+        if args.stream:
+            main_stream(args.batch_size, args.workers, args.export_csv, args.segment, args.simplify)
+        else:
+            main(args.workers, args.export_csv, args.full, args.segment, args.simplify, args.near_dedup)
\ No newline at end of file
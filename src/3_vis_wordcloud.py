@@ -5,24 +5,30 @@ Description: Generates word clouds for different ad categories.
              (Fixed Version: Handles CSV parsing errors)
 """
 
-import pandas as pd
-import jieba
-from wordcloud import WordCloud
-import re
-import zhconv  # Library for Traditional -> Simplified Chinese conversion
+import argparse
 import os
+import sys
+
+import instrumentation
+from preflight import Preflight
+from wordcloud_render import RenderManifest, fingerprint, render_wordcloud
+
+# pandas/pyarrow (corpus_store, term_index), jieba/zhconv (segmentation) and wordcloud
+# are imported inside the functions that use them, so --check and early exits stay fast.
 
 # --- Configuration ---
 # 自动向上寻找 data 文件夹
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_FILE = os.path.join(BASE_DIR, "data", "encoded_ads.csv")
+STORE_DIR = os.path.join(BASE_DIR, "data", "corpus")
+DATA_FILE = os.path.join(BASE_DIR, "data", "encoded_ads.csv")  # Fallback when the store is missing
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+INDEX_FILE = os.path.join(BASE_DIR, "data", "cache", "term_freq.parquet")  # Category x term counts
 
 # Windows 字体路径
 FONT_PATH = "C:/Windows/Fonts/simhei.ttf"
 
 # ================= SUPER STOPWORD LIST =================
-STOPWORDS = {
+STOPWORDS = frozenset({
     # 1. Basic Function Words
     '之', '的', '了', '在', '是', '有', '和', '大', '及', '与', '等', '或', '此', '亦', '即',
     '我们', '可以', '这个', '一个', '价', '元', '号', '路', '房', '药', '部', '处', '为', '以',
@@ -50,29 +56,10 @@ STOPWORDS = {
     '奇药', '妙品', '圣药', '灵药', '特效', '功效', '功能', '效力', '良药', '大补', '补剂',
     '应用', '秘诀', '秘密', '法', '剂', '丸', '水', '膏', '油', '露', '片', '几许',
     '强身', '健体', '卫生', '滋补', '服用', '精制', '改良', '发明', '保卫', '救星', '人丹'
-}
-
-def generate_wordcloud(category, texts):
-    """
-    Generates and saves a word cloud image.
-    """
-    print(f"[*] Processing WordCloud for: {category}")
-    
-    # 1. Convert Traditional to Simplified Chinese
-    texts_simp = [zhconv.convert(str(t), 'zh-cn') for t in texts]
-    
-    # 2. Tokenization and Cleaning
-    full_text = " ".join(texts_simp)
-    full_text = re.sub(r"[^\u4e00-\u9fa5]", "", full_text) 
-    
-    words = jieba.lcut(full_text)
-    
-    clean_words = [w for w in words if len(w) > 1 and w not in STOPWORDS]
-    
-    if not clean_words:
-        print(f"    [!] No valid words found for {category} after cleaning.")
-        return
+})
 
+def render_settings(category):
+    """WordCloud keyword arguments for one category (also part of the render fingerprint)."""
     # 3. Color Scheme
     if 'Beauty' in category or '美容' in str(category):
         c_map = 'magma'
@@ -82,7 +69,7 @@ def generate_wordcloud(category, texts):
         c_map = 'viridis'
 
     # 4. Rendering
-    wc = WordCloud(
+    return dict(
         font_path=FONT_PATH,
         width=1600, height=1000,
         background_color='white',
@@ -90,56 +77,168 @@ def generate_wordcloud(category, texts):
         colormap=c_map,
         prefer_horizontal=0.9,
         random_state=42
-    ).generate(" ".join(clean_words))
-    
+    )
+
+def output_path_for(category):
+    return os.path.join(OUTPUT_DIR, f"wordcloud_{category}.png")
+
+def render_all(index, workers=1, force=False):
+    """
+    Renders every category of the term index. PNGs whose fingerprint (term
+    frequencies, font, colormap, size) matches the manifest are skipped; the
+    manifest is updated after each finished render, so an interrupted run can
+    be resumed. With workers > 1, categories render in a process pool.
+    """
+    import term_index
+
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
+    manifest = RenderManifest(OUTPUT_DIR)
 
-    output_path = os.path.join(OUTPUT_DIR, f"wordcloud_{category}.png")
-    wc.to_file(output_path)
-    print(f"    [+] Saved: {output_path}")
+    jobs = []
+    for cat in term_index.categories(index):
+        freqs = term_index.frequencies(index, cat)
+        if not freqs:
+            print(f"    [!] No valid words found for {cat} after cleaning.")
+            continue
+        settings = render_settings(cat)
+        digest = fingerprint(freqs, settings)
+        path = output_path_for(cat)
+        if not force and manifest.is_current(cat, digest, path):
+            print(f"[=] Up to date, skipped: {path}")
+            instrumentation.count("wordclouds_skipped")
+            continue
+        jobs.append((cat, freqs, settings, digest, path))
 
-def main():
-    print(f"[*] Reading data from: {DATA_FILE}")
-    if not os.path.exists(DATA_FILE):
-        print(f"[!] Error: Data file not found. Please run '2_data_coding.py' first.")
-        return
+    instrumentation.count("wordclouds_rendered", len(jobs))
+    if workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
 
-    # === 关键修改：增加容错参数 ===
-    try:
-        df = pd.read_csv(DATA_FILE, encoding='utf-8-sig', on_bad_lines='skip', engine='python')
-    except UnicodeDecodeError:
-        print("[!] UTF-8 failed, trying GBK...")
-        df = pd.read_csv(DATA_FILE, encoding='gbk', on_bad_lines='skip', engine='python')
-    except Exception as e:
-        print(f"[!] Critical Read Error: {e}")
-        return
+        with instrumentation.span("render"), ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {
+                pool.submit(render_wordcloud, freqs, settings, path): (cat, digest, path)
+                for cat, freqs, settings, digest, path in jobs
+            }
+            for future in as_completed(futures):
+                cat, digest, path = futures[future]
+                future.result()
+                manifest.record(cat, digest, path)
+                print(f"    [+] Saved: {path}")
+    else:
+        for cat, freqs, settings, digest, path in jobs:
+            print(f"[*] Processing WordCloud for: {cat}")
+            with instrumentation.span("render"):
+                render_wordcloud(freqs, settings, path)
+            manifest.record(cat, digest, path)
+            print(f"    [+] Saved: {path}")
+    return len(jobs)
+
+def build_index(workers=1, df=None):
+    """
+    Loads the corpus and builds the category x term index in one grouped pass
+    (1. Traditional -> Simplified, 2. tokenization and cleaning), then persists it.
+    df: an already loaded corpus (e.g. handed over by pipeline.py) instead of the store.
+    Returns None if the corpus is unavailable.
+    """
+    cat_col = 'Category'
+    text_col = '完整标题'  # Assuming standard output from step 2
+
+    if df is None and (os.path.exists(STORE_DIR) or os.path.exists(DATA_FILE)):
+        # The store readers (pandas/pyarrow) are only imported when there is a corpus to read
+        import corpus_store
+
+        print(f"[*] Reading data from: {STORE_DIR}")
+        # Only the two columns needed here are read from the columnar store
+        with instrumentation.span("load"):
+            df = corpus_store.load_corpus([cat_col, text_col], STORE_DIR, csv_fallback=DATA_FILE)
+    if df is None:
+        print(f"[!] Error: Data file not found. Please run '2_data_coding.py' first.")
+        return None
     
     print(f"[*] Successfully loaded {len(df)} records.")
+    instrumentation.count("rows_loaded", len(df))
 
-    # Detect column names (Handling potential Chinese/English headers)
-    if 'Category' in df.columns:
-        cat_col = 'Category'
-        text_col = '完整标题' # Assuming standard output from step 2
-    elif '关键词' in df.columns:
-        cat_col = '关键词'
-        text_col = '完整标题'
-    else:
+    if cat_col not in df.columns:
         print(f"[!] Error: Could not find Category column. Available columns: {df.columns}")
+        return None
+    if text_col not in df.columns:
+        print(f"[!] Error: '{text_col}' column missing.")
+        return None
+
+    import term_index
+    from segmentation import Segmenter
+
+    with instrumentation.span("segment_count"), Segmenter(workers=workers) as segmenter:
+        index = term_index.build_term_index(df, segmenter, STOPWORDS, cat_col, text_col)
+        print(f"[*] Token cache: {segmenter.hits} hits, {segmenter.misses} newly segmented.")
+    instrumentation.count("token_cache_hits", segmenter.hits)
+    instrumentation.count("token_cache_misses", segmenter.misses)
+    lookups = segmenter.hits + segmenter.misses
+    if lookups:
+        instrumentation.gauge("token_cache_hit_rate", round(segmenter.hits / lookups, 4))
+
+    with instrumentation.span("write"):
+        term_index.save_term_index(index, INDEX_FILE)
+    print(f"[*] Term index: {len(index)} category/term pairs saved to {INDEX_FILE}")
+    return index
+
+def print_top_terms(index, n):
+    """Prints the top-n terms of every category without rendering."""
+    import term_index
+
+    for cat, part in term_index.top_terms(index, n=n).groupby('Category', sort=False):
+        terms = ", ".join(f"{t}({c})" for t, c in zip(part['Term'], part['Count']))
+        print(f"[{cat}] {terms}")
+
+def check(resume=False, top=None):
+    """Validates the inputs of a run without reading them (see preflight.py)."""
+    preflight = Preflight("3_vis_wordcloud")
+    if resume:
+        preflight.path("term index (--resume)", INDEX_FILE, required=False)
+    preflight.any_path("corpus", [STORE_DIR, DATA_FILE], required=not (resume and os.path.exists(INDEX_FILE)))
+    preflight.modules("pandas", "pyarrow", "jieba", "zhconv")
+    if not top:
+        preflight.path("font", FONT_PATH)
+        preflight.output_dir("output folder", OUTPUT_DIR)
+        preflight.modules("wordcloud")
+    return preflight.report()
+
+def main(workers=1, top=None, resume=False, force=False, df=None):
+    index = None
+    if resume:
+        import term_index
+
+        # Continue a partial run from the index it persisted, without re-reading the corpus
+        index = term_index.load_term_index(INDEX_FILE)
+        if index is not None:
+            print(f"[*] Resuming with persisted term index: {INDEX_FILE}")
+    if index is None:
+        index = build_index(workers, df)
+    if index is None:
         return
 
-    categories = df[cat_col].unique()
-    
-    for cat in categories:
-        subset = df[df[cat_col] == cat]
-        
-        if text_col in subset.columns:
-            titles = subset[text_col].tolist()
-            generate_wordcloud(cat, titles)
-        else:
-            print(f"[!] Error: '{text_col}' column missing.")
+    if top:
+        print_top_terms(index, top)
+        return
 
-    print("\n🎉 All Word Clouds Generated in 'output/' folder!")
+    rendered = render_all(index, workers, force)
+    print(f"\n🎉 All Word Clouds Generated in 'output/' folder! ({rendered} rendered)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate per-category word clouds.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for segmentation and rendering (default: 1).")
+    parser.add_argument("--top", type=int, metavar="N",
+                        help="Print the top-N terms per category instead of rendering.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue a partial run: reuse the persisted term index and only render missing/stale PNGs.")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-render every PNG even if its fingerprint is unchanged.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only validate inputs, fonts and dependencies (nothing is loaded or written).")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(check(args.resume, args.top))
+    with instrumentation.run("3_vis_wordcloud", profile=args.profile):
+        main(args.workers, args.top, args.resume, args.force)
\ No newline at end of file
@@ -4,138 +4,234 @@ Description: Generates stacked bar charts to analyze marketing strategies.
              (Fixed Version: Adapts to Chinese column headers in CSV)
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
+import argparse
 import os
+import sys
+
+import instrumentation
+from chart_render import CHART_TEXT, FORMATS, LANGUAGES, chart_title, check_fonts, render_charts
+from preflight import Preflight
+
+# matplotlib and pandas (corpus_store, strategy_cube) are imported where they are used,
+# so --check and early exits do not pay for them or for matplotlib's font cache.
+# chart_render only imports matplotlib when a template is built.
 
 # --- Configuration ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) 
-INPUT_FILE = os.path.join(SCRIPT_DIR, "..", "data", "encoded_ads.csv") 
+STORE_DIR = os.path.join(SCRIPT_DIR, "..", "data", "corpus")
+INPUT_FILE = os.path.join(SCRIPT_DIR, "..", "data", "encoded_ads.csv")  # Fallback when the store is missing
+CUBE_FILE = os.path.join(SCRIPT_DIR, "..", "data", "strategy_cube.csv")  # Written by 2_data_coding.py
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "output", "IEEE_Chart_Strategies.pdf") 
+BATCH_DIR = os.path.join(SCRIPT_DIR, "..", "output", "charts")  # --batch variants
 
-# IEEE Standard Patterns
-PATTERNS = ['///', '...', '   '] 
+# Translation Dictionaries
+TRANS_MAP_CAT = {
+    "美容": "Beauty",
+    "补脑": "Health",
+    "神经衰弱": "Health",  # Merge Neurasthenia into Health
+    "函授": "Education"
+}
 
-def draw_ieee_chart():
-    print("[*] Generating IEEE standard chart...")
-    
-    # 1. Style Settings
-    plt.rcParams['font.family'] = 'Times New Roman'
-    plt.rcParams['font.size'] = 12
-    
-    # 2. Load Data
-    if not os.path.exists(INPUT_FILE):
-        print(f"[!] Error: Data file not found at {INPUT_FILE}")
-        return
-    
-    try:
-        # Load with error handling
-        df = pd.read_csv(INPUT_FILE, encoding='utf-8-sig', on_bad_lines='skip', engine='python')
-    except:
-        df = pd.read_csv(INPUT_FILE, encoding='gbk', on_bad_lines='skip', engine='python')
-
-    rename_map = {
-        '关键词': 'Category',
-        '预编码结果': 'Strategy'
-    }
-    df.rename(columns=rename_map, inplace=True)
+TRANS_MAP_STRAT = {
+    "1_恐吓": "Fear Appeal",
+    "2_科学": "Scientific Authority",
+    "3_愿景": "Vision/Desire",
+    # Labels written by 2_data_coding.py
+    "1_Fear_Appeal": "Fear Appeal",
+    "2_Scientific_Authority": "Scientific Authority",
+    "3_Vision_Desire": "Vision/Desire"
+}
+
+def load_cube():
+    """
+    Loads the strategy cube maintained by 2_data_coding.py. If it is missing,
+    one is built in memory from the corpus (store or CSV fallback).
+    Returns None if no data is available.
+    """
+    if not any(os.path.exists(p) for p in (CUBE_FILE, STORE_DIR, INPUT_FILE)):
+        print(f"[!] Error: Data file not found at {CUBE_FILE}, {STORE_DIR} or {INPUT_FILE}")
+        return None
+
+    import corpus_store
+    from strategy_cube import StrategyCube
+
+    cube = StrategyCube.load(CUBE_FILE)
+    if cube is not None:
+        return cube
+
+    print(f"[!] Strategy cube not found at {CUBE_FILE}, aggregating the corpus instead.")
+    df = corpus_store.load_corpus(['Category', '关键词', '日期', 'Strategy'], STORE_DIR, csv_fallback=INPUT_FILE)
+    if df is None:
+        print(f"[!] Error: Data file not found at {STORE_DIR} or {INPUT_FILE}")
+        return None
     
-    # Check if renaming succeeded
+    # Check that the required columns are present
     if 'Category' not in df.columns or 'Strategy' not in df.columns:
-        print(f"[!] Error: Could not find required columns even after renaming.")
+        print(f"[!] Error: Could not find required columns.")
         print(f"    Current columns: {df.columns.tolist()}")
-        return
-        
-    # 3. Clean and Translate
-    # Filter out unclassified rows
-    df_clean = df[df['Strategy'] != '0_未分类'].copy()
-    
-    # Translation Dictionaries
-    TRANS_MAP_CAT = {
-        "美容": "Beauty",
-        "补脑": "Health",
-        "神经衰弱": "Health",  # Merge Neurasthenia into Health
-        "函授": "Education"
-    }
-    
-    TRANS_MAP_STRAT = {
-        "1_恐吓": "Fear Appeal",
-        "2_科学": "Scientific Authority",
-        "3_愿景": "Vision/Desire"
-    }
-    
-    # Apply Mapping
-    df_clean['Category_En'] = df_clean['Category'].map(TRANS_MAP_CAT).fillna(df_clean['Category'])
-    df_clean['Strategy_En'] = df_clean['Strategy'].map(TRANS_MAP_STRAT).fillna(df_clean['Strategy'])
+        return None
+    return StrategyCube.from_corpus(df)
+
+def strategy_percentages(cube, year=None, keyword=None):
+    """Category x strategy percentage table for one slice of the cube."""
+    pivot = cube.crosstab('Category', 'Strategy', year=year, keyword=keyword)
+
+    # 3. Clean and Translate (on the handful of cube labels, not on every row)
+    # Filter out unclassified rows (hand-coded and dictionary-coded labels)
+    pivot = pivot.drop(columns=['0_未分类', '0_Unclassified'], errors='ignore')
+    pivot.index = [TRANS_MAP_CAT.get(c, c) for c in pivot.index]
+    pivot.columns = [TRANS_MAP_STRAT.get(c, c) for c in pivot.columns]
+    # Merged labels (e.g. Neurasthenia -> Health) are summed
+    pivot = pivot.T.groupby(level=0).sum().T.groupby(level=0).sum()
     
     # 4. Process Data for Plotting
-    pivot = pd.crosstab(df_clean['Category_En'], df_clean['Strategy_En'])
     pivot_pct = pivot.div(pivot.sum(axis=1), axis=0) * 100
     
     # Ensure column order
     desired_cols = ["Fear Appeal", "Scientific Authority", "Vision/Desire"]
     existing_cols = [c for c in desired_cols if c in pivot_pct.columns]
-    pivot_pct = pivot_pct[existing_cols]
+    return pivot_pct[existing_cols].dropna(how='all')
 
-    # 5. Plotting
-    print("  [*] Plotting...")
-    fig, ax = plt.subplots(figsize=(8, 6))
-    
-    pivot_pct.plot(
-        kind='bar', 
-        stacked=True, 
-        ax=ax, 
-        color='white',
-        edgecolor='black',
-        width=0.5,
-        rot=0
-    )
-    
-    # Apply Patterns
-    for i, container in enumerate(ax.containers):
-        pattern = PATTERNS[i % len(PATTERNS)]
-        for bar in container:
-            bar.set_hatch(pattern)
-        
-        # Add labels
-        ax.bar_label(
-            container, 
-            labels=[f'{v.get_height():.1f}%' if v.get_height() > 3 else '' for v in container],
-            label_type='center', 
-            color='black',
-            fontsize=10, 
-            weight='bold',
-            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8, pad=1)
-        )
-
-    # Layout
-    ax.set_xlabel("Advertising Category", fontsize=12, fontweight='bold')
-    ax.set_ylabel("Percentage (%)", fontsize=12, fontweight='bold')
-    ax.yaxis.set_major_formatter(mtick.PercentFormatter())
-    
-    # Legend
-    handles, labels = ax.get_legend_handles_labels()
-    # Clean labels just in case
-    clean_labels = [l.split('_', 1)[1].replace('_', ' ') if '_' in l else l for l in labels]
-    
-    ax.legend(
-        handles, clean_labels, 
-        loc='lower center', 
-        bbox_to_anchor=(0.5, 1.02), 
-        ncol=3, 
-        frameon=False
-    )
+def draw_ieee_chart(year=None, keyword=None, output_file=None, cube=None):
+    """Draws the chart for one slice; cube can be handed over in memory (e.g. by pipeline.py)."""
+    print("[*] Generating IEEE standard chart...")
+    output_file = output_file or OUTPUT_FILE
     
-    ax.spines['top'].set_visible(False)
-    ax.spines['right'].set_visible(False)
-    ax.set_title("Marketing Strategy Distribution (1927-1937)", fontsize=14, pad=45)
+    # 1. Load Data (precomputed counts; no corpus scan)
+    if cube is None:
+        with instrumentation.span("load"):
+            cube = load_cube()
+    if cube is None:
+        return
 
-    plt.tight_layout()
-    plt.subplots_adjust(top=0.80)
-    
-    plt.savefig(OUTPUT_FILE, format='pdf', dpi=600)
-    print(f"  [+] Saved PDF to: {OUTPUT_FILE}")
+    instrumentation.count("cube_cells", len(cube.counts))
+    instrumentation.count("rows_counted", cube.total())
+
+    with instrumentation.span("aggregate"):
+        pivot_pct = strategy_percentages(cube, year, keyword)
+    if pivot_pct.empty:
+        print(f"[!] Error: No classified records for this slice (year={year}, keyword={keyword}).")
+        return
+
+    # 5. Plotting (styled template from chart_render; format follows the file extension)
+    print("  [*] Plotting...")
+    with instrumentation.span("plot"):
+        render_charts([(pivot_pct, "en", chart_title("en", year, keyword), [output_file])])
+    print(f"  [+] Saved chart to: {output_file}")
+
+def cube_slices(cube):
+    """Years and search keywords present in the cube, sorted."""
+    index = cube.counts.index
+    years = sorted(int(y) for y in index.get_level_values("Year").dropna().unique())
+    keywords = sorted(str(k) for k in index.get_level_values("Keyword").dropna().unique())
+    return years, keywords
+
+def variant_path(output_dir, language, fmt, year=None, keyword=None):
+    name = "all" if year is None and keyword is None else (str(year) if year is not None else keyword)
+    return os.path.join(output_dir, f"IEEE_Chart_Strategies_{name}_{language}.{fmt}")
+
+def draw_chart_variants(years=None, keywords=None, languages=("en",), formats=("pdf",),
+                        output_dir=None, workers=1, cube=None):
+    """
+    Batch mode: the whole period plus one chart per year and per keyword (all of the
+    cube's unless given), in every language and format, from one process.
+    Slices are aggregated here; rendering reuses one figure template per language and
+    category set, and with workers > 1 the variants are split across a process pool.
+    Returns the written paths.
+    """
+    output_dir = output_dir or BATCH_DIR
+    # Fail before aggregating anything rather than drawing boxes for every Chinese glyph
+    try:
+        for language in languages:
+            check_fonts(language)
+    except RuntimeError as e:
+        print(f"[!] Error: {e}")
+        return []
+    if cube is None:
+        with instrumentation.span("load"):
+            cube = load_cube()
+    if cube is None:
+        return []
+    all_years, all_keywords = cube_slices(cube)
+    slices = [(None, None)]
+    slices += [(year, None) for year in (all_years if years is None else years)]
+    slices += [(None, keyword) for keyword in (all_keywords if keywords is None else keywords)]
+    print(f"[*] Generating chart variants: {len(slices)} slices x {len(languages)} languages x {len(formats)} formats...")
+
+    jobs = []
+    with instrumentation.span("aggregate"):
+        for year, keyword in slices:
+            pivot_pct = strategy_percentages(cube, year, keyword)
+            if pivot_pct.empty:
+                print(f"    [!] No classified records for year={year}, keyword={keyword}, skipped.")
+                continue
+            for language in languages:
+                paths = [variant_path(output_dir, language, fmt, year, keyword) for fmt in formats]
+                jobs.append((pivot_pct, language, chart_title(language, year, keyword), paths))
+    if not jobs:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Neighbouring jobs share a template, so each worker gets a contiguous run of them
+    jobs.sort(key=lambda job: (job[1], tuple(job[0].index)))
+    workers = max(1, min(workers, len(jobs)))
+    chunks = [jobs[i * len(jobs) // workers:(i + 1) * len(jobs) // workers] for i in range(workers)]
+    written = []
+    with instrumentation.span("render"):
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for paths in pool.map(render_charts, chunks):
+                    written.extend(paths)
+        else:
+            written = render_charts(jobs)
+    instrumentation.count("charts_rendered", len(written))
+    print(f"  [+] Saved {len(written)} charts to: {output_dir}")
+    return written
+
+def check(output_file=None, output_dir=None, languages=("en",)):
+    """Validates the inputs of a run without reading them (see preflight.py); output_dir is for --batch."""
+    preflight = Preflight("4_vis_strategies")
+    preflight.any_path("strategy counts", [CUBE_FILE, STORE_DIR, INPUT_FILE])
+    if preflight.modules("pandas", "matplotlib"):
+        for language in languages:
+            families = CHART_TEXT[language].get("cjk_font")
+            if families:
+                preflight.font(f"{language} font", families)
+    if not os.path.exists(CUBE_FILE):
+        preflight.modules("pyarrow")
+    output_dir = output_dir or os.path.dirname(os.path.abspath(output_file or OUTPUT_FILE))
+    preflight.output_dir("output folder", output_dir)
+    return preflight.report()
 
 if __name__ == "__main__":
-    draw_ieee_chart()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Draw the IEEE-style strategy distribution chart.")
+    parser.add_argument("--year", type=int, help="Only count advertisements from this year.")
+    parser.add_argument("--keyword", help="Only count advertisements found with this search keyword.")
+    parser.add_argument("--output", help=f"Output PDF or PNG (default: {OUTPUT_FILE}).")
+    parser.add_argument("--batch", action="store_true",
+                        help="Render the whole period plus one chart per year and per keyword in one pass.")
+    parser.add_argument("--years", type=int, nargs="+", help="--batch: only these years (default: all).")
+    parser.add_argument("--keywords", nargs="+", help="--batch: only these keywords (default: all).")
+    parser.add_argument("--lang", nargs="+", choices=LANGUAGES, default=["en"],
+                        help="--batch: chart languages (default: en).")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["pdf"],
+                        help="--batch: output formats (default: pdf).")
+    parser.add_argument("--output-dir", help=f"--batch: output folder (default: {BATCH_DIR}).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="--batch: worker processes for rendering (default: 1).")
+    parser.add_argument("--check", action="store_true",
+                        help="Only validate inputs and dependencies (nothing is loaded or drawn).")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.output and os.path.splitext(args.output)[1].lstrip('.').lower() not in FORMATS:
+        parser.error(f"--output must end in .{' or .'.join(FORMATS)}")
+    if args.check:
+        sys.exit(check(args.output, (args.output_dir or BATCH_DIR) if args.batch else None,
+                       args.lang if args.batch else ["en"]))
+    with instrumentation.run("4_vis_strategies", profile=args.profile):
+        if args.batch:
+            draw_chart_variants(args.years, args.keywords, args.lang, args.format, args.output_dir, args.workers)
+        else:
+            draw_ieee_chart(args.year, args.keyword, args.output)
\ No newline at end of file
@@ -5,8 +5,13 @@ Description: Cleans raw survey data, maps Likert scales to integers,
              (Fixed Version: Corrected file paths and added robust column matching)
 """
 
-import pandas as pd
+import argparse
 import os
+import sys
+from functools import lru_cache
+
+import instrumentation
+from preflight import Preflight
 
 # ================= Configuration =================
 # 1. Path Setup (Robust method)
@@ -27,6 +32,44 @@ LIKERT_MAP = {
 GENDER_MAP = {"A.男": 1, "男": 1, "B.女": 2, "女": 2}
 GRADE_MAP = {"A.大一": 1, "B.大二": 2, "C.大三": 3, "D.大四": 4, "E.研究生及以上": 5}
 
+# 4. Variable Mapping: header keyword -> SmartPLS variable name
+# Ensure these keywords match your SurveyStar/Tencent Survey headers
+VARIABLE_MAP = [
+    # Contemporary Anxiety - Appearance
+    ("关注社交媒体", "Anx_Face_1"),
+    ("外貌不够出众", "Anx_Face_2"),
+    ("镜子里的自己", "Anx_Face_3"),
+    
+    # Contemporary Anxiety - Knowledge
+    ("同学考证", "Anx_Know_1"),
+    ("技能不够用", "Anx_Know_2"),
+    ("担心毕业", "Anx_Know_3"),
+    
+    # Contemporary Anxiety - Health
+    ("精神疲惫", "Anx_Health_1"),
+    ("过度的脑力", "Anx_Health_2"),
+    ("高强度的竞争", "Anx_Health_3"),
+    
+    # Historical Resonance - Appearance
+    ("皮肤黑被丈夫", "Hist_Face_1"),
+    ("容貌决定命运", "Hist_Face_2"),
+    ("如果这款产品", "Hist_Face_3"),
+    
+    # Historical Resonance - Brain/Health
+    ("愚笨可变聪明", "Hist_Brain_1"),
+    ("优胜劣汰", "Hist_Brain_2"),
+    ("购买尝试", "Hist_Brain_3"),
+    
+    # Historical Resonance - Knowledge
+    ("自修英文", "Hist_Know_1"),
+    ("知识改变命运", "Hist_Know_2"),
+    ("速成", "Hist_Know_3"),
+]
+
+# 5. Quality Control: attention check (Q6); respondents must answer "比较符合"
+CHECK_KEYWORD = "不是机器人"
+CHECK_ANSWER = "比较符合"
+
 def clean_survey_data():
     print("[*] Starting survey data cleaning...")
     
@@ -36,103 +79,150 @@ def clean_survey_data():
         print("    Please ensure 'raw_survey.xlsx' is in the 'data' folder.")
         return
 
+    import pandas as pd  # Imported only once there is a file to read
+
     try:
-        df = pd.read_excel(INPUT_FILE)
+        with instrumentation.span("load"):
+            df = pd.read_excel(INPUT_FILE)
         print(f"    Loaded raw data: {len(df)} responses.")
+        instrumentation.count("responses_loaded", len(df))
     except Exception as e:
         print(f"[!] Critical Error reading Excel: {e}")
         return
 
-    new_df = pd.DataFrame()
+    with instrumentation.span("transform"):
+        new_df = clean_frame(df)
     
-    # ================= Helper Function: Find Column =================
-    def find_col(keyword, dataframe):
-        """Fuzzy search for column names containing the keyword."""
-        for col in dataframe.columns:
-            if keyword in str(col):
+    # ================= 4. Export =================
+    if not new_df.empty:
+        with instrumentation.span("write"):
+            new_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
+        instrumentation.count("rows_written", len(new_df))
+        print(f"[+] Success! SmartPLS ready data saved to: {OUTPUT_FILE}")
+        print(f"    Final Valid Sample Size: {len(new_df)}")
+    else:
+        print("[!] Error: Resulting dataset is empty. Check mapping logic.")
+    return new_df
+
+@lru_cache(maxsize=8)
+def compile_plan(columns):
+    """
+    Resolves every header keyword to its column once per header layout
+    (columns: tuple of the raw headers). Like the old per-keyword fuzzy search,
+    a keyword resolves to the first column whose header contains it.
+    Returns {"gender", "grade", "check": column or None,
+             "likert": [(variable, column), ...], "missing": [keyword, ...]}.
+    """
+    headers = [str(col) for col in columns]
+
+    def find_col(keyword):
+        for col, header in zip(columns, headers):
+            if keyword in header:
                 return col
         return None
 
-    # ================= 1. Demographics =================
-    print("    Processing demographics...")
-    
-    col_gender = find_col("您的性别", df)
-    if col_gender:
-        new_df['Gender'] = df[col_gender].map(GENDER_MAP).fillna(0)
-        
-    col_grade = find_col("您的年级", df)
-    if col_grade:
-        new_df['Grade'] = df[col_grade].map(GRADE_MAP).fillna(0)
-
-    # ================= 2. Anxiety & History Variables =================
-    # Mapping keywords to SmartPLS variable names
-    # Ensure these keywords match your SurveyStar/Tencent Survey headers
-    variable_map = [
-        # Contemporary Anxiety - Appearance
-        ("关注社交媒体", "Anx_Face_1"),
-        ("外貌不够出众", "Anx_Face_2"),
-        ("镜子里的自己", "Anx_Face_3"),
-        
-        # Contemporary Anxiety - Knowledge
-        ("同学考证", "Anx_Know_1"),
-        ("技能不够用", "Anx_Know_2"),
-        ("担心毕业", "Anx_Know_3"),
-        
-        # Contemporary Anxiety - Health
-        ("精神疲惫", "Anx_Health_1"),
-        ("过度的脑力", "Anx_Health_2"),
-        ("高强度的竞争", "Anx_Health_3"),
-        
-        # Historical Resonance - Appearance
-        ("皮肤黑被丈夫", "Hist_Face_1"),
-        ("容貌决定命运", "Hist_Face_2"),
-        ("如果这款产品", "Hist_Face_3"),
-        
-        # Historical Resonance - Brain/Health
-        ("愚笨可变聪明", "Hist_Brain_1"),
-        ("优胜劣汰", "Hist_Brain_2"),
-        ("购买尝试", "Hist_Brain_3"),
-        
-        # Historical Resonance - Knowledge
-        ("自修英文", "Hist_Know_1"),
-        ("知识改变命运", "Hist_Know_2"),
-        ("速成", "Hist_Know_3"),
-    ]
-
-    print("    Processing latent variables...")
-    for keyword, var_name in variable_map:
-        col_name = find_col(keyword, df)
-        if col_name:
-            # Apply Likert mapping
-            new_df[var_name] = df[col_name].apply(
-                lambda x: LIKERT_MAP.get(str(x).strip(), x) if isinstance(x, str) else x
-            )
-            # Ensure numeric conversion (force errors to NaN then fill with mean or drop)
-            new_df[var_name] = pd.to_numeric(new_df[var_name], errors='coerce')
+    likert, missing = [], []
+    for keyword, var_name in VARIABLE_MAP:
+        col = find_col(keyword)
+        if col is None:
+            missing.append(keyword)
         else:
-            print(f"    [!] Warning: Column keyword '{keyword}' not found.")
-
-    # ================= 3. Quality Control (Anti-Bot) =================
-    # Check for the attention check question (Q6)
-    col_check = find_col("不是机器人", df)
-    if col_check:
-        # User must select "比较符合" (mapped to 4)
-        # Note: Depending on raw data, this might be string "比较符合" or mapped int 4
-        # Let's check string in raw dataframe
-        valid_indices = df[df[col_check].astype(str).str.contains("比较符合")].index
-        
-        dropped_count = len(df) - len(valid_indices)
+            likert.append((var_name, col))
+    return {
+        "gender": find_col("您的性别"),
+        "grade": find_col("您的年级"),
+        "check": find_col(CHECK_KEYWORD),
+        "likert": likert,
+        "missing": missing,
+    }
+
+def likert_value(answer):
+    """Numeric score of one distinct raw answer: scale label, number, or NaN."""
+    import pandas as pd
+
+    if isinstance(answer, str):
+        answer = LIKERT_MAP.get(answer.strip(), answer)
+    return pd.to_numeric(answer, errors='coerce')
+
+def likert_block(df, likert):
+    """
+    Converts all Likert columns ((variable, column) pairs) as one categorical mapping:
+    every column is factorized into its few distinct answers, each distinct answer is
+    scored once (shared across columns), and the scores are gathered back by code
+    into one matrix. A column is int64 when every answer scores as an integer and none
+    is missing, and float64 otherwise, which is the dtype pd.to_numeric gives the mapped
+    column (a float source column stays float64 even if all its values are whole).
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = np.empty((len(df), len(likert)), dtype=float)
+    integer_columns = []
+    scored = {}
+    for i, (var, col) in enumerate(likert):
+        codes, uniques = pd.factorize(df[col])
+        # Keyed by type as well: 1 and 1.0 are equal dict keys but score as int and float
+        keys = [(type(answer), answer) for answer in uniques]
+        for key in keys:
+            if key not in scored:
+                scored[key] = likert_value(key[1])
+        scores = [scored[key] for key in keys]
+        # Code -1 (missing answer) picks the trailing NaN
+        values[:, i] = np.array(scores + [np.nan], dtype=float)[codes]
+        if (codes >= 0).all() and all(isinstance(s, (int, np.integer)) for s in scores):
+            integer_columns.append(var)
+    block = pd.DataFrame(values, columns=[var for var, _ in likert], index=df.index)
+    return block.astype({name: 'int64' for name in integer_columns})
+
+def clean_frame(df):
+    """Maps one raw survey frame to the SmartPLS variables (in memory, no file I/O)."""
+    import pandas as pd
+
+    plan = compile_plan(tuple(df.columns))
+
+    # ================= 1. Quality Control (Anti-Bot) =================
+    # Failed attention checks are dropped before any column is transformed
+    if plan["check"] is not None:
+        valid = df[plan["check"]].astype(str).str.contains(CHECK_ANSWER, regex=False).to_numpy()
+        dropped_count = len(df) - int(valid.sum())
         if dropped_count > 0:
             print(f"    [QC] Removed {dropped_count} failed attention checks.")
-            new_df = new_df.loc[valid_indices].copy()
-    
-    # ================= 4. Export =================
-    if len(new_df) > 0:
-        new_df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8-sig')
-        print(f"[+] Success! SmartPLS ready data saved to: {OUTPUT_FILE}")
-        print(f"    Final Valid Sample Size: {len(new_df)}")
-    else:
-        print("[!] Error: Resulting dataset is empty. Check mapping logic.")
+            instrumentation.count("qc_dropped", dropped_count)
+            df = df[valid]
+
+    # ================= 2. Demographics =================
+    print("    Processing demographics...")
+    columns = {}
+    if plan["gender"] is not None:
+        columns['Gender'] = df[plan["gender"]].map(GENDER_MAP).fillna(0)
+    if plan["grade"] is not None:
+        columns['Grade'] = df[plan["grade"]].map(GRADE_MAP).fillna(0)
+
+    # ================= 3. Anxiety & History Variables =================
+    print("    Processing latent variables...")
+    for keyword in plan["missing"]:
+        print(f"    [!] Warning: Column keyword '{keyword}' not found.")
+        instrumentation.count("columns_missing")
+    new_df = pd.DataFrame(columns, index=df.index)
+    if plan["likert"]:
+        new_df = pd.concat([new_df, likert_block(df, plan["likert"])], axis=1)
+    return new_df
+
+def check():
+    """Validates the inputs of a run without reading them (see preflight.py)."""
+    preflight = Preflight("5_survey_cleaner")
+    preflight.path("raw survey", INPUT_FILE)
+    preflight.modules("pandas", "openpyxl")
+    preflight.output_dir("output folder", os.path.dirname(os.path.abspath(OUTPUT_FILE)))
+    return preflight.report()
 
 if __name__ == "__main__":
-    clean_survey_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean the raw survey export for SmartPLS.")
+    parser.add_argument("--check", action="store_true",
+                        help="Only validate the input file and dependencies (nothing is loaded or written).")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(check())
+    with instrumentation.run("5_survey_cleaner", profile=args.profile):
+        clean_survey_data()
\ No newline at end of file
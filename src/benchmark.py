@@ -0,0 +1,250 @@
+"""
+Module: Benchmark Harness
+Description: Times each pipeline stage on synthetic Shen Bao-scale corpora so that
+             changes to coding, readers or the word cloud step can be compared
+             between runs. Headlines are generated from the encoded_ads.csv vocabulary
+             (spliced real headlines, with reprints), survey responses by resampling
+             raw_survey.xlsx. Each stage reports seconds, rows/s and peak traced memory
+             as JSON.
+Usage: python benchmark.py --sizes 1e3 1e4 1e5 --output ../data/benchmarks/run.json
+       python benchmark.py --sizes 1e6 --stages coding dedup chart --compare old.json
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import corpus_store
+import near_dedup
+import term_index
+from segmentation import Segmenter, load_jieba
+from strategy_cube import StrategyCube
+
+# --- Configuration ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+VOCAB_FILE = os.path.join(SCRIPT_DIR, "..", "data", "encoded_ads.csv")
+SURVEY_FILE = os.path.join(SCRIPT_DIR, "..", "data", "raw_survey.xlsx")
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "..", "data", "benchmarks")
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+STAGES = ["coding", "dedup", "near_dedup", "segmentation", "term_freq", "chart", "survey"]
+REPRINT_RATE = 0.3  # Share of rows that repeat an earlier headline verbatim
+KEYWORD_CATEGORY = {"美容": "Beauty", "补脑": "Health", "神经衰弱": "Health", "函授": "Education"}
+YEARS = (1927, 1937)
+
+
+@lru_cache(maxsize=None)
+def load_stage(filename, name):
+    """Imports a numbered stage script (e.g. 2_data_coding.py) as a module."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Synthetic data ---
+def load_vocabulary(path=VOCAB_FILE):
+    """Real headlines and keywords from the coded export."""
+    with warnings.catch_warnings():
+        # The export's known malformed lines are not relevant for a vocabulary
+        warnings.simplefilter("ignore")
+        df = corpus_store.read_legacy_csv(path)
+    df = df.dropna(subset=["完整标题"])
+    # The legacy export keeps the search keyword in the column renamed to Category
+    return df["完整标题"].astype(str).tolist(), df["Category"].astype(str).tolist()
+
+
+def synth_corpus(n, titles, keywords, seed=0, reprint_rate=REPRINT_RATE):
+    """
+    n synthetic ad rows with the corpus columns. Each headline splices the head of one
+    real headline onto the tail of another, so lengths and characters follow the
+    vocabulary; reprint_rate of the rows repeat an earlier headline.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, len(titles), n)
+    b = rng.integers(0, len(titles), n)
+    cut = rng.random(n)
+    heads = [titles[i][:max(1, int(len(titles[i]) * c))] for i, c in zip(a, cut)]
+    tails = [titles[j][int(len(titles[j]) * c):] for j, c in zip(b, cut)]
+    headlines = np.array([h + t for h, t in zip(heads, tails)], dtype=object)
+
+    reprint = np.flatnonzero(rng.random(n) < reprint_rate)
+    reprint = reprint[reprint > 0]
+    headlines[reprint] = headlines[(rng.random(len(reprint)) * reprint).astype(np.int64)]
+
+    kw = np.array(keywords, dtype=object)[rng.integers(0, len(keywords), n)]
+    start = np.datetime64(f"{YEARS[0]}-01-01")
+    days = (np.datetime64(f"{YEARS[1]}-07-01") - start).astype(int)
+    dates = pd.to_datetime(start + rng.integers(0, days, n).astype("timedelta64[D]"))
+    return pd.DataFrame({
+        "关键词": kw,
+        "日期": dates.strftime("%Y.%m.%d"),
+        "版次": rng.integers(1, 25, n),
+        "完整标题": headlines,
+        "详情": "",
+        "链接": "",
+        "Category": pd.Series(kw).map(KEYWORD_CATEGORY).fillna("Health").to_numpy(),
+    })
+
+
+def synth_survey(n, path=SURVEY_FILE, seed=0):
+    """n survey responses resampled from the raw questionnaire export."""
+    raw = pd.read_excel(path)
+    rng = np.random.default_rng(seed)
+    return raw.iloc[rng.integers(0, len(raw), n)].reset_index(drop=True)
+
+
+# --- Measurement ---
+class Recorder:
+    """Runs stage callables and collects timing and peak-memory records."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def measure(self, stage, rows, func, *args, **kwargs):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            value = func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if self.trace_memory:
+                tracemalloc.stop()
+        record = {
+            "stage": stage,
+            "rows": rows,
+            "seconds": round(seconds, 6),
+            "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+            "peak_mb": round(peak / 2**20, 3) if peak is not None else None,
+        }
+        self.results.append(record)
+        peak_text = f", peak {record['peak_mb']:.1f} MB" if peak is not None else ""
+        print(f"    {stage:<13} {rows:>10} rows  {seconds:8.3f} s  {record['rows_per_sec'] or 0:>12,.0f} rows/s{peak_text}")
+        return value
+
+
+def run_size(n, stages, recorder, vocab, seed=0, workers=1):
+    """Benchmarks the selected stages on one synthetic corpus size."""
+    print(f"[*] {n} rows")
+    coding = load_stage("2_data_coding.py", "data_coding")
+    charts = load_stage("4_vis_strategies.py", "vis_strategies")
+    wordcloud = load_stage("3_vis_wordcloud.py", "vis_wordcloud")
+
+    df = synth_corpus(n, *vocab, seed=seed)
+    if "coding" in stages:
+        coding._CLASSIFIER = None  # Include the dictionary compile, as a fresh run would
+        df = recorder.measure("coding", n, coding.code_frame, df)
+    else:
+        df = coding.code_frame(df)
+
+    if "dedup" in stages:
+        df = recorder.measure("dedup", n, lambda d: d.drop_duplicates(subset=["完整标题"], keep="first"), df)
+    if "near_dedup" in stages:
+        recorder.measure("near_dedup", len(df), near_dedup.collapse_near_duplicates, df)
+
+    if "segmentation" in stages or "term_freq" in stages:
+        with tempfile.TemporaryDirectory() as tmp:
+            # A fresh token cache: segmentation is timed cold, frequency counting warm
+            with Segmenter(os.path.join(tmp, "tokens.sqlite"), workers=workers) as segmenter:
+                if "segmentation" in stages:
+                    recorder.measure("segmentation", len(df), segmenter.segment_titles, df["完整标题"].tolist())
+                if "term_freq" in stages:
+                    recorder.measure("term_freq", len(df), term_index.build_term_index,
+                                     df, segmenter, wordcloud.STOPWORDS)
+
+    if "chart" in stages:
+        def aggregate(frame):
+            cube = StrategyCube.from_corpus(frame)
+            return charts.strategy_percentages(cube)
+        recorder.measure("chart", len(df), aggregate, df)
+
+    if "survey" in stages:
+        cleaner = load_stage("5_survey_cleaner.py", "survey_cleaner")
+        survey = synth_survey(n, seed=seed)
+        recorder.measure("survey", n, cleaner.clean_frame, survey)
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results, baseline_path, trace_memory):
+    """Prints the speed-up of every stage/size against a previous JSON report."""
+    with open(baseline_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    baseline = {(r["stage"], r["rows"]): r for r in previous["results"]}
+    print(f"[*] Compared with {baseline_path}:")
+    if previous["config"].get("trace_memory") != trace_memory:
+        print("    [!] Only one of the runs traced memory; timings are not directly comparable.")
+    for r in results:
+        old = baseline.get((r["stage"], r["rows"]))
+        if old and r["seconds"]:
+            print(f"    {r['stage']:<13} {r['rows']:>10} rows  x{old['seconds'] / r['seconds']:.2f} speed-up")
+
+
+def main(sizes=None, stages=None, output=None, seed=0, workers=1, trace_memory=True, baseline=None):
+    sizes = sizes or DEFAULT_SIZES
+    stages = stages or STAGES
+    vocab = load_vocabulary()
+    print(f"[*] Vocabulary: {len(vocab[0])} headlines from {VOCAB_FILE}")
+
+    if "segmentation" in stages or "term_freq" in stages:
+        # One-off dictionary load, kept out of the first size's timings
+        load_jieba()
+
+    recorder = Recorder(trace_memory)
+    for n in sizes:
+        run_size(n, stages, recorder, vocab, seed, workers)
+
+    report = {"environment": environment(), "config": {"seed": seed, "workers": workers,
+              "trace_memory": trace_memory, "stages": stages}, "results": recorder.results}
+    output = output or os.path.join(RESULTS_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[+] Results saved to: {output}")
+    if baseline:
+        compare(recorder.results, baseline, trace_memory)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic corpora.")
+    parser.add_argument("--sizes", nargs="+", type=lambda s: int(float(s)), default=DEFAULT_SIZES,
+                        help="Corpus sizes in rows, e.g. 1e3 1e5 1e7 (default: 1e3 1e4 1e5).")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--output", help=f"JSON report path (default: {RESULTS_DIR}/bench_<time>.json).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="Segmentation worker processes.")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip tracemalloc (it slows allocation-heavy stages); report time only.")
+    parser.add_argument("--compare", metavar="REPORT", help="Print speed-ups against an earlier report.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.sizes, args.stages, args.output, args.seed, args.workers, not args.no_memory, args.compare)
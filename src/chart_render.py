@@ -0,0 +1,168 @@
+"""
+Module: Chart Rendering
+Description: Reusable figure template and picklable render task for the strategy chart.
+             The styled axes (hatched bars, label boxes, ticks, legend) are built once per
+             language and category set; each variant only moves bar heights, label texts
+             and the title before it is saved. Figures are drawn on bare Agg/PDF canvases,
+             so no pyplot state or GUI backend is involved.
+"""
+
+import os
+
+# IEEE Standard Patterns
+PATTERNS = ['///', '...', '   ']
+
+# Chart text per language. Category and strategy names arrive in English
+# (see TRANS_MAP_CAT / TRANS_MAP_STRAT in 4_vis_strategies.py) and are translated here.
+CHART_TEXT = {
+    "en": {
+        "font": ["Times New Roman", "SimHei"],  # SimHei for keywords in per-keyword titles
+        "xlabel": "Advertising Category",
+        "ylabel": "Percentage (%)",
+        "title": "Marketing Strategy Distribution ({period})",
+        "labels": {},
+    },
+    "zh": {
+        "font": ["Times New Roman", "SimHei"],
+        "cjk_font": ["SimHei"],  # Required: every label is Chinese
+        "xlabel": "广告类别",
+        "ylabel": "百分比 (%)",
+        "title": "营销策略分布 ({period})",
+        "labels": {
+            "Beauty": "美容",
+            "Health": "健康",
+            "Education": "函授",
+            "Fear Appeal": "恐吓诉求",
+            "Scientific Authority": "科学权威",
+            "Vision/Desire": "愿景诉求",
+        },
+    },
+}
+LANGUAGES = list(CHART_TEXT)
+FORMATS = ["pdf", "png"]
+DPI = {"pdf": 600, "png": 300}
+MIN_LABEL_PCT = 3  # Segments below this share get no label box
+
+
+def chart_title(language, year=None, keyword=None):
+    period = str(year) if year is not None else "1927-1937"
+    title = CHART_TEXT[language]["title"].format(period=period)
+    if keyword:
+        title += f" - {keyword}"
+    return title
+
+
+def check_fonts(language):
+    """Raises RuntimeError if the language needs a CJK font that is not installed."""
+    from preflight import find_font
+
+    families = CHART_TEXT[language].get("cjk_font")
+    if families and find_font(families) is None:
+        raise RuntimeError(f"'{language}' charts need one of these fonts: {', '.join(families)} "
+                           "(matplotlib would draw every Chinese glyph as a box)")
+
+
+def legend_label(label):
+    # Raw strategy codes ('4_New_Strategy') are shown without their number prefix
+    return label.split('_', 1)[1].replace('_', ' ') if '_' in label else label
+
+
+class ChartTemplate:
+    """Stacked, hatched percentage bars for fixed categories and strategies; see render()."""
+
+    def __init__(self, categories, strategies, language="en"):
+        import matplotlib
+        import matplotlib.ticker as mtick
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        check_fonts(language)
+        self.categories = list(categories)
+        self.strategies = list(strategies)
+        text = CHART_TEXT[language]
+        names = text["labels"]
+        # Applied around building and every save: tick labels are only created at draw time
+        self.rc = {"font.family": text["font"], "font.size": 12}
+
+        with matplotlib.rc_context(self.rc):
+            self.fig = Figure(figsize=(8, 6))
+            FigureCanvasAgg(self.fig)
+            ax = self.ax = self.fig.add_subplot()
+            x = list(range(len(self.categories)))
+            self.layers = []
+            self.labels = []
+            for i, strategy in enumerate(self.strategies):
+                bars = ax.bar(x, [0] * len(x), width=0.5, color='white', edgecolor='black',
+                              hatch=PATTERNS[i % len(PATTERNS)])
+                self.layers.append(bars)
+                self.labels.append([
+                    ax.text(bar.get_x() + bar.get_width() / 2, 0, '',
+                            ha='center', va='center', color='black', fontsize=10, weight='bold',
+                            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8, pad=1))
+                    for bar in bars
+                ])
+
+            ax.set_xticks(x, [names.get(c, c) for c in self.categories])
+            ax.set_xlim(-0.5, len(x) - 0.5)
+            ax.set_ylim(0, 105)  # Every stack sums to 100%
+            ax.set_xlabel(text["xlabel"], fontsize=12, fontweight='bold')
+            ax.set_ylabel(text["ylabel"], fontsize=12, fontweight='bold')
+            ax.yaxis.set_major_formatter(mtick.PercentFormatter())
+            ax.legend(
+                self.layers, [legend_label(names.get(s, s)) for s in self.strategies],
+                loc='lower center',
+                bbox_to_anchor=(0.5, 1.02),
+                ncol=3,
+                frameon=False
+            )
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            self.title = ax.set_title('', fontsize=14, pad=45)
+
+            self.fig.tight_layout()
+            self.fig.subplots_adjust(top=0.80)
+
+    def render(self, pivot_pct, title):
+        """Moves the bars and labels to one category x strategy percentage table."""
+        table = pivot_pct.reindex(index=self.categories, columns=self.strategies).fillna(0)
+        bottoms = [0.0] * len(self.categories)
+        for strategy, bars, labels in zip(self.strategies, self.layers, self.labels):
+            for i, (bar, label, height) in enumerate(zip(bars, labels, table[strategy])):
+                bar.set_y(bottoms[i])
+                bar.set_height(height)
+                label.set_y(bottoms[i] + height / 2)
+                label.set_text(f'{height:.1f}%' if height > MIN_LABEL_PCT else '')
+                bottoms[i] += height
+        self.title.set_text(title)
+
+    def save(self, output_path):
+        """Writes the current state; the format follows the file extension (see FORMATS)."""
+        import matplotlib
+
+        fmt = os.path.splitext(output_path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported chart file '{output_path}': use one of .{', .'.join(FORMATS)}")
+        tmp = f"{output_path}.tmp.{fmt}"
+        with matplotlib.rc_context(self.rc):
+            self.fig.savefig(tmp, format=fmt, dpi=DPI.get(fmt, 300))
+        os.replace(tmp, output_path)
+        return output_path
+
+
+def render_charts(jobs):
+    """
+    Pool task: renders (pivot_pct, language, title, output paths) jobs in order,
+    reusing one template per language and category/strategy set.
+    Returns the written paths.
+    """
+    templates = {}
+    written = []
+    for pivot_pct, language, title, paths in jobs:
+        key = (language, tuple(pivot_pct.index), tuple(pivot_pct.columns))
+        template = templates.get(key)
+        if template is None:
+            template = templates[key] = ChartTemplate(pivot_pct.index, pivot_pct.columns, language)
+        template.render(pivot_pct, title)
+        for path in paths:
+            written.append(template.save(path))
+    return written
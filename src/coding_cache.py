@@ -0,0 +1,128 @@
+"""
+Module: Coding Cache
+Description: Build manifest for incremental recoding. Records a content hash of every
+             raw_ads workbook and of CODE_DICT; unchanged workbooks reuse their cached
+             coded output, and any dictionary change invalidates the whole cache.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+_CHUNK = 1 << 20
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, read in 1 MB chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dict_digest(code_dict, options=None):
+    """
+    SHA-256 of the coding dictionary (keyword order included, since it sets Matched_Terms order)
+    and of any coding options that change the output.
+    """
+    payload = json.dumps([code_dict, options or {}], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CodingCache:
+    """
+    Per-workbook cache of coded frames (before cross-file deduplication),
+    stored as Parquet files named after the workbook hash.
+    """
+
+    def __init__(self, cache_dir, code_dict, options=None):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.dict_hash = dict_digest(code_dict, options)
+        self.manifest = {"code_dict": self.dict_hash, "files": {}, "corpus": None}
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                previous = json.load(f)
+            if previous.get("code_dict") == self.dict_hash:
+                self.manifest = previous
+            else:
+                print("    [Cache] CODE_DICT or coding options changed, recoding all inputs.")
+                self.clear()
+
+    def _entry_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.parquet")
+
+    def clear(self):
+        """Drops every cached frame and manifest entry."""
+        for entry in self.manifest["files"].values():
+            path = self._entry_path(entry["sha256"])
+            if os.path.exists(path):
+                os.remove(path)
+        self.manifest = {"code_dict": self.dict_hash, "files": {}, "corpus": None}
+
+    def load(self, category, digest):
+        """Returns the cached coded frame for a workbook, or None on a miss."""
+        entry = self.manifest["files"].get(category)
+        path = self._entry_path(digest)
+        if entry is None or entry["sha256"] != digest or not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pd.read_parquet(path)
+
+    def store(self, category, source_path, digest, df):
+        """Caches a freshly coded frame, replacing any stale entry for the category."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        old = self.manifest["files"].get(category)
+        if old and old["sha256"] != digest:
+            stale = self._entry_path(old["sha256"])
+            if os.path.exists(stale):
+                os.remove(stale)
+        df.to_parquet(self._entry_path(digest), index=False)
+        self.manifest["files"][category] = {
+            "path": os.path.basename(source_path),
+            "sha256": digest,
+            "rows": len(df),
+        }
+
+    @staticmethod
+    def corpus_key(digests):
+        """Fingerprint of the ordered input set that produced a corpus."""
+        payload = json.dumps(list(digests.items()), separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def save(self, corpus_key=None):
+        if corpus_key is not None:
+            self.manifest["corpus"] = corpus_key
+        _write_manifest(self.manifest_path, self.manifest)
+
+
+def forget_corpus(cache_dir):
+    """
+    Clears the recorded corpus key after the corpus store was written by another path
+    (e.g. the streaming build), so the next incremental build rewrites it.
+    Cached per-workbook frames are kept.
+    """
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("corpus") is not None:
+        manifest["corpus"] = None
+        _write_manifest(path, manifest)
+
+
+def _write_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,178 @@
+"""
+Module: Corpus Store
+Description: Typed, category-partitioned Parquet dataset used as the hand-off format
+             between the coding stage and the visualization stages.
+             Readers load only the columns they need; encoded_ads.csv remains an
+             optional export and a legacy fallback.
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, "data", "corpus")
+LEGACY_CSV = os.path.join(BASE_DIR, "data", "encoded_ads.csv")
+
+PARTITION_COL = "Category"
+
+# Typed columns of the coded corpus. Any extra raw columns are stored as strings.
+SCHEMA = pa.schema([
+    ("Category", pa.string()),
+    ("关键词", pa.string()),
+    ("日期", pa.string()),
+    ("版次", pa.string()),  # Page as printed; not always numeric (e.g. "增刊", OCR noise)
+    ("完整标题", pa.string()),
+    ("详情", pa.string()),
+    ("链接", pa.string()),
+    ("Strategy", pa.string()),
+    ("Matched_Terms", pa.string()),
+    ("Source_File", pa.string()),
+    ("Cluster_Size", pa.int32()),  # Only present after near-duplicate collapsing
+])
+
+def _as_string(col):
+    """String column; whole-number floats (ints read next to blank cells) keep their integer spelling."""
+    if pd.api.types.is_float_dtype(col):
+        values = col.dropna()
+        if (values == values.round()).all():
+            col = col.astype("Int64")
+    return col.astype("string")
+
+
+# Header aliases used by the hand-coded legacy CSV
+LEGACY_RENAME = {
+    "关键词": "Category",
+    "预编码结果": "Strategy",
+    "编码理由关键词": "Matched_Terms",
+}
+
+
+def to_table(df):
+    """Converts a coded DataFrame into an Arrow table following SCHEMA."""
+    fields = []
+    arrays = []
+    for field in SCHEMA:
+        if field.name not in df.columns:
+            continue
+        col = df[field.name]
+        if pa.types.is_integer(field.type):
+            col = pd.to_numeric(col, errors="coerce").astype("Int32")
+        else:
+            col = _as_string(col)
+        fields.append(field)
+        arrays.append(pa.array(col, type=field.type, from_pandas=True))
+    for name in df.columns:
+        if name not in SCHEMA.names:
+            fields.append(pa.field(str(name), pa.string()))
+            arrays.append(pa.array(_as_string(df[name]), type=pa.string(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def _partition_dir(root, value):
+    # Hive-style layout (Category=Beauty/) so pyarrow restores the column on read
+    return os.path.join(root, f"{PARTITION_COL}={value}")
+
+
+class CorpusWriter:
+    """
+    Writes a corpus batch by batch into a temporary directory and swaps it
+    over the previous store on commit(), so readers never see a partial run.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.tmp_dir = store_dir + ".tmp"
+        self.rows = 0
+        self._parts = 0
+        if os.path.exists(self.tmp_dir):
+            shutil.rmtree(self.tmp_dir)
+        os.makedirs(self.tmp_dir)
+
+    def write(self, df):
+        """Appends one batch, split into one Parquet file per category."""
+        for value, part in df.groupby(PARTITION_COL, sort=False):
+            target = _partition_dir(self.tmp_dir, value)
+            os.makedirs(target, exist_ok=True)
+            table = to_table(part.drop(columns=[PARTITION_COL]))
+            pq.write_table(table, os.path.join(target, f"part-{self._parts:05d}.parquet"))
+            self._parts += 1
+        self.rows += len(df)
+
+    def commit(self):
+        if os.path.exists(self.store_dir):
+            shutil.rmtree(self.store_dir)
+        os.replace(self.tmp_dir, self.store_dir)
+
+    def abort(self):
+        if os.path.exists(self.tmp_dir):
+            shutil.rmtree(self.tmp_dir)
+
+
+def write_corpus(df, store_dir=STORE_DIR):
+    """Replaces the store with the given coded DataFrame."""
+    writer = CorpusWriter(store_dir)
+    try:
+        writer.write(df)
+    except Exception:
+        writer.abort()
+        raise
+    writer.commit()
+
+
+def store_exists(store_dir=STORE_DIR):
+    return os.path.isdir(store_dir)
+
+
+def read_corpus(columns=None, store_dir=STORE_DIR, categories=None):
+    """
+    Loads the coded corpus, reading only the requested columns.
+    categories restricts the read to the given partitions.
+    """
+    filters = [(PARTITION_COL, "in", list(categories))] if categories else None
+    table = pq.read_table(
+        store_dir,
+        columns=list(columns) if columns else None,
+        filters=filters,
+        partitioning="hive",
+    )
+    df = table.to_pandas()
+    if PARTITION_COL in df.columns:
+        # Partition values come back as a dictionary column
+        df[PARTITION_COL] = df[PARTITION_COL].astype(str)
+    return df
+
+
+def read_legacy_csv(path=LEGACY_CSV, columns=None):
+    """
+    Reads a CSV export (including the hand-coded encoded_ads.csv), normalizing
+    its headers to the store's column names. Malformed rows are reported.
+    """
+    try:
+        df = pd.read_csv(path, encoding="utf-8-sig", on_bad_lines="warn", engine="python")
+    except UnicodeDecodeError:
+        print("[!] UTF-8 failed, trying GBK...")
+        df = pd.read_csv(path, encoding="gbk", on_bad_lines="warn", engine="python")
+    if "Category" not in df.columns:
+        df = df.rename(columns=LEGACY_RENAME)
+    if columns:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def load_corpus(columns=None, store_dir=STORE_DIR, csv_fallback=LEGACY_CSV):
+    """
+    Preferred entry point for downstream stages: reads the Parquet store when
+    it exists, otherwise falls back to the CSV export.
+    Returns None if neither is available.
+    """
+    if store_exists(store_dir):
+        return read_corpus(columns, store_dir)
+    if csv_fallback and os.path.exists(csv_fallback):
+        print(f"[!] Corpus store not found, falling back to CSV: {csv_fallback}")
+        return read_legacy_csv(csv_fallback, columns)
+    return None
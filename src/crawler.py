@@ -0,0 +1,225 @@
+"""
+Module: Crawler
+Description: Checkpointed, resumable deep-pagination crawl for the scraper.
+             Each results page is appended to the keyword's file in OUTPUT_DIR as soon
+             as it is fetched, and a per-keyword/per-date-window checkpoint records the
+             last completed page, so a restarted run resumes where it stopped.
+             Records already collected are skipped.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import threading
+
+import instrumentation
+from result_parser import RECORD_COLUMNS, parse_results
+
+CHECKPOINT_NAME = "_crawl_checkpoint.json"
+
+
+def record_key(record):
+    """Stable identity of an advertisement (the 链接 carries per-session ids, so it is excluded)."""
+    raw = "|".join(str(record.get(c) or "") for c in ("关键词", "日期", "版次", "完整标题", "详情"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest()
+
+
+def unit_key(keyword, begin, end):
+    return f"{keyword}|{begin}|{end}"
+
+
+class CrawlCheckpoint:
+    """Thread-safe JSON checkpoint; saved atomically after every update."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.units = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.units = json.load(f)
+
+    def get(self, key):
+        with self.lock:
+            return dict(self.units.get(key, {}))
+
+    def update(self, key, **fields):
+        with self.lock:
+            self.units.setdefault(key, {}).update(fields)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.units, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+
+class RecordStore:
+    """
+    Append-only per-keyword CSV files (申报_<keyword>_数据.csv) in the output directory.
+    A hashed seen-set per keyword, rebuilt from the existing file on first use,
+    makes appends idempotent across restarts. Rows of an existing Excel export are
+    merged into the CSV on first use, so exporting never drops data already on disk.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._seen = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def csv_path(self, keyword):
+        return os.path.join(self.output_dir, f"申报_{keyword}_数据.csv")
+
+    def xlsx_path(self, keyword):
+        return os.path.join(self.output_dir, f"申报_{keyword}_数据.xlsx")
+
+    def _lock_for(self, keyword):
+        with self._guard:
+            return self._locks.setdefault(keyword, threading.Lock())
+
+    def _seen_for(self, keyword):
+        seen = self._seen.get(keyword)
+        if seen is None:
+            seen = set()
+            path = self.csv_path(keyword)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8-sig", newline="") as f:
+                    for row in csv.DictReader(f):
+                        seen.add(record_key(row))
+            self._seen[keyword] = seen
+            merged = self._write_fresh(keyword, seen, self._read_xlsx(keyword))
+            if merged:
+                print(f"[*] Merged {merged} records from {self.xlsx_path(keyword)}")
+        return seen
+
+    def _read_xlsx(self, keyword):
+        """Records of the keyword's existing Excel export (e.g. curated before the CSV existed)."""
+        path = self.xlsx_path(keyword)
+        if not os.path.exists(path):
+            return []
+        import pandas as pd
+
+        return pd.read_excel(path, dtype=str).fillna("").to_dict("records")
+
+    def _write_fresh(self, keyword, seen, records):
+        """Appends the records whose key is not in seen (caller holds the keyword lock)."""
+        fresh = []
+        for rec in records:
+            key = record_key(rec)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(rec)
+        if not fresh:
+            return 0
+        path = self.csv_path(keyword)
+        new_file = not os.path.exists(path)
+        with open(path, "a", encoding="utf-8-sig" if new_file else "utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RECORD_COLUMNS, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            writer.writerows(fresh)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(fresh)
+
+    def append(self, keyword, records):
+        """Appends records not collected before. Returns the number written."""
+        with self._lock_for(keyword):
+            return self._write_fresh(keyword, self._seen_for(keyword), records)
+
+    def count(self, keyword):
+        with self._lock_for(keyword):
+            return len(self._seen_for(keyword))
+
+    def export_xlsx(self, keyword):
+        """
+        Writes the keyword's CSV as the Excel export read by 2_data_coding.py.
+        Only call this once the keyword's crawl is complete; the workbook is replaced atomically.
+        """
+        import pandas as pd
+
+        with self._lock_for(keyword):
+            self._seen_for(keyword)  # Merges an existing workbook into the CSV first
+            path = self.csv_path(keyword)
+            if not os.path.exists(path):
+                return None
+            df = pd.read_csv(path, encoding="utf-8-sig", dtype=str)
+            target = self.xlsx_path(keyword)
+            tmp = target + ".tmp.xlsx"
+            df.to_excel(tmp, index=False)
+            os.replace(tmp, target)
+        return target
+
+
+def _fast_forward(browser, html, pages, keyword):
+    """Follows next-page links without storing anything (resume fallback)."""
+    for _ in range(pages):
+        nxt = parse_results(html, browser.current_url, keyword)["next_url"]
+        if not nxt:
+            return None
+        with instrumentation.span("fetch"):
+            html = browser.open(nxt)
+        instrumentation.count("pages_fast_forwarded")
+    return html
+
+
+def crawl_window(browser, store, checkpoint, keyword, begin, end, first_html=None, max_pages=None):
+    """
+    Crawls every results page of one keyword/date-window search.
+    browser must provide search(keyword, begin, end), open(url) and current_url.
+    first_html lets a caller hand over a results page it has already loaded.
+    Returns the number of new records written.
+    """
+    key = unit_key(keyword, begin, end)
+    state = checkpoint.get(key)
+    if state.get("done"):
+        print(f"[=] Already complete: {keyword} {begin}-{end}")
+        return 0
+
+    pages_done = state.get("pages_done", 0)
+    html = None
+    if pages_done and state.get("next_url"):
+        # Resume straight from the saved next-page URL while the server still holds the result set
+        with instrumentation.span("fetch"):
+            html = browser.open(state["next_url"])
+        if parse_results(html, browser.current_url, keyword)["no_result"]:
+            html = None
+    if html is None:
+        if first_html is not None:
+            html = first_html
+        else:
+            with instrumentation.span("fetch"):
+                html = browser.search(keyword, begin, end)
+        if pages_done:
+            print(f"[*] Resuming {keyword} {begin}-{end} after page {pages_done}")
+            html = _fast_forward(browser, html, pages_done, keyword)
+            if html is None:
+                checkpoint.update(key, done=True, next_url=None)
+                return 0
+
+    written = 0
+    while True:
+        result = parse_results(html, browser.current_url, keyword)
+        with instrumentation.span("store"):
+            new = store.append(keyword, result["records"])
+        written += new
+        instrumentation.count("pages_fetched")
+        instrumentation.count("records_fetched", len(result["records"]))
+        instrumentation.count("records_new", new)
+        pages_done += 1
+        done = not result["next_url"] or (max_pages is not None and pages_done >= max_pages)
+        checkpoint.update(
+            key,
+            pages_done=pages_done,
+            next_url=result["next_url"],
+            total=result["total"],
+            records=state.get("records", 0) + written,
+            done=done,
+        )
+        print(f"    [{keyword} {begin}-{end}] page {pages_done}: {len(result['records'])} rows, {new} new")
+        if done:
+            break
+        with instrumentation.span("fetch"):
+            html = browser.open(result["next_url"])
+    return written
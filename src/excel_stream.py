@@ -0,0 +1,97 @@
+"""
+Module: Excel Streaming
+Description: Row-batch readers for the raw_ads Excel exports and an incremental
+             hashed seen-set for deduplicating headlines across batches.
+             Peak memory is bounded by the batch size, not by the workbook size.
+"""
+
+import hashlib
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Rows per DataFrame yielded by iter_excel_batches
+BATCH_SIZE = 5000
+
+
+def iter_excel_batches(filepath, batch_size=BATCH_SIZE, sheet_name=None):
+    """
+    Reads a workbook in openpyxl read-only mode and yields DataFrames of at most
+    batch_size rows. The first row is used as the header (as in pd.read_excel).
+    Completely empty rows are skipped.
+    """
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            # Read-only rows can be shorter than the header when trailing cells are empty
+            if len(row) < len(columns):
+                row = tuple(row) + (None,) * (len(columns) - len(row))
+            batch.append(row[:len(columns)])
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        wb.close()
+
+
+class TitleDeduplicator:
+    """
+    Incremental equivalent of drop_duplicates(subset=[column], keep='first').
+    Only a 64-bit digest of each key is kept, so memory grows with the number
+    of distinct headlines rather than with their length.
+    """
+
+    _NULL_KEY = -1  # pandas treats all missing titles as one duplicate group
+
+    def __init__(self):
+        self.seen = set()
+
+    @staticmethod
+    def digest(value):
+        """
+        Returns a stable 64-bit integer key for a title (None/NaN collapse together).
+        The key is typed like pandas' hashing: 1 and "1" differ, while 1, 1.0 and True agree.
+        """
+        if value is None or (isinstance(value, float) and value != value):
+            return TitleDeduplicator._NULL_KEY
+        if isinstance(value, str):
+            key = "str:" + value
+        elif isinstance(value, (bool, int, float)) and float(value).is_integer():
+            key = f"num:{int(value)}"
+        else:
+            key = f"{type(value).__name__}:{value}"
+        raw = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(raw, "big")
+
+    def first_seen_mask(self, values):
+        """Returns a list of booleans marking values not seen in any earlier call."""
+        mask = []
+        seen = self.seen
+        for value in values:
+            key = self.digest(value)
+            if key in seen:
+                mask.append(False)
+            else:
+                seen.add(key)
+                mask.append(True)
+        return mask
+
+    def filter(self, df, column):
+        """Drops rows whose column value has already been seen."""
+        return df[self.first_seen_mask(df[column].tolist())]
+
+    def __len__(self):
+        return len(self.seen)
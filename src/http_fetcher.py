@@ -0,0 +1,196 @@
+"""
+Module: HTTP Fetcher
+Description: Browser-free fast path for the scraper. Selenium is only used to log in;
+             the captured cookies are replayed over a pooled keep-alive HTTP client
+             which submits the 'Advertisement Search' form and fetches result pages
+             directly. Exposes the same search()/open()/current_url interface as
+             scraper_engine.BrowserSession, so the crawl and the engine work unchanged.
+"""
+
+import re
+from html.parser import HTMLParser
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin, urlsplit
+
+import urllib3
+
+from scraper_engine import FIELD_BEGIN, FIELD_END, FIELD_KEYWORD, FIELD_SUBMIT
+
+# --- Configuration ---
+TIMEOUT = 30  # Seconds
+MAX_REDIRECTS = 10
+POOL_SIZE = 8  # Keep-alive connections per host
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+class FetchError(Exception):
+    pass
+
+
+def make_pool(size=POOL_SIZE, timeout=TIMEOUT):
+    """
+    One PoolManager shared by all sessions; it is thread-safe and keeps connections alive.
+    Server errors are retried for idempotent methods only (urllib3's default set), so a
+    search POST is never submitted twice.
+    """
+    retries = urllib3.Retry(total=3, backoff_factor=0.5, redirect=False,
+                            status_forcelist=(500, 502, 503, 504))
+    return urllib3.PoolManager(num_pools=16, maxsize=size, block=True, retries=retries,
+                               timeout=urllib3.Timeout(total=timeout))
+
+
+def decode_body(response):
+    """Decodes a response using the header or <meta> charset (GB pages are common here)."""
+    data = response.data
+    charset = response.headers.get("Content-Type", "").partition("charset=")[2].strip(' ;"\'')
+    if not charset:
+        m = _CHARSET_RE.search(data[:2048])
+        charset = m.group(1).decode("ascii") if m else "utf-8"
+    if charset.lower() in ("gb2312", "gbk"):
+        charset = "gb18030"
+    return data.decode(charset, errors="replace"), charset
+
+
+class _FormParser(HTMLParser):
+    """Collects every form's action, method and input fields."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self.forms.append({"action": attrs.get("action") or "", "method": (attrs.get("method") or "get").lower(),
+                               "fields": [], "images": []})
+        elif tag in ("input", "select", "textarea") and self.forms and attrs.get("name"):
+            kind = (attrs.get("type") or "text").lower()
+            if kind == "image":
+                self.forms[-1]["images"].append(attrs["name"])
+            elif kind not in ("submit", "button", "reset", "file") and (kind not in ("checkbox", "radio") or "checked" in attrs):
+                self.forms[-1]["fields"].append((attrs["name"], attrs.get("value") or ""))
+
+
+def parse_search_form(html, base_url):
+    """
+    Finds the form containing the keyword field.
+    Returns: dict with absolute 'action', 'method', ordered 'fields' (name, default value)
+             and 'images' (names of image submit buttons).
+    """
+    parser = _FormParser()
+    parser.feed(html)
+    parser.close()
+    for form in parser.forms:
+        if any(name == FIELD_KEYWORD for name, _ in form["fields"]):
+            form["action"] = urljoin(base_url, form["action"] or base_url)
+            return form
+    raise FetchError(f"Search form not found on {base_url} (session expired?)")
+
+
+class CookieJar:
+    """Minimal host-matched cookie store seeded from Selenium's get_cookies() output."""
+
+    def __init__(self, cookies=()):
+        self.cookies = {}
+        for c in cookies:
+            self.set(c["name"], c["value"], c.get("domain") or "", c.get("path") or "/")
+
+    def set(self, name, value, domain="", path="/"):
+        self.cookies[(domain.lstrip(".").lower(), path, name)] = value
+
+    def update_from(self, response, url):
+        host = urlsplit(url).hostname or ""
+        for header in response.headers.getlist("Set-Cookie"):
+            parsed = SimpleCookie()
+            try:
+                parsed.load(header)
+            except Exception:
+                continue
+            for name, morsel in parsed.items():
+                self.set(name, morsel.value, morsel["domain"] or host, morsel["path"] or "/")
+
+    def header_for(self, url):
+        parts = urlsplit(url)
+        host, path = (parts.hostname or "").lower(), parts.path or "/"
+        pairs = [
+            f"{name}={value}"
+            for (domain, cpath, name), value in self.cookies.items()
+            if (not domain or host == domain or host.endswith("." + domain)) and path.startswith(cpath)
+        ]
+        return "; ".join(pairs)
+
+
+class HttpSession:
+    """
+    Browser-free session replaying a captured login (see scraper_engine.capture_session).
+    search() and open() return decoded HTML, like BrowserSession.
+    """
+
+    def __init__(self, session, pool=None, timeout=TIMEOUT):
+        self.session = session
+        self.search_url = session["url"]
+        self.pool = pool or make_pool(timeout=timeout)
+        self.jar = CookieJar(session.get("cookies", []))
+        self.current_url = self.search_url
+        self.charset = "utf-8"
+        self._form = None
+
+    def request(self, method, url, fields=None):
+        """Sends a request, following redirects and keeping cookies. Returns the decoded body."""
+        body = None
+        headers = {"User-Agent": USER_AGENT}
+        if fields is not None:
+            encoded = urlencode(fields, encoding=self.charset)
+            if method == "GET":
+                url = url.split("?")[0] + "?" + encoded
+            else:
+                body = encoded
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+        for _ in range(MAX_REDIRECTS):
+            cookie = self.jar.header_for(url)
+            if cookie:
+                headers["Cookie"] = cookie
+            else:
+                headers.pop("Cookie", None)
+            if self.current_url:
+                headers["Referer"] = self.current_url
+            response = self.pool.request(method, url, body=body, headers=headers, redirect=False)
+            self.jar.update_from(response, url)
+            if response.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response.headers["Location"])
+                if response.status in (301, 302, 303):
+                    method, body = "GET", None
+                    headers.pop("Content-Type", None)
+                continue
+            if response.status >= 400:
+                raise FetchError(f"HTTP {response.status} for {url}")
+            self.current_url = url
+            html, self.charset = decode_body(response)
+            return html
+        raise FetchError(f"Too many redirects for {url}")
+
+    def form(self):
+        """The search form, fetched once per session."""
+        if self._form is None:
+            html = self.request("GET", self.search_url)
+            self._form = parse_search_form(html, self.current_url)
+        return self._form
+
+    def search(self, keyword, begin, end):
+        """Submits the search form exactly as the browser would (image button included)."""
+        form = self.form()
+        values = {FIELD_KEYWORD: keyword, FIELD_BEGIN: begin, FIELD_END: end}
+        fields = [(name, values.pop(name, default)) for name, default in form["fields"]]
+        fields.extend(values.items())
+        submit = FIELD_SUBMIT if FIELD_SUBMIT in form["images"] else (form["images"] or [None])[0]
+        if submit:
+            fields += [(f"{submit}.x", "10"), (f"{submit}.y", "10")]
+        return self.request(form["method"].upper(), form["action"], fields)
+
+    def open(self, url):
+        return self.request("GET", url)
+
+    def close(self):
+        pass
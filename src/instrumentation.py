@@ -0,0 +1,248 @@
+"""
+Module: Instrumentation
+Description: Small run-instrumentation layer shared by the five pipeline stages.
+             Timed spans around load/transform/write steps, counters (rows loaded,
+             deduplicated, unclassified, QC-dropped, cache hits ...) and gauges are
+             collected for the active run; --profile adds cProfile and tracemalloc.
+             At the end of a run a structured JSON report is written to data/reports/.
+Usage:   with instrumentation.run("coding", profile=args.profile):
+             with instrumentation.span("load"):
+                 ...
+             instrumentation.count("rows_loaded", len(df))
+         with instrumentation.scope("coding"):  # pipeline.py: counters become coding/rows_loaded
+             ...
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(BASE_DIR, "data", "reports")
+PROFILE_TOP = 25  # Functions listed in the report, by cumulative time
+ALLOC_TOP = 10  # Allocation sites listed in the report
+
+
+class Run:
+    """Spans, counters and gauges of one stage run. Thread-safe."""
+
+    def __init__(self, stage, profile=False):
+        self.stage = stage
+        self.profile = profile
+        self.started_at = datetime.now()
+        self.status = "ok"
+        self.error = None
+        self.spans = {}  # Nested name -> {"calls", "seconds"}, in first-seen order
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiler = None
+        self._start = time.perf_counter()
+        self.wall_seconds = None
+
+    # --- collection ---
+    @contextmanager
+    def span(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        key = "/".join(stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                entry = self.spans.setdefault(key, {"calls": 0, "seconds": 0.0})
+                entry["calls"] += 1
+                entry["seconds"] += elapsed
+
+    @contextmanager
+    def scope(self, name):
+        """
+        A span whose counters and gauges are recorded as '<name>/<counter>' on this thread,
+        so stages running side by side in one run (pipeline.py) keep separate numbers.
+        """
+        outer = getattr(self._local, "scope", None)
+        self._local.scope = name if outer is None else f"{outer}/{name}"
+        try:
+            with self.span(name):
+                yield
+        finally:
+            self._local.scope = outer
+
+    def _key(self, name):
+        scope = getattr(self._local, "scope", None)
+        return name if scope is None else f"{scope}/{name}"
+
+    def count(self, name, n=1):
+        key = self._key(name)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + int(n)
+
+    def gauge(self, name, value):
+        key = self._key(name)
+        with self._lock:
+            self.gauges[key] = value
+
+    # --- profiling (cProfile, pstats and tracemalloc are only imported for --profile) ---
+    def start_profiling(self):
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profiling(self, report_dir, stem):
+        """Stops cProfile/tracemalloc; returns the report sections and dumps the .prof file."""
+        import io
+        import pstats
+        import tracemalloc
+
+        self._profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        prof_file = os.path.join(report_dir, f"{stem}.prof")
+        self._profiler.dump_stats(prof_file)
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        top = []
+        for func, (cc, nc, tt, ct, _) in sorted(stats.stats.items(), key=lambda kv: -kv[1][3])[:PROFILE_TOP]:
+            filename, line, name = func
+            top.append({
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": nc,
+                "tottime": round(tt, 6),
+                "cumtime": round(ct, 6),
+            })
+        allocations = [
+            {"site": str(stat.traceback[0]), "size_mb": round(stat.size / 2**20, 3), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:ALLOC_TOP]
+        ]
+        profile = {"file": prof_file, "top_cumulative": top}
+        memory = {"tracemalloc_peak_mb": round(peak / 2**20, 3), "top_allocations": allocations}
+        return profile, memory
+
+    # --- report ---
+    def report(self):
+        wall = self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self._start
+        spans = [
+            {
+                "name": name,
+                "calls": entry["calls"],
+                "seconds": round(entry["seconds"], 6),
+                "share": round(entry["seconds"] / wall, 4) if wall else None,
+            }
+            for name, entry in self.spans.items()
+        ]
+        memory = {}
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            memory["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return {
+            "stage": self.stage,
+            "started": self.started_at.isoformat(timespec="seconds"),
+            "status": self.status,
+            "error": self.error,
+            "wall_seconds": round(wall, 6),
+            "spans": spans,
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "memory": memory,
+        }
+
+    def write(self, report_dir=REPORT_DIR):
+        os.makedirs(report_dir, exist_ok=True)
+        stem = f"{self.stage}_{self.started_at:%Y%m%d_%H%M%S}_{self.started_at.microsecond // 1000:03d}"
+        profile = memory = None
+        if self._profiler is not None:
+            profile, memory = self.stop_profiling(report_dir, stem)
+        self.wall_seconds = time.perf_counter() - self._start
+        report = self.report()
+        if profile:
+            report["profile"] = profile
+            report["memory"].update(memory)
+        path = os.path.join(report_dir, f"{stem}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        return path, report
+
+
+# --- Module-level API (no-ops when no run is active) ---
+_ACTIVE = None
+
+
+def active():
+    return _ACTIVE
+
+
+def span(name):
+    return _ACTIVE.span(name) if _ACTIVE is not None else nullcontext()
+
+
+def scope(name):
+    return _ACTIVE.scope(name) if _ACTIVE is not None else nullcontext()
+
+
+def count(name, n=1):
+    if _ACTIVE is not None:
+        _ACTIVE.count(name, n)
+
+
+def gauge(name, value):
+    if _ACTIVE is not None:
+        _ACTIVE.gauge(name, value)
+
+
+def print_summary(report, path):
+    print(f"[*] Run report: {path} ({report['wall_seconds']:.2f} s, status: {report['status']})")
+    top_level = [s for s in report["spans"] if "/" not in s["name"]]
+    for s in sorted(top_level, key=lambda s: -s["seconds"])[:5]:
+        print(f"    {s['name']:<20} {s['seconds']:8.3f} s  ({s['calls']} calls)")
+    if "profile" in report:
+        print(f"    Profile: {report['profile']['file']}")
+
+
+@contextmanager
+def run(stage, profile=False, report_dir=REPORT_DIR, quiet=False):
+    """
+    Activates a Run for the enclosed block and writes its report at the end,
+    including when the block fails (status 'failed' with the error message).
+    """
+    global _ACTIVE
+    current = Run(stage, profile)
+    _ACTIVE = current
+    if profile:
+        current.start_profiling()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "interrupted" if isinstance(e, KeyboardInterrupt) else "failed"
+        current.error = repr(e)
+        raise
+    finally:
+        _ACTIVE = None
+        path, report = current.write(report_dir)
+        if not quiet:
+            print_summary(report, path)
+
+
+def add_arguments(parser):
+    """Adds the shared --profile flag to a stage's argument parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Capture cProfile and tracemalloc data in the run report (slower).")
+    return parser
@@ -0,0 +1,218 @@
+"""
+Module: Mock Shen Bao Server
+Description: Local stand-in for the database's VPN portal, 'Advertisement Search' form,
+             paginated results and detail pages, used to exercise 1_scraper.py without
+             network access. Result sets are deterministic per keyword and date range.
+Usage: python mock_shenbao.py --port 8765
+       python 1_scraper.py --engine --target-url http://127.0.0.1:8765/go --auto-login
+"""
+
+import argparse
+import hashlib
+import html
+import itertools
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# Form field names mirrored from the real search page
+FIELD_KEYWORD = "FullText,Subtitle1,Subtitle2,Articletitle+"
+FIELD_BEGIN = "begintime"
+FIELD_END = "endtime"
+
+COOKIE_NAME = "vpn_session"
+PAGE_SIZE = 20
+MAX_PAGES = 50  # Like the real server, deep pages beyond this are not served
+DAILY_RATE = 3  # Roughly one ad per DAILY_RATE days per keyword
+
+_TITLE_PARTS = ["美容", "補腦汁", "函授學校", "神經衰弱", "新藥", "香粉", "科學", "秘方", "大減價", "招生"]
+
+
+def _parse_date(text):
+    y, m, d = (int(x) for x in text.strip().split("."))
+    return date(y, m, d)
+
+
+def generate_records(keyword, begin, end):
+    """Deterministic fake advertisements for keyword between begin and end (inclusive)."""
+    records = []
+    day = _parse_date(begin)
+    last = _parse_date(end)
+    while day <= last:
+        stamp = day.strftime("%Y.%m.%d")
+        h = int(hashlib.md5(f"{keyword}|{stamp}".encode("utf-8")).hexdigest(), 16)
+        if h % DAILY_RATE == 0:
+            title = keyword + _TITLE_PARTS[h % len(_TITLE_PARTS)] + _TITLE_PARTS[(h >> 8) % len(_TITLE_PARTS)]
+            records.append({
+                "日期": stamp,
+                "版次": str(1 + (h >> 16) % 24),
+                "完整标题": title,
+                "详情": f"上海{_TITLE_PARTS[(h >> 24) % len(_TITLE_PARTS)]}公司",
+            })
+        day += timedelta(days=1)
+    return records
+
+
+class MockState:
+    """Server-side result sets, keyed by resultid like the real site."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.results = {}
+        self.ids = itertools.count(1000)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def new_result(self, keyword, begin, end):
+        with self.lock:
+            rid = next(self.ids)
+            self.results[rid] = (keyword, generate_records(keyword, begin, end))
+        return rid
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None  # Set by make_server
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers ---
+    def _send(self, body, status=200, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location, headers=None):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def _logged_in(self):
+        return f"{COOKIE_NAME}=ok" in (self.headers.get("Cookie") or "")
+
+    def _params(self):
+        query = parse_qs(urlsplit(self.path).query)
+        if self.command == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            query.update(parse_qs(self.rfile.read(length).decode("utf-8")))
+        return {k: v[0] for k, v in query.items()}
+
+    # --- routes ---
+    def do_GET(self):
+        self._route()
+
+    def do_POST(self):
+        self._route()
+
+    def _route(self):
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        if state.latency:
+            time.sleep(state.latency)
+        path = urlsplit(self.path).path
+        if path == "/go":
+            # Portal login: hands out the session cookie and lands on the search page
+            return self._redirect("/search", {"Set-Cookie": f"{COOKIE_NAME}=ok; Path=/"})
+        if not self._logged_in():
+            return self._redirect("/go")
+        if path == "/search":
+            return self._send(self._search_page())
+        if path == "/result":
+            return self._result_page(self._params())
+        if path == "/detail":
+            return self._send(f"<html><body><div class='detail'>record {html.escape(self._params().get('record', ''))}</div></body></html>")
+        return self._send("<html><body>Not Found</body></html>", status=404)
+
+    def _search_page(self):
+        return f"""<html><head><title>广告检索</title></head><body>
+<form name="searchform" action="/result" method="post">
+  <input type="hidden" name="ChannelID" value="3000">
+  <input type="text" name="{html.escape(FIELD_KEYWORD)}" value="">
+  <input type="text" name="{FIELD_BEGIN}" value="">
+  <input type="text" name="{FIELD_END}" value="">
+  <input type="image" name="image1" src="/search.gif">
+</form></body></html>"""
+
+    def _result_page(self, params):
+        state = self.state
+        if "resultid" in params:
+            rid = int(params["resultid"])
+            if rid not in state.results:
+                return self._send("<html><body><div class='no-result'>检索结果已过期</div></body></html>")
+        else:
+            keyword = params.get(FIELD_KEYWORD, "")
+            rid = state.new_result(keyword, params.get(FIELD_BEGIN, "1927.01.01"), params.get(FIELD_END, "1927.01.01"))
+        keyword, records = state.results[rid]
+        page = int(params.get("page", 1))
+        total = len(records)
+        pages = min(MAX_PAGES, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+
+        if total == 0:
+            return self._send("<html><body><div class='no-result'>没有检索到相关记录</div></body></html>")
+        if page > pages:
+            return self._send("<html><body><div class='no-result'>超出可浏览页数</div></body></html>")
+
+        rows = []
+        start = (page - 1) * PAGE_SIZE
+        for i, rec in enumerate(records[start:start + PAGE_SIZE], start=start + 1):
+            link = "detail?" + urlencode({"record": i, "resultid": rid})
+            rows.append(
+                "<tr class='record'>"
+                f"<td class='keyword'>{html.escape(keyword)}</td>"
+                f"<td class='date'>{rec['日期']}</td>"
+                f"<td class='page'>{rec['版次']}</td>"
+                f"<td class='title'><a href='{html.escape(link)}'>{html.escape(rec['完整标题'])}</a></td>"
+                f"<td class='detail'>{html.escape(rec['详情'])}</td>"
+                "</tr>"
+            )
+        nav = ""
+        if page < pages:
+            nav = f"<a class='next' href='/result?{urlencode({'resultid': rid, 'page': page + 1})}'>下一页</a>"
+        body = (
+            "<html><body>"
+            f"<div id='hits'>共 <span class='total'>{total}</span> 条 第 <span class='current'>{page}</span>/{pages} 页</div>"
+            f"<table class='result-list'>{''.join(rows)}</table>{nav}"
+            "</body></html>"
+        )
+        return self._send(body)
+
+
+def make_server(port=8765, host="127.0.0.1", latency=0.0):
+    """Creates (but does not start) a mock server; .state exposes request counters."""
+    state = MockState(latency)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.state = state
+    return server
+
+
+def serve_in_thread(port=0, latency=0.0):
+    """Starts a mock server on a background thread. Returns (server, base_url)."""
+    server = make_server(port, latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, bound = server.server_address[:2]
+    return server, f"http://{host}:{bound}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Shen Bao search site.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request.")
+    args = parser.parse_args()
+    srv = make_server(args.port, latency=args.latency)
+    print(f"[*] Mock Shen Bao server on http://127.0.0.1:{args.port}/go")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+"""
+Module: Near-Duplicate Detection
+Description: MinHash / LSH clustering of advertisement headlines. The same ad reprinted
+             over weeks (OCR variants, full-width spaces, Traditional vs Simplified forms)
+             is grouped into one cluster in roughly linear time: headlines are normalized,
+             cut into character shingles, summarized by MinHash signatures, and only
+             headlines sharing an LSH band are compared. Clusters are merged with a
+             vectorized union-find.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+from zh_convert import to_simplified
+
+# --- Configuration ---
+SHINGLE_SIZE = 2  # Character bigrams suit short Chinese headlines
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: candidate pairs from a Jaccard similarity of about 0.5
+THRESHOLD = 0.7  # Estimated Jaccard similarity required to merge two headlines
+CHUNK_SIZE = 100000  # Headlines per signature block (bounds peak memory)
+SEED = 1927
+
+_PRIME = np.uint64(4294967291)  # Largest prime below 2**32; a*x + b stays within uint64
+_STRIP_RE = re.compile(r"[\s　\W_]+")
+
+
+def normalize_headline(text):
+    """Simplified Chinese, without whitespace (incl. full-width spaces) and punctuation."""
+    if not isinstance(text, str):
+        return ""
+    return _STRIP_RE.sub("", to_simplified(text)).lower()
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """Distinct 32-bit hashes of the character k-grams of a normalized headline."""
+    if len(text) <= k:
+        grams = {text} if text else set()
+    else:
+        grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+    return [zlib.crc32(g.encode("utf-8")) for g in grams]
+
+
+def _permutations(num_perm, seed=SEED):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, k=SHINGLE_SIZE, chunk_size=CHUNK_SIZE, seed=SEED):
+    """
+    MinHash signatures of normalized, non-empty texts.
+    Returns: (n, num_perm) uint32 array.
+    Shingle hashes of a block of texts are laid out flat with row offsets, so every
+    permutation is one vectorized pass plus np.minimum.reduceat.
+    """
+    a, b = _permutations(num_perm, seed)
+    sigs = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), chunk_size):
+        block = [shingle_hashes(t, k) for t in texts[start:start + chunk_size]]
+        lengths = np.fromiter((len(h) for h in block), dtype=np.int64, count=len(block))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        flat = np.fromiter((x for h in block for x in h), dtype=np.uint64, count=int(lengths.sum()))
+        for j in range(num_perm):
+            hashed = (a[j] * flat + b[j]) % _PRIME
+            sigs[start:start + len(block), j] = np.minimum.reduceat(hashed, offsets)
+    return sigs
+
+
+def _band_keys(band):
+    """Collapses the rows of one band into a single 64-bit key per signature."""
+    key = np.zeros(len(band), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in band.T:
+            key = key * np.uint64(1000003) ^ col.astype(np.uint64)
+    return key
+
+
+def _connected_labels(n, left, right):
+    """Union-find over edges by min-label propagation with pointer jumping."""
+    labels = np.arange(n)
+    if len(left) == 0:
+        return labels
+    while True:
+        low = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, low)
+        np.minimum.at(updated, right, low)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def cluster_signatures(sigs, bands=BANDS, threshold=THRESHOLD):
+    """
+    LSH banding: signatures agreeing on a whole band are candidates; a candidate pair
+    is kept if its estimated Jaccard similarity reaches threshold.
+    Returns: cluster label per row (the lowest row index of its cluster).
+    """
+    n, num_perm = sigs.shape
+    rows = num_perm // bands
+    left, right = [], []
+    for i in range(bands):
+        keys = _band_keys(sigs[:, i * rows:(i + 1) * rows])
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        # Link every member of a bucket to the bucket's first member
+        heads = order[np.flatnonzero(starts)[np.cumsum(starts) - 1]]
+        mask = heads != order
+        if not mask.any():
+            continue
+        u, v = heads[mask], order[mask]
+        similar = (sigs[u] == sigs[v]).mean(axis=1) >= threshold
+        left.append(u[similar])
+        right.append(v[similar])
+    if not left:
+        return np.arange(n)
+    return _connected_labels(n, np.concatenate(left), np.concatenate(right))
+
+
+def near_duplicate_clusters(titles, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """
+    Clusters headlines. Identical normalized forms always share a cluster; missing or
+    empty headlines are left alone.
+    Returns: numpy array with, for every title, the position of its cluster's first title.
+    """
+    normalized = [normalize_headline(t) for t in titles]
+    # Identical normalized headlines are merged exactly; MinHash runs once per distinct form
+    forms, inverse = np.unique(np.array(normalized, dtype=object), return_inverse=True)
+    first_pos = np.full(len(forms), len(titles), dtype=np.int64)
+    np.minimum.at(first_pos, inverse, np.arange(len(titles)))
+
+    labels = np.arange(len(forms))
+    candidates = np.flatnonzero(forms != "")
+    if len(candidates) > 1:
+        sigs = minhash_signatures(list(forms[candidates]), num_perm)
+        labels[candidates] = candidates[cluster_signatures(sigs, bands, threshold)]
+
+    # Represent every cluster by its earliest headline in input order
+    rep = np.full(len(forms), len(titles), dtype=np.int64)
+    np.minimum.at(rep, labels, first_pos)
+    cluster_first = rep[labels]
+    result = cluster_first[inverse]
+    empty = forms[inverse] == ""
+    result[empty] = np.arange(len(titles))[empty]
+    return result
+
+
+def collapse_near_duplicates(df, column="完整标题", threshold=THRESHOLD, copies=None):
+    """
+    Keeps the first row of each near-duplicate cluster (the canonical representative,
+    as with drop_duplicates(keep='first')) and records the cluster's row count in
+    'Cluster_Size'. copies gives the number of appearances each row stands for (e.g.
+    exact reprints already removed by drop_duplicates); by default every row counts once.
+    """
+    clusters = near_duplicate_clusters(df[column].tolist(), threshold)
+    weights = None if copies is None else np.asarray(copies, dtype=np.float64)
+    sizes = np.bincount(clusters, weights=weights, minlength=len(df)).astype(np.int64)
+    keep = clusters == np.arange(len(df))
+    out = df[keep].copy()
+    out["Cluster_Size"] = sizes[keep]
+    return out
@@ -0,0 +1,426 @@
+"""
+Module: Headline N-gram Index
+Description: Persistent character unigram/bigram inverted index over the coded corpus,
+             for trying candidate CODE_DICT / STOPWORDS terms without rescanning every
+             完整标题. Headlines are indexed in their Simplified form (zh_convert), and
+             queries are normalized the same way, so Traditional and Simplified spellings
+             find each other.
+             Postings are stored CSR-style per segment: a sorted int64 term-key array,
+             byte offsets, and one uint8 blob of delta + varint encoded doc ids, decoded
+             with NumPy. New coded rows are appended as new segments (one per SEGMENT_ROWS
+             when synced batch by batch, as in --stream coding); headlines that
+             left the corpus are marked dead, and segments are compacted when they pile up.
+Usage: python ngram_index.py 补脑 神经衰弱 --category Health --limit 10
+       python ngram_index.py --rebuild
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from zh_convert import convert_series, to_simplified
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.path.join(BASE_DIR, "data", "cache", "ngram_index")
+STORE_DIR = os.path.join(BASE_DIR, "data", "corpus")
+LEGACY_CSV = os.path.join(BASE_DIR, "data", "encoded_ads.csv")
+
+TITLE_COL = "完整标题"
+META_COLUMNS = ["Category", "关键词", "日期", "Strategy"]  # Kept per doc for counts and filters
+MANIFEST_NAME = "manifest.json"
+DOCS_NAME = "docs.parquet"
+SEGMENT_ROWS = 100_000  # New headlines per segment while syncing batch by batch
+MAX_SEGMENTS = 8  # More segments than this are merged into one
+MAX_DEAD_SHARE = 0.3  # ... as are indexes in which this share of docs is dead
+KWIC_WIDTH = 12
+
+
+# --- Varint postings ---
+def encode_varints(values):
+    """LEB128 bytes of non-negative ints, vectorized; returns (uint8 blob, bytes per value)."""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        nbytes += values >= (np.uint64(1) << np.uint64(shift))
+    owner = np.repeat(np.arange(len(values)), nbytes)
+    starts = np.cumsum(nbytes) - nbytes
+    position = np.arange(len(owner)) - starts[owner]
+    blob = ((values[owner] >> (np.uint64(7) * position.astype(np.uint64))) & np.uint64(0x7F)).astype(np.uint8)
+    # Continuation bit on every byte but the last of each value
+    blob[position < nbytes[owner] - 1] |= 0x80
+    return blob, nbytes
+
+
+def decode_varints(blob):
+    """Inverse of encode_varints: int64 values of a uint8 blob."""
+    if len(blob) == 0:
+        return np.zeros(0, dtype=np.int64)
+    blob = np.asarray(blob)
+    ends = blob < 0x80
+    starts = np.r_[0, np.flatnonzero(ends[:-1]) + 1]
+    owner = np.cumsum(np.r_[0, ends[:-1]])
+    position = np.arange(len(blob)) - starts[owner]
+    payload = (blob & 0x7F).astype(np.int64) << (7 * position)
+    return np.add.reduceat(payload, starts)
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+
+def _bigram_keys(codes):
+    # Code points stay below 2**21, so bigram keys sit above every unigram key
+    return ((codes[:-1] + 1) << 21) | codes[1:]
+
+
+def query_keys(text):
+    """Gram keys every match of text must contain: its bigrams, or its single character."""
+    codes = _code_points(text)
+    return codes if len(codes) == 1 else np.unique(_bigram_keys(codes))
+
+
+def build_segment(texts, first_id):
+    """
+    CSR postings for texts numbered first_id, first_id + 1, ...
+    Returns {"keys": sorted term keys, "offsets": byte offsets (len keys + 1),
+             "counts": doc frequency per key, "postings": uint8 blob}.
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    codes = _code_points("".join(texts))
+    doc = np.repeat(np.arange(first_id, first_id + len(texts), dtype=np.int64), lengths)
+    same_doc = doc[:-1] == doc[1:]  # No bigrams across headline boundaries
+    keys = np.concatenate([codes, _bigram_keys(codes)[same_doc]])
+    docs = np.concatenate([doc, doc[:-1][same_doc]])
+
+    # Distinct (key, doc) pairs, sorted by key then doc id
+    order = np.lexsort((docs, keys))
+    keys, docs = keys[order], docs[order]
+    keep = np.r_[True, (keys[1:] != keys[:-1]) | (docs[1:] != docs[:-1])]
+    keys, docs = keys[keep], docs[keep]
+
+    term_start = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    deltas = np.diff(docs, prepend=0)
+    deltas[term_start] = docs[term_start]  # Each posting list starts with an absolute id
+    blob, nbytes = encode_varints(deltas)
+    byte_pos = np.r_[0, np.cumsum(nbytes)]
+    return {
+        "keys": keys[term_start],
+        "offsets": np.r_[byte_pos[term_start], byte_pos[-1]],
+        "counts": np.diff(np.r_[term_start, len(keys)]),
+        "postings": blob,
+    }
+
+
+# --- Index ---
+class NgramIndex:
+    """
+    Docs table (headline, Simplified text, metadata, Live flag; row = doc id)
+    plus postings segments, kept under index_dir.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.manifest = {"segments": [], "next_segment": 0}
+        self.reset()
+        manifest_path = os.path.join(index_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            self.docs = pd.read_parquet(os.path.join(index_dir, DOCS_NAME))
+            for name in self.manifest["segments"]:
+                with np.load(os.path.join(index_dir, name)) as seg:
+                    self.segments.append({k: seg[k] for k in seg.files})
+
+    def reset(self):
+        """Empties the index in memory (saved files are replaced on the next save)."""
+        self.manifest["segments"] = []
+        self.segments = []
+        self.docs = pd.DataFrame({TITLE_COL: pd.Series(dtype=object), "Text": pd.Series(dtype=object),
+                                  "Live": pd.Series(dtype=bool)})
+        self._pending = []  # Segments not written yet
+        self._live_titles = None
+        self._docs_changed()
+
+    def column(self, name):
+        """A docs column as a NumPy array, converted once per docs change (not per query)."""
+        if name not in self._arrays:
+            self._arrays[name] = self.docs[name].to_numpy()
+        return self._arrays[name]
+
+    def _docs_changed(self):
+        self._arrays = {}
+
+    def exists(self):
+        return bool(self.manifest["segments"])
+
+    def __len__(self):
+        return int(self.docs["Live"].sum())
+
+    # --- queries ---
+    def _lookup(self, key):
+        """(segment, term position) of every segment that contains key."""
+        for seg in self.segments:
+            i = np.searchsorted(seg["keys"], key)
+            if i < len(seg["keys"]) and seg["keys"][i] == key:
+                yield seg, i
+
+    def postings(self, key):
+        """Doc ids (ascending, all segments) containing one gram key."""
+        parts = [np.cumsum(decode_varints(seg["postings"][seg["offsets"][i]:seg["offsets"][i + 1]]))
+                 for seg, i in self._lookup(key)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def _doc_frequency(self, key):
+        return sum(int(seg["counts"][i]) for seg, i in self._lookup(key))
+
+    def search(self, query, category=None, strategy=None):
+        """Doc ids of live headlines containing query (either script), optionally filtered."""
+        text = to_simplified(query.strip())
+        if not text:
+            return np.zeros(0, dtype=np.int64)
+        # Intersect the rarest posting lists first
+        keys = sorted(query_keys(text), key=self._doc_frequency)
+        ids = self.postings(keys[0])
+        for key in keys[1:]:
+            if not len(ids):
+                break
+            ids = np.intersect1d(ids, self.postings(key), assume_unique=True)
+        if len(text) > 2 and len(ids):
+            # Shared bigrams do not guarantee the whole string; confirm on the candidates
+            texts = self.column("Text")[ids]
+            ids = ids[np.fromiter((text in t for t in texts), dtype=bool, count=len(ids))]
+        mask = self.column("Live")[ids].astype(bool)
+        if category is not None and "Category" in self.docs.columns:
+            mask &= self.column("Category")[ids] == category
+        if strategy is not None and "Strategy" in self.docs.columns:
+            mask &= self.column("Strategy")[ids] == strategy
+        return ids[mask]
+
+    def headlines(self, ids):
+        return self.docs.iloc[ids].drop(columns=["Text", "Live"])
+
+    def counts(self, ids, column):
+        """Matches per value of a metadata column (e.g. Category, Strategy)."""
+        if column not in self.docs.columns:
+            return pd.Series(dtype=int)
+        return self.docs[column].iloc[ids].value_counts()
+
+    def kwic(self, ids, query, width=KWIC_WIDTH, limit=None):
+        """
+        (doc id, left, match, right) for every occurrence in the given docs. The original
+        headline is shown where the conversion kept its length, else the Simplified form.
+        """
+        text = to_simplified(query.strip())
+        lines = []
+        for doc_id in ids[:limit]:
+            simplified = self.column("Text")[doc_id]
+            original = self.column(TITLE_COL)[doc_id]
+            shown = original if len(original) == len(simplified) else simplified
+            start = simplified.find(text)
+            while start != -1:
+                end = start + len(text)
+                lines.append((int(doc_id), shown[max(0, start - width):start], shown[start:end], shown[end:end + width]))
+                start = simplified.find(text, start + 1)
+        return lines
+
+    # --- updates ---
+    def sync(self, df):
+        """
+        Brings the index in line with a coded corpus frame: new headlines are indexed
+        as one new segment, headlines no longer in df are marked dead, and the metadata
+        of the others is refreshed. Returns (added, removed).
+        """
+        update = self.updater()
+        update.add(df)
+        return update.commit()
+
+    def updater(self):
+        """Batch-wise sync for streamed corpora: add() every batch, then commit()."""
+        return IndexUpdate(self)
+
+    def live_titles(self):
+        """Headline -> doc id of the live docs."""
+        if self._live_titles is None:
+            live = np.flatnonzero(self.column("Live"))
+            self._live_titles = dict(zip(self.column(TITLE_COL)[live], live))
+        return self._live_titles
+
+    def append(self, new_docs):
+        """Adds docs (with Text) as a new segment; their ids continue after the existing ones."""
+        first_id = len(self.docs)
+        segment = build_segment(new_docs["Text"].tolist(), first_id)
+        if self._live_titles is not None:
+            self._live_titles.update(zip(new_docs[TITLE_COL], range(first_id, first_id + len(new_docs))))
+        new_docs = new_docs.assign(Live=True)
+        self.docs = new_docs.reset_index(drop=True) if first_id == 0 else pd.concat(
+            [self.docs, new_docs], ignore_index=True)
+        name = f"segment_{self.manifest['next_segment']:05d}.npz"
+        self.manifest["next_segment"] += 1
+        self.manifest["segments"].append(name)
+        self.segments.append(segment)
+        self._pending.append((name, segment))
+        self._docs_changed()
+
+    def compact(self):
+        """Rebuilds the postings as one segment over the live docs (renumbering them)."""
+        live = self.docs[self.docs["Live"]].drop(columns=["Live"])
+        self.reset()
+        if len(live):
+            self.append(live)
+
+    def needs_compaction(self):
+        dead = len(self.docs) - len(self)
+        return len(self.segments) > MAX_SEGMENTS or (len(self.docs) and dead / len(self.docs) > MAX_DEAD_SHARE)
+
+    def save(self):
+        """Writes new segments, the docs table and the manifest (last, so readers never see a partial index)."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        for name, segment in self._pending:
+            np.savez(os.path.join(self.index_dir, name), **segment)
+        self._pending = []
+        self.docs.to_parquet(os.path.join(self.index_dir, DOCS_NAME), index=False)
+        tmp = os.path.join(self.index_dir, MANIFEST_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.index_dir, MANIFEST_NAME))
+        # Segments dropped by a compaction
+        for name in os.listdir(self.index_dir):
+            if name.startswith("segment_") and name not in self.manifest["segments"]:
+                os.remove(os.path.join(self.index_dir, name))
+
+
+class IndexUpdate:
+    """
+    One sync, fed batch by batch. Metadata of known headlines is updated as each batch
+    arrives and new headlines are indexed as a segment every SEGMENT_ROWS rows, so a
+    streamed sync buffers at most one segment's rows on top of the index itself.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.seen = np.zeros(len(index.docs), dtype=bool)  # Docs indexed before this sync
+        self.added = 0
+        self._reset_pending()
+
+    def _reset_pending(self):
+        self.pending = []
+        self.pending_rows = 0
+        self.pending_titles = set()
+
+    def add(self, df):
+        index = self.index
+        columns = [c for c in META_COLUMNS if c in df.columns]
+        titles = df[TITLE_COL].fillna("").astype(str)
+        ids = titles.map(index.live_titles())
+        indexed = ids.notna().to_numpy()
+        known_ids = ids[indexed].astype(np.int64).to_numpy()
+        self.seen[known_ids[known_ids < len(self.seen)]] = True
+        meta = df[columns].fillna("").astype(str)
+        if len(known_ids):
+            docs = index.docs
+            for column in columns:
+                if column not in docs.columns:
+                    docs[column] = None
+                docs.loc[known_ids, column] = meta[column].to_numpy()[indexed]
+            index._docs_changed()
+
+        fresh = meta[~indexed].assign(**{TITLE_COL: titles[~indexed]})
+        fresh = fresh[~fresh[TITLE_COL].isin(self.pending_titles)].drop_duplicates(subset=[TITLE_COL])
+        if len(fresh):
+            self.pending_titles.update(fresh[TITLE_COL])
+            self.pending.append(fresh)
+            self.pending_rows += len(fresh)
+        if self.pending_rows >= SEGMENT_ROWS:
+            self._flush()
+
+    def _flush(self):
+        """Indexes the buffered new headlines as one segment."""
+        if not self.pending:
+            return
+        new = pd.concat(self.pending, ignore_index=True)
+        new["Text"] = convert_series(new[TITLE_COL])
+        self.index.append(new)
+        self.added += len(new)
+        self._reset_pending()
+
+    def commit(self):
+        """Indexes the rest, marks docs missing from the sync dead and saves. Returns (added, removed)."""
+        index = self.index
+        self._flush()
+        docs = index.docs
+        gone = np.zeros(len(docs), dtype=bool)
+        gone[:len(self.seen)] = docs["Live"].to_numpy()[:len(self.seen)] & ~self.seen
+        docs.loc[gone, "Live"] = False
+        index._live_titles = None
+        index._docs_changed()
+        if index.needs_compaction():
+            index.compact()
+        index.save()
+        return self.added, int(gone.sum())
+
+
+# --- Helpers for the stages ---
+def load_index(index_dir=INDEX_DIR):
+    """Returns the persisted index, or None if it has not been built yet."""
+    index = NgramIndex(index_dir)
+    return index if index.exists() else None
+
+
+def build_index(df, index_dir=INDEX_DIR):
+    """Indexes a coded corpus from scratch."""
+    index = NgramIndex(index_dir)
+    index.reset()
+    index.sync(df)
+    return index
+
+
+def load_corpus_frame():
+    import corpus_store
+
+    return corpus_store.load_corpus([TITLE_COL] + META_COLUMNS, STORE_DIR, csv_fallback=LEGACY_CSV)
+
+
+def print_query(index, query, category=None, strategy=None, limit=20, width=KWIC_WIDTH):
+    start = time.perf_counter()
+    ids = index.search(query, category, strategy)
+    lines = index.kwic(ids, query, width, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"[*] \"{query}\": {len(ids)} headlines ({elapsed:.1f} ms)")
+    for column in ("Category", "Strategy"):
+        counts = index.counts(ids, column)
+        if len(counts):
+            print(f"    By {column.lower()}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    dates = index.docs["日期"] if "日期" in index.docs.columns else None
+    for doc_id, left, match, right in lines:
+        date = f"{dates.iat[doc_id]}  " if dates is not None else ""
+        print(f"    {date}{left:>{width}}[{match}]{right}")
+    if limit is not None and len(ids) > limit:
+        print(f"    ... {len(ids) - limit} more headlines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword-in-context search over the coded headlines.")
+    parser.add_argument("queries", nargs="*", help="Terms to look up (Traditional or Simplified).")
+    parser.add_argument("--category", help="Only count headlines of this category.")
+    parser.add_argument("--strategy", help="Only count headlines coded with this strategy.")
+    parser.add_argument("--limit", type=int, default=20, help="KWIC headlines shown per term (default: 20).")
+    parser.add_argument("--width", type=int, default=KWIC_WIDTH, help="Context characters on each side.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the corpus store.")
+    args = parser.parse_args()
+
+    index = None if args.rebuild else load_index()
+    if index is None:
+        df = load_corpus_frame()
+        if df is None:
+            print("[!] Error: Corpus not found. Please run '2_data_coding.py' first.")
+            raise SystemExit(1)
+        start = time.perf_counter()
+        index = build_index(df)
+        print(f"[+] Indexed {len(index)} headlines in {time.perf_counter() - start:.2f} s: {INDEX_DIR}")
+    for query in args.queries:
+        print_query(index, query, args.category, args.strategy, args.limit, args.width)
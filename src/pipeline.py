@@ -0,0 +1,350 @@
+"""
+Module: Pipeline Runner
+Description: Runs the stages as one dependency graph in a single process:
+
+                 scrape (opt-in) -> coding -> wordcloud
+                                          \\-> chart
+                 survey -> pls
+
+             Artifacts (the coded corpus, the cleaned survey) are handed from stage to stage in memory
+             instead of being re-read from disk, independent branches (word clouds,
+             strategy chart, survey) run concurrently, and a stage is skipped when the
+             fingerprint of its inputs (input files, upstream results, stage code and
+             the helper modules it imports)
+             matches the previous successful run and its outputs still exist.
+Usage: python pipeline.py                 # coding, wordcloud, chart, survey, pls
+       python pipeline.py --scrape --http # also crawl new ads first
+       python pipeline.py --only chart --force
+       python pipeline.py --near-dedup --simplify   # coding options, see 2_data_coding.py
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import instrumentation
+import near_dedup
+import term_index
+from coding_cache import file_digest
+from strategy_cube import StrategyCube
+
+# --- Configuration ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(SCRIPT_DIR, "..", "data", "cache", "pipeline_state.json")
+
+_MODULES = {}
+_MODULES_LOCK = threading.Lock()
+
+
+def load_stage(name):
+    """Imports a numbered stage script (e.g. '2_data_coding') once per process."""
+    with _MODULES_LOCK:
+        module = _MODULES.get(name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(f"stage_{name}", os.path.join(SCRIPT_DIR, f"{name}.py"))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _MODULES[name] = module
+        return module
+
+
+def _digest(*parts):
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _local_imports(path):
+    """Modules of src/ imported anywhere in a file, including lazy imports inside functions."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return {n for n in names if os.path.exists(os.path.join(SCRIPT_DIR, f"{n}.py"))}
+
+
+def _source_digest(name):
+    """Digest of a stage script and of every src/ module it imports, transitively."""
+    digests = {}
+    todo = [name]
+    while todo:
+        module = todo.pop()
+        if module in digests:
+            continue
+        path = os.path.join(SCRIPT_DIR, f"{module}.py")
+        digests[module] = file_digest(path)
+        todo.extend(_local_imports(path))
+    return _digest(digests)
+
+
+def _existing_digests(paths):
+    return {os.path.basename(p): file_digest(p) for p in paths if os.path.exists(p)}
+
+
+class Stage:
+    """
+    One node of the graph.
+    fingerprint(ctx) -> str   digest of everything the stage's result depends on
+    run(ctx)                  does the work, putting in-memory artifacts into ctx
+    outputs(ctx) -> [paths]   files that must exist for the stage to be skippable
+    """
+
+    def __init__(self, name, deps, fingerprint, run, outputs, always=False):
+        self.name = name
+        self.deps = deps
+        self.fingerprint = fingerprint
+        self.run = run
+        self.outputs = outputs
+        self.always = always  # Never skipped (e.g. scraping, whose input is the remote site)
+
+
+# --- Stage definitions ---
+def _coding_fingerprint(ctx):
+    coding = load_stage("2_data_coding")
+    return _digest(_existing_digests(coding.INPUT_FILES.values()), _source_digest("2_data_coding"),
+                   ctx["upstream"].get("scrape"), ctx["coding"])
+
+
+def _coding_run(ctx):
+    coding = load_stage("2_data_coding")
+    # The stage's own cache only tracks CODE_DICT; a code change (e.g. in strategy_matcher) recodes everything
+    code_changed = ctx["previous"].get("coding", {}).get("source") != _source_digest("2_data_coding")
+    corpus = coding.main(workers=ctx["workers"], full=ctx["force"] or code_changed, **ctx["coding"])
+    if corpus is not None:
+        ctx["corpus"] = corpus
+
+
+def _coding_outputs(ctx):
+    coding = load_stage("2_data_coding")
+    outputs = [coding.STORE_DIR, coding.CUBE_FILE]
+    if ctx["coding"]["export_csv"]:
+        outputs.append(coding.OUTPUT_FILE)
+    return outputs
+
+
+def _wordcloud_run(ctx):
+    wordcloud = load_stage("3_vis_wordcloud")
+    corpus = ctx.get("corpus")
+    df = corpus[["Category", "完整标题"]] if corpus is not None else None
+    wordcloud.main(workers=ctx["workers"], force=ctx["force"], df=df)
+
+
+def _wordcloud_outputs(ctx):
+    wordcloud = load_stage("3_vis_wordcloud")
+    return [wordcloud.INDEX_FILE] + [
+        wordcloud.output_path_for(cat) for cat in ctx["previous"].get("wordcloud", {}).get("categories", [])
+    ]
+
+
+def _chart_run(ctx):
+    charts = load_stage("4_vis_strategies")
+    corpus = ctx.get("corpus")
+    cube = StrategyCube.from_corpus(corpus) if corpus is not None else None
+    charts.draw_ieee_chart(cube=cube)
+
+
+def _survey_fingerprint(ctx):
+    survey = load_stage("5_survey_cleaner")
+    return _digest(_existing_digests([survey.INPUT_FILE]), _source_digest("5_survey_cleaner"))
+
+
+def _survey_run(ctx):
+    survey = load_stage("5_survey_cleaner").clean_survey_data()
+    if survey is not None:
+        ctx["survey"] = survey
+
+
+def _pls_run(ctx):
+    import pls_sem
+
+    pls_sem.main(workers=ctx["workers"], df=ctx.get("survey"))
+
+
+def _pls_outputs(ctx):
+    import pls_sem
+
+    return [pls_sem.OUTPUT_FILE]
+
+
+def _scrape_run(ctx):
+    scraper = load_stage("1_scraper")
+    scraper.run_engine(workers=ctx["workers"], http=ctx["http"], interactive=not ctx["auto_login"])
+
+
+def build_graph():
+    def downstream_of(source, dep):
+        return lambda ctx: _digest(_source_digest(source), ctx["upstream"].get(dep))
+
+    return {
+        "scrape": Stage("scrape", [], lambda ctx: None, _scrape_run, lambda ctx: [], always=True),
+        "coding": Stage("coding", ["scrape"], _coding_fingerprint, _coding_run, _coding_outputs),
+        "wordcloud": Stage("wordcloud", ["coding"], downstream_of("3_vis_wordcloud", "coding"),
+                           _wordcloud_run, _wordcloud_outputs),
+        "chart": Stage("chart", ["coding"], downstream_of("4_vis_strategies", "coding"), _chart_run,
+                       lambda ctx: [load_stage("4_vis_strategies").OUTPUT_FILE]),
+        "survey": Stage("survey", [], _survey_fingerprint, _survey_run,
+                        lambda ctx: [load_stage("5_survey_cleaner").OUTPUT_FILE]),
+        "pls": Stage("pls", ["survey"], downstream_of("pls_sem", "survey"), _pls_run, _pls_outputs),
+    }
+
+
+# --- State ---
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+# --- Execution ---
+class Pipeline:
+    """Runs the selected stages in dependency order, concurrently where the graph allows."""
+
+    def __init__(self, graph, selected, workers=1, force=False, http=False, auto_login=False,
+                 coding=None, state_file=STATE_FILE, max_parallel=3):
+        self.graph = graph
+        self.selected = [name for name in graph if name in selected]
+        self.state_file = state_file
+        self.previous = load_state(state_file)
+        self.state = dict(self.previous)
+        self.max_parallel = max_parallel
+        self.lock = threading.Lock()
+        # Shared context: options, upstream fingerprints and in-memory artifacts.
+        # coding holds the keyword options of 2_data_coding.main (export_csv, segment, simplify, near_dup)
+        coding = {"export_csv": False, "segment": False, "simplify": False, "near_dup": None, **(coding or {})}
+        self.ctx = {"workers": workers, "force": force, "http": http, "auto_login": auto_login,
+                    "coding": coding, "upstream": {}, "previous": self.previous}
+        self.status = {}
+
+    def _deps(self, name):
+        # Unselected dependencies (e.g. scrape) are satisfied by whatever is on disk
+        return [d for d in self.graph[name].deps if d in self.selected]
+
+    def _should_skip(self, stage, fingerprint):
+        if stage.always or self.ctx["force"]:
+            return False
+        previous = self.previous.get(stage.name, {})
+        if previous.get("fingerprint") != fingerprint:
+            return False
+        return all(os.path.exists(p) for p in stage.outputs(self.ctx))
+
+    def _run_stage(self, name):
+        stage = self.graph[name]
+        with self.lock:
+            fingerprint = stage.fingerprint(self.ctx)
+        if self._should_skip(stage, fingerprint):
+            print(f"[=] Pipeline: {name} is up to date, skipped.")
+            instrumentation.count("stages_skipped")
+            status = "skipped"
+        else:
+            print(f"[*] Pipeline: running {name}...")
+            # Per-stage counters: coding and survey both report rows_written, rows_loaded ...
+            with instrumentation.scope(name):
+                stage.run(self.ctx)
+            instrumentation.count("stages_run")
+            status = "ran"
+        with self.lock:
+            self.ctx["upstream"][name] = fingerprint
+            entry = {"fingerprint": fingerprint, "finished": datetime.now().isoformat(timespec="seconds")}
+            if name == "coding":
+                entry["source"] = _source_digest("2_data_coding")
+            if name == "wordcloud":
+                # Rendered PNGs are per category; remember which ones must exist next time
+                index = term_index.load_term_index(load_stage("3_vis_wordcloud").INDEX_FILE)
+                entry["categories"] = [] if index is None else term_index.categories(index)
+            self.state[name] = entry
+            save_state(self.state, self.state_file)
+        return status
+
+    def run(self):
+        pending = list(self.selected)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self._deps(name)
+                    if any(self.status.get(d) in ("failed", "blocked") for d in deps):
+                        self.status[name] = "blocked"
+                        pending.remove(name)
+                        print(f"[!] Pipeline: {name} not run because a dependency failed.")
+                    elif all(d in self.status for d in deps):
+                        running[pool.submit(self._run_stage, name)] = name
+                        pending.remove(name)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.status[name] = future.result()
+                    except Exception as e:
+                        self.status[name] = "failed"
+                        print(f"[!] Pipeline: {name} failed: {e!r}")
+        return self.status
+
+
+def parse_args():
+    graph = build_graph()
+    parser = argparse.ArgumentParser(description="Run the analysis stages as one dependency graph.")
+    parser.add_argument("--scrape", action="store_true", help="Include the scraping stage (opt-in).")
+    parser.add_argument("--only", nargs="+", choices=list(graph), metavar="STAGE",
+                        help=f"Run only these stages ({', '.join(graph)}).")
+    parser.add_argument("--force", action="store_true", help="Run every selected stage even if unchanged.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes used inside stages (default: 1).")
+    parser.add_argument("--http", action="store_true", help="Scrape over pooled HTTP instead of browsers.")
+    parser.add_argument("--auto-login", action="store_true", help="Capture the scraper login without a prompt.")
+    # Coding stage options (same as 2_data_coding.py); part of its fingerprint, so changing one recodes
+    parser.add_argument("--export-csv", action="store_true", help="Coding: also write the SmartPLS CSV export.")
+    parser.add_argument("--segment", action="store_true",
+                        help="Coding: pre-segment coded headlines into the shared jieba token cache.")
+    parser.add_argument("--simplify", action="store_true",
+                        help="Coding: convert headlines to Simplified Chinese before keyword matching.")
+    parser.add_argument("--near-dedup", type=float, nargs="?", const=near_dedup.THRESHOLD, default=None,
+                        metavar="THRESHOLD",
+                        help=f"Coding: collapse reprinted ads with MinHash-LSH (default: {near_dedup.THRESHOLD}).")
+    instrumentation.add_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    graph = build_graph()
+    selected = args.only or [name for name in graph if name != "scrape" or args.scrape]
+    # Headless backend: the chart branch draws from a worker thread
+    import matplotlib
+    matplotlib.use("Agg")
+    # Stage process pools are started while other branches are running; forking a
+    # multi-threaded parent can deadlock the children on locks held by other threads
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method("forkserver")
+    with instrumentation.run("pipeline", profile=args.profile) as current:
+        coding = {"export_csv": args.export_csv, "segment": args.segment, "simplify": args.simplify,
+                  "near_dup": args.near_dedup}
+        status = Pipeline(graph, selected, args.workers, args.force, args.http, args.auto_login, coding).run()
+        incomplete = [name for name, result in status.items() if result in ("failed", "blocked")]
+        if incomplete:
+            current.status = "failed"
+            current.error = f"Stages not completed: {', '.join(incomplete)}"
+    print("[+] Pipeline finished: " + ", ".join(f"{name} {result}" for name, result in status.items()))
+    if incomplete:
+        sys.exit(1)
@@ -0,0 +1,335 @@
+"""
+Module: PLS Path Model
+Description: PLS-SEM estimation of the survey model on smartpls_data.csv, replacing the
+             manual SmartPLS round-trip. Reflective (mode A) blocks are formed from the
+             Anx_*/Hist_* indicators (Anx_Face_1..3 -> Anx_Face, ...), the inner model
+             follows PATHS, and the PLS algorithm uses the path weighting scheme.
+             The estimator works on a stack of data sets at once (batch x rows x
+             indicators), so bootstrap resamples are estimated in batches with NumPy
+             matrix operations; batches are spread across a process pool.
+             Path coefficients, outer loadings, R² and percentile confidence intervals
+             are printed and written to data/pls_results.csv.
+Usage: python pls_sem.py --boot 5000 --workers 4
+"""
+
+import argparse
+import math
+import os
+import re
+
+import numpy as np
+
+import instrumentation
+
+# --- Configuration ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_FILE = os.path.join(SCRIPT_DIR, "..", "data", "smartpls_data.csv")  # Written by 5_survey_cleaner.py
+OUTPUT_FILE = os.path.join(SCRIPT_DIR, "..", "data", "pls_results.csv")
+
+# Indicator columns: <Anx|Hist>_<Block>_<n>
+INDICATOR_PATTERN = re.compile(r"^((?:Anx|Hist)_[A-Za-z]+)_\d+$")
+
+# Inner model: historical resonance -> contemporary anxiety
+PATHS = [
+    ("Hist_Face", "Anx_Face"),
+    ("Hist_Brain", "Anx_Health"),
+    ("Hist_Know", "Anx_Know"),
+]
+
+BOOTSTRAP = 5000
+BATCH_SIZE = 250  # Resamples estimated together (and per pool task)
+CONFIDENCE = 0.95
+TOLERANCE = 1e-7
+MAX_ITER = 300
+SEED = 42
+
+
+# --- Model ---
+class PathModel:
+    """Measurement blocks and inner paths as index arrays for the estimator."""
+
+    def __init__(self, indicators, paths=PATHS):
+        self.indicators = list(indicators)
+        blocks = {}
+        for name in self.indicators:
+            match = INDICATOR_PATTERN.match(name)
+            if match:
+                blocks.setdefault(match.group(1), []).append(name)
+        self.constructs = list(blocks)
+        self.blocks = blocks
+        index = {c: j for j, c in enumerate(self.constructs)}
+
+        missing = sorted({c for path in paths for c in path} - set(index))
+        if missing:
+            raise ValueError(f"Constructs without indicators: {', '.join(missing)}")
+        self.paths = list(paths)
+        self.inner = np.zeros((len(self.constructs),) * 2, dtype=bool)  # inner[i, j]: i -> j
+        for source, target in self.paths:
+            self.inner[index[source], index[target]] = True
+        isolated = [c for j, c in enumerate(self.constructs) if not (self.inner[j].any() or self.inner[:, j].any())]
+        if isolated:
+            raise ValueError(f"Constructs not used by any path: {', '.join(isolated)}")
+
+        # mask[h, j]: indicator h measures construct j
+        self.columns = [name for c in self.constructs for name in blocks[c]]
+        self.mask = np.zeros((len(self.columns), len(self.constructs)))
+        for h, name in enumerate(self.columns):
+            self.mask[h, index[INDICATOR_PATTERN.match(name).group(1)]] = 1.0
+
+    @classmethod
+    def from_columns(cls, columns, paths=PATHS):
+        return cls([c for c in columns if INDICATOR_PATTERN.match(str(c))], paths)
+
+    def predecessors(self, j):
+        return np.flatnonzero(self.inner[:, j])
+
+    def successors(self, j):
+        return np.flatnonzero(self.inner[j])
+
+    def parameter_names(self):
+        """Labels of the flat parameter vector returned by estimate()."""
+        paths = [f"{self.constructs[i]} -> {self.constructs[j]}" for i, j in zip(*np.nonzero(self.inner))]
+        return paths, list(self.columns)
+
+
+# --- Estimation ---
+def _standardize(a):
+    """Column z-scores along the row axis of a (batch, rows, cols) stack; constant columns become 0."""
+    a = a - a.mean(axis=1, keepdims=True)
+    sd = np.sqrt((a * a).mean(axis=1, keepdims=True))
+    return np.divide(a, sd, out=np.zeros_like(a), where=sd > 0)
+
+
+def _cross(a, b):
+    """Batched a'b / rows for (batch, rows, k) and (batch, rows, l) stacks: (batch, k, l)."""
+    return a.transpose(0, 2, 1) @ b / a.shape[1]
+
+
+def _regress(y, x):
+    """Batched OLS of standardized y (batch, rows) on x (batch, rows, k): returns (batch, k)."""
+    xtx = _cross(x, x)
+    xty = _cross(x, y[..., None])
+    try:
+        return np.linalg.solve(xtx, xty)[..., 0]
+    except np.linalg.LinAlgError:
+        # A degenerate resample must not fail the whole batch
+        return (np.linalg.pinv(xtx) @ xty)[..., 0]
+
+
+def _inner_proxies(scores, model):
+    """Inner estimates, path weighting scheme: regression on predecessors, correlation with successors."""
+    b, _, m = scores.shape
+    inner = np.zeros((b, m, m))
+    for j in range(m):
+        pred = model.predecessors(j)
+        if len(pred):
+            inner[:, pred, j] = _regress(scores[:, :, j], scores[:, :, pred])
+        succ = model.successors(j)
+        if len(succ):
+            inner[:, succ, j] = _cross(scores[:, :, succ], scores[:, :, j:j + 1])[..., 0]
+    return _standardize(scores @ inner)
+
+
+def estimate(data, model, tol=TOLERANCE, max_iter=MAX_ITER):
+    """
+    PLS algorithm on a stack of data sets, data: (batch, rows, indicators) in
+    model.columns order. Returns path coefficients (batch, paths), outer loadings
+    (batch, indicators), R² (batch, constructs) and the iterations used.
+    Data sets whose estimation breaks down (e.g. a resample in which a whole block
+    is constant) come back as NaN rows.
+    """
+    x = _standardize(np.asarray(data, dtype=float))
+    b, n, _ = x.shape
+    m = len(model.constructs)
+    mask = model.mask
+    weights = np.broadcast_to(mask, (b,) + mask.shape).copy()
+
+    # Only data sets that have not converged yet take part in the next iteration
+    active = np.arange(b)
+    with np.errstate(invalid="ignore"):
+        for iteration in range(1, max_iter + 1):
+            xa, wa = x[active], weights[active]
+            proxies = _inner_proxies(_standardize(xa @ wa), model)
+
+            # Mode A: outer weights are the indicator covariances with the inner proxy, scaled to unit score variance
+            new = _cross(xa, proxies) * mask
+            scale = np.sqrt(((xa @ new) ** 2).mean(axis=1, keepdims=True))
+            new = np.divide(new, scale, out=np.zeros_like(new), where=scale > 0)
+            delta = np.abs(new - wa).max(axis=(1, 2))
+            weights[active] = new
+            active = active[~(delta < tol)]
+            if not len(active):
+                break
+
+        scores = _standardize(x @ weights)
+        loadings = (_cross(x, scores) * mask).sum(axis=2)
+        paths = []
+        r2 = np.full((b, m), np.nan)
+        for j in range(m):
+            pred = model.predecessors(j)
+            if len(pred):
+                coef = _regress(scores[:, :, j], scores[:, :, pred])
+                corr = _cross(scores[:, :, pred], scores[:, :, j:j + 1])[..., 0]
+                r2[:, j] = (coef * corr).sum(axis=1)
+                paths.append((pred, j, coef))
+        # Same order as parameter_names(): row-major over inner[i, j]
+        order = {(i, j): coef[:, k] for pred, j, coef in paths for k, i in enumerate(pred)}
+        path_coef = np.stack([order[(i, j)] for i, j in zip(*np.nonzero(model.inner))], axis=1)
+
+    broken = (~np.isfinite(path_coef).all(axis=1) | ~np.isfinite(loadings).all(axis=1)
+              | (scores == 0).all(axis=1).any(axis=1))
+    path_coef[broken] = np.nan
+    loadings[broken] = np.nan
+    r2[broken] = np.nan
+    return path_coef, loadings, r2, iteration
+
+
+# --- Bootstrap ---
+_WORKER = {}
+
+
+def init_worker(data, model, tol, max_iter):
+    """Pool initializer: keeps the sample and model in the worker process."""
+    _WORKER.update(data=data, model=model, tol=tol, max_iter=max_iter)
+
+
+def bootstrap_batch(seed, size):
+    """Pool task: estimates `size` resamples (drawn with replacement) in one stacked pass."""
+    data, model = _WORKER["data"], _WORKER["model"]
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(data), (size, len(data)))
+    path_coef, loadings, _, _ = estimate(data[rows], model, _WORKER["tol"], _WORKER["max_iter"])
+    return path_coef, loadings
+
+
+def bootstrap(data, model, resamples=BOOTSTRAP, workers=1, batch_size=BATCH_SIZE, seed=SEED,
+              tol=TOLERANCE, max_iter=MAX_ITER):
+    """
+    Bootstrap distribution of path coefficients and loadings, (resamples, params) each.
+    Each batch gets its own child seed, so results do not depend on the worker count.
+    """
+    sizes = [min(batch_size, resamples - start) for start in range(0, resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers > 1 and len(sizes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(data, model, tol, max_iter)) as pool:
+            results = list(pool.map(bootstrap_batch, seeds, sizes))
+    else:
+        init_worker(data, model, tol, max_iter)
+        results = [bootstrap_batch(s, size) for s, size in zip(seeds, sizes)]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def _p_value(t):
+    """Two-sided p-value of a t statistic (normal approximation, as for large bootstrap samples)."""
+    return math.erfc(abs(t) / math.sqrt(2)) if np.isfinite(t) else float("nan")
+
+
+def summarize(kind, names, original, boot, confidence=CONFIDENCE):
+    """One result row per parameter: estimate, bootstrap mean/SD, t, p and percentile CI."""
+    alpha = (1 - confidence) / 2
+    rows = []
+    for k, name in enumerate(names):
+        sample = boot[:, k][np.isfinite(boot[:, k])]
+        sd = sample.std(ddof=1) if len(sample) > 1 else float("nan")
+        t = original[k] / sd if sd > 0 else float("nan")
+        low, high = np.quantile(sample, [alpha, 1 - alpha]) if len(sample) else (float("nan"),) * 2
+        rows.append({
+            "Type": kind,
+            "Parameter": name,
+            "Estimate": original[k],
+            "Boot_Mean": sample.mean() if len(sample) else float("nan"),
+            "Boot_SD": sd,
+            "T": t,
+            "P": _p_value(t),
+            "CI_Low": low,
+            "CI_High": high,
+        })
+    return rows
+
+
+def load_data(path=INPUT_FILE, df=None, paths=PATHS):
+    """Indicator matrix (complete cases) and model from the SmartPLS export or a cleaned frame."""
+    import pandas as pd
+
+    if df is None:
+        df = pd.read_csv(path, encoding="utf-8-sig")
+    model = PathModel.from_columns(df.columns, paths)
+    block = df[model.columns].apply(pd.to_numeric, errors="coerce")
+    complete = block.notna().all(axis=1)
+    return block[complete].to_numpy(dtype=float), model, int((~complete).sum())
+
+
+def main(resamples=BOOTSTRAP, workers=1, batch_size=BATCH_SIZE, seed=SEED, confidence=CONFIDENCE,
+         input_file=INPUT_FILE, output_file=OUTPUT_FILE, df=None):
+    """Estimates the model, bootstraps it and writes the result table. df: cleaned survey in memory."""
+    import pandas as pd
+
+    print("[*] Estimating PLS path model...")
+    if df is None and not os.path.exists(input_file):
+        print(f"[!] Error: {input_file} not found. Please run '5_survey_cleaner.py' first.")
+        return None
+    with instrumentation.span("load"):
+        data, model, dropped = load_data(input_file, df)
+    if dropped:
+        print(f"    [!] Casewise deletion: {dropped} responses with missing indicators dropped.")
+    print(f"    {len(data)} responses, {len(model.constructs)} constructs, {len(model.columns)} indicators.")
+    instrumentation.count("responses_used", len(data))
+    instrumentation.count("responses_dropped", dropped)
+
+    with instrumentation.span("estimate"):
+        path_coef, loadings, r2, iterations = estimate(data[None], model)
+    if not np.isfinite(path_coef).all():
+        print("[!] Error: The model could not be estimated on this sample.")
+        return None
+    print(f"    Converged after {iterations} iterations.")
+
+    print(f"[*] Bootstrapping {resamples} resamples ({workers} worker(s), batches of {batch_size})...")
+    with instrumentation.span("bootstrap"):
+        boot_paths, boot_loadings = bootstrap(data, model, resamples, workers, batch_size, seed)
+    failed = int((~np.isfinite(boot_paths).all(axis=1)).sum())
+    instrumentation.count("resamples", resamples)
+    instrumentation.count("resamples_failed", failed)
+    if failed:
+        print(f"    [!] {failed} resamples could not be estimated and were left out.")
+
+    path_names, loading_names = model.parameter_names()
+    rows = summarize("Path", path_names, path_coef[0], boot_paths, confidence)
+    rows += summarize("Loading", loading_names, loadings[0], boot_loadings, confidence)
+    for j, construct in enumerate(model.constructs):
+        if np.isfinite(r2[0, j]):
+            rows.append({"Type": "R2", "Parameter": construct, "Estimate": r2[0, j]})
+    result = pd.DataFrame(rows)
+
+    level = f"{confidence:.0%}"
+    for kind in ("Path", "Loading"):
+        print(f"\n[=] {kind} coefficients ({level} percentile CI):")
+        for row in result[result["Type"] == kind].itertuples():
+            print(f"    {row.Parameter:<26} {row.Estimate:7.3f}  [{row.CI_Low:6.3f}, {row.CI_High:6.3f}]"
+                  f"  t={row.T:6.2f}  p={row.P:.4f}")
+    print("\n[=] R²:")
+    for row in result[result["Type"] == "R2"].itertuples():
+        print(f"    {row.Parameter:<26} {row.Estimate:7.3f}")
+
+    with instrumentation.span("write"):
+        result.to_csv(output_file, index=False, encoding="utf-8-sig")
+    print(f"\n[+] Results saved to: {output_file}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate the PLS path model with bootstrap confidence intervals.")
+    parser.add_argument("--boot", type=int, default=BOOTSTRAP, help=f"Bootstrap resamples (default: {BOOTSTRAP}).")
+    parser.add_argument("--workers", type=int, default=1, help="Bootstrap worker processes (default: 1).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Resamples estimated together per task (default: {BATCH_SIZE}).")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="CI level (default: 0.95).")
+    parser.add_argument("--input", default=INPUT_FILE, help=f"SmartPLS export (default: {INPUT_FILE}).")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"Result table (default: {OUTPUT_FILE}).")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    with instrumentation.run("pls_sem", profile=args.profile):
+        main(args.boot, args.workers, args.batch_size, args.seed, args.confidence, args.input, args.output)
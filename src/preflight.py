@@ -0,0 +1,96 @@
+"""
+Module: Preflight Checks
+Description: Input validation behind the stages' --check flag. Paths are tested with
+             os.stat and dependencies with importlib.util.find_spec, so nothing is read
+             or imported: a check answers "would this stage run?" without paying for
+             pandas, matplotlib or jieba start-up. Font families are the exception: they
+             are looked up in matplotlib's font list (see find_font).
+Usage:   check = Preflight("3_vis_wordcloud")
+         check.any_path("corpus", [STORE_DIR, DATA_FILE])
+         check.modules("pandas", "jieba")
+         sys.exit(check.report())
+"""
+
+import importlib.util
+import os
+
+
+def find_font(families):
+    """
+    First family of the list that matplotlib has a font file for, or None. Unlike
+    rendering, this does not fall back to DejaVu Sans, which has no CJK glyphs.
+    """
+    from matplotlib import font_manager
+
+    for family in families:
+        try:
+            font_manager.findfont(family, fallback_to_default=False)
+            return family
+        except ValueError:
+            continue
+    return None
+
+
+class Preflight:
+    """Collects check results and prints them as one [+]/[!] list."""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.results = []  # (ok, required, label, detail)
+
+    def _add(self, ok, label, detail, required=True):
+        self.results.append((ok, required, label, detail))
+        return ok
+
+    def path(self, label, path, required=True):
+        """An input file or directory that must exist."""
+        return self._add(os.path.exists(path), label, os.path.normpath(path), required)
+
+    def any_path(self, label, paths, required=True):
+        """Inputs with fallbacks: passes on the first path that exists."""
+        for path in paths:
+            if os.path.exists(path):
+                return self._add(True, label, os.path.normpath(path), required)
+        return self._add(False, label, " or ".join(os.path.normpath(p) for p in paths), required)
+
+    def output_dir(self, label, path):
+        """An output directory that exists and is writable, or can be created."""
+        path = os.path.normpath(path)
+        parent = path
+        while not os.path.exists(parent):
+            parent = os.path.dirname(parent)
+        ok = os.path.isdir(parent) and os.access(parent, os.W_OK)
+        return self._add(ok, label, path if parent == path else f"{path} (will be created)")
+
+    def modules(self, *names, required=True):
+        """Installed dependencies, located without importing them."""
+        ok = True
+        for name in names:
+            try:
+                found = importlib.util.find_spec(name) is not None
+            except (ImportError, ValueError):
+                found = False
+            ok = self._add(found, f"module {name}", "installed" if found else "not installed", required) and ok
+        return ok
+
+    def font(self, label, families, required=True):
+        """A font family matplotlib can render with (any one of families)."""
+        found = find_font(families)
+        detail = found if found else f"none of {', '.join(families)} installed"
+        return self._add(found is not None, label, detail, required)
+
+    def ok(self):
+        return all(ok for ok, required, _, _ in self.results if required)
+
+    def report(self):
+        """Prints the results; returns the process exit code (0 = ready to run)."""
+        print(f"[*] Check: {self.stage}")
+        for ok, required, label, detail in self.results:
+            marker = "[+]" if ok else ("[!]" if required else "[=]")
+            suffix = "" if ok or required else " (optional)"
+            print(f"    {marker} {label}: {detail}{suffix}")
+        if self.ok():
+            print("[+] All required inputs are present.")
+            return 0
+        print("[!] Missing required inputs; the stage would not run.")
+        return 1
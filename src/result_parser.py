@@ -0,0 +1,107 @@
+"""
+Module: Result Page Parser
+Description: Browser-free parser for the database's search results pages.
+             Used on Selenium's page_source and on raw HTTP responses alike.
+             Selectors follow the results markup (tr.record / td.<field> / a.next);
+             adjust FIELD_CLASSES if the live page changes.
+"""
+
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# td class -> output column (same columns as the raw_ads exports)
+FIELD_CLASSES = {
+    "keyword": "关键词",
+    "date": "日期",
+    "page": "版次",
+    "title": "完整标题",
+    "detail": "详情",
+}
+RECORD_COLUMNS = ["关键词", "日期", "版次", "完整标题", "详情", "链接"]
+
+
+def _classes(attrs):
+    return (dict(attrs).get("class") or "").split()
+
+
+class _ResultsHTMLParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.total = None
+        self.current_page = None
+        self.next_href = None
+        self.no_result = False
+        self.records = []
+        self._record = None
+        self._field = None
+        self._span = None
+        self._buf = []
+
+    def handle_starttag(self, tag, attrs):
+        cls = _classes(attrs)
+        if tag == "tr" and "record" in cls:
+            self._record = {}
+        elif tag == "td" and self._record is not None:
+            self._field = next((FIELD_CLASSES[c] for c in cls if c in FIELD_CLASSES), None)
+            self._buf = []
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if "next" in cls:
+                self.next_href = href
+            elif self._record is not None and self._field == "完整标题":
+                self._record["链接"] = href
+        elif tag == "span" and ("total" in cls or "current" in cls):
+            self._span = "total" if "total" in cls else "current"
+            self._buf = []
+        elif tag == "div" and "no-result" in cls:
+            self.no_result = True
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._record is not None and self._field:
+            self._record[self._field] = "".join(self._buf).strip()
+            self._field = None
+        elif tag == "tr" and self._record is not None:
+            self.records.append(self._record)
+            self._record = None
+        elif tag == "span" and self._span:
+            value = "".join(self._buf).strip()
+            if value.isdigit():
+                setattr(self, "total" if self._span == "total" else "current_page", int(value))
+            self._span = None
+
+    def handle_data(self, data):
+        if self._field or self._span:
+            self._buf.append(data)
+
+
+def parse_results(html, base_url=None, keyword=None):
+    """
+    Parses one results page.
+    Returns: dict with 'total' (hit count or None), 'page', 'records' (list of
+             dicts keyed by RECORD_COLUMNS), 'next_url' (absolute, or None) and
+             'no_result' (True for an empty-result or expired-result notice).
+    """
+    parser = _ResultsHTMLParser()
+    parser.feed(html)
+    parser.close()
+
+    records = []
+    for rec in parser.records:
+        row = {col: rec.get(col) for col in RECORD_COLUMNS}
+        if keyword and not row["关键词"]:
+            row["关键词"] = keyword
+        if base_url and row["链接"]:
+            row["链接"] = urljoin(base_url, row["链接"])
+        records.append(row)
+
+    next_url = parser.next_href
+    if next_url and base_url:
+        next_url = urljoin(base_url, next_url)
+
+    return {
+        "total": parser.total if parser.total is not None else (0 if parser.no_result else None),
+        "page": parser.current_page,
+        "records": records,
+        "next_url": next_url,
+        "no_result": parser.no_result,
+    }
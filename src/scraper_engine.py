@@ -0,0 +1,228 @@
+"""
+Module: Scraper Engine
+Description: Parallel, non-interactive search engine for the Shen Bao database.
+             One authenticated login is captured (cookies + search page URL) and
+             replayed into several headless browser sessions, which work through
+             search tasks concurrently. Fixed sleeps are replaced with explicit waits
+             on the search form and on the results page.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import instrumentation
+
+# --- Configuration ---
+# Form field names of the 'Advertisement Search' page
+FIELD_KEYWORD = "FullText,Subtitle1,Subtitle2,Articletitle+"
+FIELD_BEGIN = "begintime"
+FIELD_END = "endtime"
+FIELD_SUBMIT = "image1"
+
+# A results page is complete once either the hit list or an empty-result notice is present
+RESULTS_READY_CSS = ".result-list, .no-result"
+WAIT_TIMEOUT = 30  # Seconds
+
+
+def make_driver(browser="chrome", headless=True, driver_path=None):
+    """Creates a WebDriver for chrome, firefox or edge (optionally headless)."""
+    browser = browser.lower()
+    if browser == "firefox":
+        options = webdriver.FirefoxOptions()
+        if headless:
+            options.add_argument("-headless")
+        return webdriver.Firefox(options=options)
+
+    if browser == "edge":
+        options = webdriver.EdgeOptions()
+        factory = webdriver.Edge
+        service_cls = webdriver.EdgeService
+    else:
+        options = webdriver.ChromeOptions()
+        factory = webdriver.Chrome
+        service_cls = webdriver.ChromeService
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1280,1024")
+    if driver_path and os.path.exists(driver_path):
+        return factory(service=service_cls(executable_path=driver_path), options=options)
+    return factory(options=options)
+
+
+# --- Session capture / reuse ---
+def capture_session(driver):
+    """Snapshot of an authenticated browser: current (search page) URL and cookies."""
+    return {"url": driver.current_url, "cookies": driver.get_cookies()}
+
+
+def save_session(session, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False, indent=2)
+
+
+def load_session(path):
+    """Returns a previously captured session, or None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+class BrowserSession:
+    """
+    One headless browser carrying the captured login.
+    search() and open() return the page source once the results have rendered.
+    """
+
+    def __init__(self, session, browser="chrome", headless=True, timeout=WAIT_TIMEOUT, driver_path=None,
+                 driver=None):
+        self.session = session
+        self.search_url = session["url"]
+        self.timeout = timeout
+        if driver is None:
+            self.driver = make_driver(browser, headless, driver_path)
+            self._install_cookies()
+        else:
+            # An already logged-in browser (e.g. the interactive window)
+            self.driver = driver
+
+    @classmethod
+    def attach(cls, driver, timeout=WAIT_TIMEOUT):
+        """Wraps a logged-in driver whose current page is the search form."""
+        return cls(capture_session(driver), timeout=timeout, driver=driver)
+
+    def _install_cookies(self):
+        # Cookies can only be set for the domain currently loaded
+        self.driver.get(_origin(self.search_url))
+        for cookie in self.session.get("cookies", []):
+            cookie = {k: v for k, v in cookie.items() if k in ("name", "value", "path", "domain", "secure", "httpOnly", "expiry")}
+            if "expiry" in cookie:
+                cookie["expiry"] = int(cookie["expiry"])
+            try:
+                self.driver.add_cookie(cookie)
+            except WebDriverException:
+                # Cookies for other hosts in the VPN chain; retry without the domain attribute
+                cookie.pop("domain", None)
+                try:
+                    self.driver.add_cookie(cookie)
+                except WebDriverException:
+                    pass
+
+    @property
+    def current_url(self):
+        return self.driver.current_url
+
+    def wait_results(self):
+        """Waits for the results page to render and returns its source."""
+        WebDriverWait(self.driver, self.timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, RESULTS_READY_CSS))
+        )
+        return self.driver.page_source
+
+    def search(self, keyword, begin, end):
+        """Loads a fresh search form, submits keyword/date range and waits for the results."""
+        driver = self.driver
+        driver.get(self.search_url)
+        wait = WebDriverWait(driver, self.timeout)
+        field = wait.until(EC.element_to_be_clickable((By.NAME, FIELD_KEYWORD)))
+        field.clear()
+        field.send_keys(keyword)
+        for name, value in ((FIELD_BEGIN, begin), (FIELD_END, end)):
+            el = driver.find_element(By.NAME, name)
+            el.clear()
+            el.send_keys(value)
+        old_page = driver.find_element(By.TAG_NAME, "html")
+        driver.find_element(By.NAME, FIELD_SUBMIT).click()
+        # Make sure the wait below sees the new page, not the form
+        wait.until(EC.staleness_of(old_page))
+        return self.wait_results()
+
+    def open(self, url):
+        """Navigates to a results URL (e.g. the next page) and waits for it."""
+        self.driver.get(url)
+        return self.wait_results()
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class ScraperEngine:
+    """
+    Runs tasks over a pool of browser sessions, one per worker thread.
+    Each task is handed to handler(browser_session, task); results are returned
+    in task order. A failed task is reported and yields None.
+    Sessions stay open across run() calls until close() (or the end of a with-block).
+    """
+
+    def __init__(self, session, workers=4, browser="chrome", headless=True, timeout=WAIT_TIMEOUT,
+                 driver_path=None, session_factory=None):
+        self.session = session
+        self.workers = max(1, workers)
+        self._factory = session_factory or (
+            lambda: BrowserSession(session, browser, headless, timeout, driver_path)
+        )
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _browser(self):
+        browser = getattr(self._local, "browser", None)
+        if browser is None:
+            browser = self._factory()
+            self._local.browser = browser
+            with self._lock:
+                self._opened.append(browser)
+        return browser
+
+    def _run_one(self, handler, task):
+        try:
+            return handler(self._browser(), task)
+        except TimeoutException:
+            print(f"[!] Timed out waiting for results: {task}")
+        except Exception as e:
+            print(f"[!] Task failed ({task}): {e}")
+        instrumentation.count("tasks_failed")
+        return None
+
+    def run(self, tasks, handler):
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        # Thread-local sessions need stable threads across runs, so the pool is kept
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return list(self._pool.map(lambda t: self._run_one(handler, t), tasks))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for browser in self._opened:
+            browser.close()
+        self._opened.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,139 @@
+"""
+Module: Segmentation Service
+Description: Shared jieba segmentation layer for the coding and word cloud stages.
+             - Persistent token cache (SQLite) keyed by a hash of the segmented text
+             - Batch API that segments cache misses in parallel worker processes
+             - Pre-serialized jieba prefix dictionary kept under data/cache/jieba
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from zh_convert import convert_series, to_simplified
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
+TOKEN_CACHE = os.path.join(CACHE_DIR, "tokens.sqlite")
+JIEBA_DIR = os.path.join(CACHE_DIR, "jieba")
+
+CHUNK_SIZE = 2000  # Texts per worker task
+TOKEN_SEP = "\x1f"  # Unit separator; never produced by the cleaned text
+_NON_HAN = re.compile(r"[^\u4e00-\u9fa5]")
+
+_JIEBA = None
+
+
+def load_jieba():
+    """
+    Imports and initializes jieba once per process. The prefix dictionary is
+    marshalled to JIEBA_DIR on first use, so later cold starts skip rebuilding it.
+    """
+    global _JIEBA
+    if _JIEBA is None:
+        import jieba
+        os.makedirs(JIEBA_DIR, exist_ok=True)
+        jieba.dt.tmp_dir = JIEBA_DIR
+        jieba.initialize()
+        _JIEBA = jieba
+    return _JIEBA
+
+
+def normalize(text):
+    """Traditional -> Simplified conversion followed by removal of non-Han characters."""
+    return _NON_HAN.sub("", to_simplified(str(text)))
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _segment_chunk(texts):
+    """Pool task: segments a chunk of texts."""
+    jieba = load_jieba()
+    return [jieba.lcut(t) for t in texts]
+
+
+class Segmenter:
+    """
+    Batch segmenter with a persistent token cache.
+    Any stage segmenting the same text gets the cached tokens back instead of
+    re-cutting it.
+    """
+
+    def __init__(self, cache_path=None, workers=1):
+        cache_path = cache_path or TOKEN_CACHE
+        self.cache_path = cache_path
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tokens (key BLOB PRIMARY KEY, tokens TEXT)")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _lookup(self, keys):
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self._conn.execute(f"SELECT key, tokens FROM tokens WHERE key IN ({marks})", chunk)
+            for key, tokens in rows:
+                found[key] = tokens.split(TOKEN_SEP) if tokens else []
+        return found
+
+    def _cut(self, texts):
+        if self.workers > 1 and len(texts) > CHUNK_SIZE:
+            chunks = [texts[i:i + CHUNK_SIZE] for i in range(0, len(texts), CHUNK_SIZE)]
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=load_jieba) as pool:
+                return [tokens for part in pool.map(_segment_chunk, chunks) for tokens in part]
+        return _segment_chunk(texts)
+
+    def segment_many(self, texts):
+        """
+        Segments a batch of texts. Returns a list of token lists aligned with texts.
+        Each distinct text is looked up once; misses are cut (in parallel when
+        workers > 1) and written back to the cache.
+        """
+        unique = list(dict.fromkeys(texts))
+        keys = [text_key(t) for t in unique]
+        cached = self._lookup(keys)
+
+        missing = [(k, t) for k, t in zip(keys, unique) if k not in cached]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            cut = self._cut([t for _, t in missing])
+            rows = []
+            for (key, _), tokens in zip(missing, cut):
+                cached[key] = tokens
+                rows.append((key, TOKEN_SEP.join(tokens)))
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO tokens VALUES (?, ?)", rows)
+
+        by_text = {t: cached[k] for k, t in zip(keys, unique)}
+        return [by_text[t] for t in texts]
+
+    def segment(self, text):
+        return self.segment_many([text])[0]
+
+    def segment_titles(self, titles):
+        """Normalizes raw headlines (see normalize) and segments them."""
+        return self.segment_many([normalize(t) for t in titles])
+
+    def segment_series(self, series):
+        """Segments a Series of raw headlines. Returns a list of token lists aligned with it."""
+        simplified = convert_series(series)
+        # Missing titles normalize to an empty string, as str(nan) did before
+        return self.segment_many([_NON_HAN.sub("", t) if isinstance(t, str) else "" for t in simplified])
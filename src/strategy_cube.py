@@ -0,0 +1,96 @@
+"""
+Module: Strategy Cube
+Description: Compact count aggregate over Category x Keyword x Year x Strategy,
+             maintained by the coding stage as rows are coded. Charts and new
+             slicings (per year, per keyword) read this cube instead of rescanning
+             the corpus.
+"""
+
+import os
+
+import pandas as pd
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CUBE_FILE = os.path.join(BASE_DIR, "data", "strategy_cube.csv")
+
+DIMENSIONS = ["Category", "Keyword", "Year", "Strategy"]
+MEASURE = "Count"
+
+
+def cube_keys(df):
+    """Projects coded rows onto the cube dimensions (missing source columns become NaN)."""
+    keys = pd.DataFrame(index=df.index)
+    keys["Category"] = df["Category"].astype(str) if "Category" in df.columns else pd.NA
+    keys["Keyword"] = df["关键词"] if "关键词" in df.columns else pd.NA
+    if "日期" in df.columns:
+        # Dates are exported as 'YYYY.MM.DD'
+        keys["Year"] = pd.to_numeric(df["日期"].astype("string").str[:4], errors="coerce").astype("Int64")
+    else:
+        keys["Year"] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    keys["Strategy"] = df["Strategy"].astype(str) if "Strategy" in df.columns else pd.NA
+    return keys
+
+
+class StrategyCube:
+    """Incrementally updated count cube. add() folds a batch of coded rows in."""
+
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else pd.Series(
+            dtype="int64",
+            index=pd.MultiIndex.from_tuples([], names=DIMENSIONS),
+            name=MEASURE,
+        )
+
+    def add(self, df):
+        """Adds the counts of a batch of coded rows."""
+        if len(df) == 0:
+            return self
+        batch = cube_keys(df).groupby(DIMENSIONS, dropna=False).size().rename(MEASURE)
+        if self.counts.empty:
+            self.counts = batch
+        else:
+            self.counts = self.counts.add(batch, fill_value=0).astype("int64")
+        return self
+
+    def to_frame(self):
+        return self.counts.reset_index()
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def save(self, path=CUBE_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        self.to_frame().to_csv(tmp, index=False, encoding="utf-8-sig")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        """Returns the saved cube, or None if it does not exist."""
+        if not os.path.exists(path):
+            return None
+        df = pd.read_csv(path, encoding="utf-8-sig", dtype={"Category": str, "Keyword": str, "Strategy": str})
+        df["Year"] = df["Year"].astype("Int64")
+        return cls(df.set_index(DIMENSIONS)[MEASURE].astype("int64"))
+
+    @classmethod
+    def from_corpus(cls, df):
+        return cls().add(df)
+
+    def slice(self, year=None, keyword=None, category=None):
+        """Long-format counts filtered by any of year / keyword / category."""
+        df = self.to_frame()
+        if year is not None:
+            years = [year] if isinstance(year, int) else list(year)
+            df = df[df["Year"].isin(years)]
+        if keyword is not None:
+            df = df[df["Keyword"] == keyword]
+        if category is not None:
+            df = df[df["Category"] == category]
+        return df
+
+    def crosstab(self, index="Category", columns="Strategy", **filters):
+        """Equivalent of pd.crosstab(corpus[index], corpus[columns]) over a slice."""
+        df = self.slice(**filters)
+        return df.groupby([index, columns])[MEASURE].sum().unstack(fill_value=0)
@@ -0,0 +1,191 @@
+"""
+Module: Strategy Matcher
+Description: Aho-Corasick multi-pattern engine for '3S Marketing Strategy' coding.
+             The automaton is compiled once from a keyword dictionary and scans each
+             headline in a single pass, regardless of how many keywords are defined.
+"""
+
+from collections import deque
+from functools import lru_cache
+from types import MappingProxyType
+
+UNCLASSIFIED = "0_Unclassified"
+CACHE_SIZE = 1 << 16  # Distinct headlines memoized per classifier by classify()
+
+# Priority Rule: Fear > Vision > Science (if scores are equal)
+DEFAULT_PRIORITY = ["1_Fear_Appeal", "3_Vision_Desire", "2_Scientific_Authority"]
+
+
+class AhoCorasick:
+    """
+    Compiled multi-pattern matcher.
+    Each state has a goto table, a failure link and the list of pattern ids
+    that end at it (including those inherited through the failure chain).
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for pid, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = self._out[state] + (pid,)
+
+        # Breadth-first pass to wire failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_ids(self, text):
+        """Returns the set of pattern ids occurring anywhere in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class StrategyClassifier:
+    """
+    Reusable 3S classifier built once from a CODE_DICT-style mapping
+    (strategy -> list of keywords).
+    A keyword scores at most once per headline, matching the original
+    'kw in text' presence rule.
+    """
+
+    def __init__(self, code_dict, priority=None):
+        self.strategies = list(code_dict)
+        self.priority = [s for s in (priority or DEFAULT_PRIORITY) if s in code_dict]
+        self.priority += [s for s in self.strategies if s not in self.priority]
+
+        # One automaton pattern per distinct keyword, mapped back to every strategy listing it
+        self._keywords = []
+        self._owners = []
+        index = {}
+        for strategy, keywords in code_dict.items():
+            for kw in keywords:
+                if kw not in index:
+                    index[kw] = len(self._keywords)
+                    self._keywords.append(kw)
+                    self._owners.append([])
+                if strategy not in self._owners[index[kw]]:
+                    self._owners[index[kw]].append(strategy)
+        # Pattern ids follow first appearance across all strategies; a keyword shared with an
+        # earlier strategy can be out of order within a later one, whose matches are then re-sorted
+        rank = {s: {kw: i for i, kw in reversed(list(enumerate(kws)))} for s, kws in code_dict.items()}
+        self._rank = {
+            s: r for s, r in rank.items()
+            if [kw for kw in self._keywords if kw in r] != sorted(r, key=r.get)
+        }
+
+        self._matcher = AhoCorasick(self._keywords)
+        self._classify_cached = lru_cache(maxsize=CACHE_SIZE)(self._classify_frozen)
+
+    def match(self, text):
+        """
+        Scans one text.
+        Returns: (scores, matched) where scores maps strategy -> hit count and
+                 matched maps strategy -> keywords found (dictionary order).
+        """
+        scores = {key: 0 for key in self.strategies}
+        matched = {key: [] for key in self.strategies}
+        if not isinstance(text, str):
+            return scores, matched
+
+        for pid in sorted(self._matcher.find_ids(text)):
+            for strategy in self._owners[pid]:
+                scores[strategy] += 1
+                matched[strategy].append(self._keywords[pid])
+        for strategy, rank in self._rank.items():
+            matched[strategy].sort(key=rank.get)
+        return scores, matched
+
+    def decide(self, scores):
+        """Applies the priority rule to a score table."""
+        max_score = max(scores.values()) if scores else 0
+        if max_score == 0:
+            return UNCLASSIFIED
+        for strategy in self.priority:
+            if scores[strategy] == max_score:
+                return strategy
+        return UNCLASSIFIED
+
+    def classify_one(self, text):
+        """Classifies a single text. Returns a result dict (see classify)."""
+        scores, matched = self.match(text)
+        return {
+            "strategy": self.decide(scores),
+            "scores": scores,
+            "matched": matched,
+        }
+
+    def _classify_frozen(self, text):
+        # Read-only result: the cached object is shared by every occurrence of the text
+        res = self.classify_one(text)
+        return MappingProxyType({
+            "strategy": res["strategy"],
+            "scores": MappingProxyType(res["scores"]),
+            "matched": MappingProxyType({k: tuple(v) for k, v in res["matched"].items()}),
+        })
+
+    def classify(self, texts):
+        """
+        Batch API. Distinct texts are memoized (LRU, CACHE_SIZE entries), so repeated
+        ad headlines cost a cache lookup instead of another automaton pass.
+        Returns: list of read-only mappings with keys 'strategy', 'scores' and
+                 'matched' (strategy -> tuple of keywords), aligned with the input order.
+        """
+        return [self._classify_cached(text if isinstance(text, str) else None) for text in texts]
+
+
+def matched_terms(result, sep="/"):
+    """Flattens a classify() result into a 'kw1/kw2' string (as in 编码理由关键词)."""
+    terms = [kw for kws in result["matched"].values() for kw in kws]
+    return sep.join(terms)
+
+
+# --- Process-pool helpers ---
+# Kept at module level so they can be pickled under both fork and spawn start methods.
+_WORKER_CLASSIFIER = None
+
+
+def init_worker(code_dict, priority=None):
+    """Pool initializer: compiles the automaton once per worker process."""
+    global _WORKER_CLASSIFIER
+    _WORKER_CLASSIFIER = StrategyClassifier(code_dict, priority)
+
+
+def classify_shard(texts):
+    """Pool task: returns (strategy, matched_terms) pairs for a shard of texts."""
+    return [(res["strategy"], matched_terms(res)) for res in _WORKER_CLASSIFIER.classify(texts)]
+
+
+def iter_shards(items, shard_size):
+    """Splits a list into consecutive shards of at most shard_size items."""
+    for start in range(0, len(items), shard_size):
+        yield items[start:start + shard_size]
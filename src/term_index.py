@@ -0,0 +1,80 @@
+"""
+Module: Term-Frequency Index
+Description: Category x term count index built in a single grouped pass over the corpus.
+             Word clouds are rendered from it with WordCloud.generate_from_frequencies,
+             and it can be queried for top-N terms without rendering anything.
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+# --- Configuration ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_FILE = os.path.join(BASE_DIR, "data", "cache", "term_freq.parquet")
+
+COLUMNS = ["Category", "Term", "Count"]
+
+
+def build_term_index(df, segmenter, stopwords, cat_col="Category", text_col="完整标题", min_len=2):
+    """
+    Segments every headline once (through the shared token cache), filters
+    short tokens and stopwords, and counts terms per category in one groupby.
+    Returns a long DataFrame [Category, Term, Count] sorted by category and count.
+    """
+    tokens = pd.Series(segmenter.segment_series(df[text_col]), index=df.index, dtype=object)
+    long = pd.DataFrame({"Category": df[cat_col].astype(str), "Term": tokens}).explode("Term")
+    long = long.dropna(subset=["Term"])
+    keep = (long["Term"].str.len() >= min_len) & ~long["Term"].isin(stopwords)
+    index = (
+        long[keep]
+        .groupby(["Category", "Term"], sort=False)
+        .size()
+        .rename("Count")
+        .reset_index()
+    )
+    return index.sort_values(["Category", "Count", "Term"], ascending=[True, False, True], ignore_index=True)
+
+
+def save_term_index(index, path=INDEX_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    index.to_parquet(path, index=False)
+
+
+def load_term_index(path=INDEX_FILE):
+    """Returns the persisted index, or None if it has not been built yet."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def categories(index):
+    return index["Category"].unique().tolist()
+
+
+def frequencies(index, category):
+    """Term -> count mapping for one category (input to generate_from_frequencies)."""
+    part = index[index["Category"] == category]
+    return dict(zip(part["Term"], part["Count"].astype(int)))
+
+
+def top_terms(index, category=None, n=20):
+    """Top-n terms for one category, or for every category when category is None."""
+    part = index if category is None else index[index["Category"] == category]
+    # The index is stored sorted by category and descending count
+    return part.groupby("Category", sort=False).head(n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the persisted category x term index.")
+    parser.add_argument("--category", help="Restrict output to one category.")
+    parser.add_argument("--top", type=int, default=20, help="Terms per category (default: 20).")
+    args = parser.parse_args()
+
+    idx = load_term_index()
+    if idx is None:
+        print(f"[!] Error: Term index not found at {INDEX_FILE}. Run '3_vis_wordcloud.py' first.")
+    else:
+        for cat, part in top_terms(idx, args.category, args.top).groupby("Category", sort=False):
+            print(f"[{cat}] " + ", ".join(f"{t}({c})" for t, c in zip(part["Term"], part["Count"])))
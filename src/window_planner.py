@@ -0,0 +1,177 @@
+"""
+Module: Date-Window Planner
+Description: Splits each keyword's DATE_START-DATE_END range into adaptive date windows
+             so that no single query runs into the server's pagination limits. A window
+             whose hit count is above the threshold is bisected until it fits (or is one
+             day long). The resulting windows are independent work units for the scraper
+             engine; a per-host token bucket keeps the combined request rate polite.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import instrumentation
+from result_parser import parse_results
+
+DATE_FORMAT = "%Y.%m.%d"
+
+
+def parse_day(text):
+    return datetime.strptime(text.strip(), DATE_FORMAT).date()
+
+
+def format_day(day):
+    return day.strftime(DATE_FORMAT)
+
+
+def split_window(begin, end):
+    """Bisects an inclusive date range. Returns two (begin, end) pairs, or None for a single day."""
+    first, last = parse_day(begin), parse_day(end)
+    if first >= last:
+        return None
+    mid = first + timedelta(days=(last - first).days // 2)
+    return (begin, format_day(mid)), (format_day(mid + timedelta(days=1)), end)
+
+
+def probe_hits(browser, keyword, begin, end):
+    """Hit count of one keyword/window search (first results page only)."""
+    instrumentation.count("probes")
+    result = parse_results(browser.search(keyword, begin, end), browser.current_url, keyword)
+    if result["total"] is None:
+        # No hit counter on the page: assume the window is small enough
+        return len(result["records"])
+    return result["total"]
+
+
+def plan_windows(probe, keyword, begin, end, max_hits):
+    """
+    Adaptive bisection of [begin, end] for one keyword.
+    probe(keyword, begin, end) returns a hit count.
+    Returns: list of dicts (keyword, begin, end, hits), empty windows dropped, in date order.
+    """
+    windows = []
+    stack = [(begin, end)]
+    while stack:
+        b, e = stack.pop()
+        hits = probe(keyword, b, e)
+        halves = split_window(b, e) if hits > max_hits else None
+        if halves:
+            # Push the later half first so windows come out in date order
+            stack.append(halves[1])
+            stack.append(halves[0])
+        elif hits:
+            if hits > max_hits:
+                print(f"[!] {keyword} {b}: {hits} hits on a single day exceeds {max_hits}")
+            windows.append({"keyword": keyword, "begin": b, "end": e, "hits": hits})
+    return windows
+
+
+class WindowPlan:
+    """Planned windows per keyword, persisted so a restarted run does not probe again."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.plans = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.plans = json.load(f)
+
+    @staticmethod
+    def key(keyword, begin, end, max_hits):
+        return f"{keyword}|{begin}|{end}|{max_hits}"
+
+    def get(self, keyword, begin, end, max_hits):
+        with self.lock:
+            return self.plans.get(self.key(keyword, begin, end, max_hits))
+
+    def put(self, keyword, begin, end, max_hits, windows):
+        with self.lock:
+            self.plans[self.key(keyword, begin, end, max_hits)] = windows
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.plans, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+
+def schedule(plans):
+    """
+    Orders work units across keywords: largest windows first, so long crawls start
+    early and small ones fill the gaps at the end of the run.
+    """
+    units = [w for windows in plans for w in windows]
+    return sorted(units, key=lambda w: -w["hits"])
+
+
+# --- Rate limiting ---
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            instrumentation.count("rate_limit_waits")
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """One token bucket per host, shared by all workers. rate <= 0 disables limiting."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if self.rate <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+    def wrap(self, browser):
+        return RateLimitedSession(browser, self)
+
+
+class RateLimitedSession:
+    """Session proxy that takes a token for the target host before every request."""
+
+    def __init__(self, browser, limiter):
+        self.browser = browser
+        self.limiter = limiter
+
+    @property
+    def current_url(self):
+        return self.browser.current_url
+
+    def search(self, keyword, begin, end):
+        self.limiter.wait(self.browser.search_url)
+        return self.browser.search(keyword, begin, end)
+
+    def open(self, url):
+        self.limiter.wait(url)
+        return self.browser.open(url)
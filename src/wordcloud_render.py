@@ -0,0 +1,75 @@
+"""
+Module: Word Cloud Rendering
+Description: Picklable render task and fingerprint manifest for the word cloud stage.
+             A PNG is only re-rendered when the fingerprint of its term frequencies,
+             font, colormap and canvas settings differs from the previous render.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".wordcloud_manifest.json"
+
+
+def font_signature(font_path):
+    """Identifies the font file by path, size and modification time (cheaper than hashing it)."""
+    try:
+        st = os.stat(font_path)
+        return [font_path, st.st_size, int(st.st_mtime)]
+    except OSError:
+        return [font_path, None, None]
+
+
+def fingerprint(freqs, settings):
+    """SHA-256 over the sorted term frequencies and the render settings."""
+    payload = {
+        "freqs": sorted((str(t), int(c)) for t, c in freqs.items()),
+        "settings": settings,
+        "font": font_signature(settings["font_path"]),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def render_wordcloud(freqs, settings, output_path):
+    """
+    Pool task: renders one word cloud from frequencies and writes the PNG.
+    WordCloud is imported here so worker start-up stays cheap.
+    """
+    from wordcloud import WordCloud
+
+    wc = WordCloud(**settings).generate_from_frequencies(freqs)
+    tmp = output_path + ".tmp.png"
+    wc.to_file(tmp)
+    os.replace(tmp, output_path)
+    return output_path
+
+
+class RenderManifest:
+    """Category -> fingerprint record kept next to the PNGs; saved after every render."""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_current(self, category, digest, output_path):
+        entry = self.entries.get(str(category))
+        return bool(entry) and entry["fingerprint"] == digest and os.path.exists(output_path)
+
+    def record(self, category, digest, output_path):
+        self.entries[str(category)] = {
+            "fingerprint": digest,
+            "file": os.path.basename(output_path),
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
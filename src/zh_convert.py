@@ -0,0 +1,63 @@
+"""
+Module: Traditional -> Simplified Conversion
+Description: Memoized, table-driven replacement for per-title zhconv.convert(t, 'zh-cn').
+             Single characters are converted with one str.translate call; zhconv's
+             longest-match phrase lookup only runs on strings that contain the start
+             of a multi-character dictionary entry. Shared by the coding and word cloud stages.
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from zhconv import zhconv as _zhconv
+
+LOCALE = "zh-cn"
+
+_TABLE = None
+_PHRASE_HEADS = None
+_PHRASE_START = None
+
+
+def _build_tables():
+    """Splits the zh-cn dictionary into a character table and phrase-prefix lookups (once)."""
+    global _TABLE, _PHRASE_HEADS, _PHRASE_START
+    if _TABLE is None:
+        zhdict = _zhconv.getdict(LOCALE)
+        phrases = [k for k in zhdict if len(k) > 1]
+        _TABLE = str.maketrans({k: v for k, v in zhdict.items() if len(k) == 1})
+        # A phrase can only match where its first two characters occur
+        _PHRASE_HEADS = frozenset(k[:2] for k in phrases)
+        _PHRASE_START = re.compile("[" + re.escape("".join(sorted({k[0] for k in phrases}))) + "]")
+    return _TABLE
+
+
+def needs_phrase_match(text):
+    """True if text contains the first two characters of any multi-character entry."""
+    _build_tables()
+    heads = _PHRASE_HEADS
+    return any(text[m.start():m.start() + 2] in heads for m in _PHRASE_START.finditer(text))
+
+
+@lru_cache(maxsize=1 << 20)
+def to_simplified(text):
+    """Converts one string; identical to zhconv.convert(text, 'zh-cn'), memoized per string."""
+    table = _build_tables()
+    if needs_phrase_match(text):
+        return _zhconv.convert(text, LOCALE)
+    return text.translate(table)
+
+
+def convert_series(series):
+    """
+    Batch conversion of a pandas Series. Each distinct value is converted once and
+    broadcast back through the factorized codes; missing values stay missing.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    converted = np.array(
+        [to_simplified(u if isinstance(u, str) else str(u)) for u in uniques] + [np.nan],
+        dtype=object,
+    )
+    # Code -1 (missing) picks the trailing NaN
+    return pd.Series(converted[codes], index=series.index, name=series.name)
@@ -0,0 +1,9 @@
+"""
+Module: Test Configuration
+Description: Puts src/ on sys.path so the tests import the flat stage modules as the scripts do.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
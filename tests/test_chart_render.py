@@ -0,0 +1,37 @@
+"""
+Module: Chart Rendering Tests
+Description: Output formats and the CJK font requirement of the chart template.
+"""
+
+import pandas as pd
+import pytest
+
+import chart_render
+from preflight import find_font
+
+PIVOT = pd.DataFrame({"Fear Appeal": [60.0, 20.0], "Vision/Desire": [40.0, 80.0]}, index=["Beauty", "Health"])
+
+
+@pytest.mark.parametrize("name", ["chart.pdf", "chart.PNG"])
+def test_format_follows_extension(tmp_path, name):
+    path = tmp_path / name
+    assert chart_render.render_charts([(PIVOT, "en", "Test", [str(path)])]) == [str(path)]
+    magic = path.read_bytes()[:4]
+    assert magic == (b"%PDF" if name.endswith(".pdf") else b"\x89PNG")
+    assert [p.name for p in tmp_path.iterdir()] == [name]  # No temporary file left behind
+
+
+@pytest.mark.parametrize("name", ["chart", "chart.svg"])
+def test_unsupported_extension_is_rejected(tmp_path, name):
+    template = chart_render.ChartTemplate(PIVOT.index, PIVOT.columns, "en")
+    template.render(PIVOT, "Test")
+    with pytest.raises(ValueError, match="Unsupported chart file"):
+        template.save(str(tmp_path / name))
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.skipif(find_font(chart_render.CHART_TEXT["zh"]["cjk_font"]) is not None,
+                    reason="a CJK font is installed")
+def test_zh_template_needs_a_cjk_font():
+    with pytest.raises(RuntimeError, match="SimHei"):
+        chart_render.ChartTemplate(PIVOT.index, PIVOT.columns, "zh")
@@ -0,0 +1,158 @@
+"""
+Module: Crawler Tests
+Description: Drives the HTTP fetch path (HttpSession + plan_windows + crawl_window) end to
+             end against the local mock server: record counts, resuming after a stop,
+             and idempotent appends.
+"""
+
+import csv
+import os
+
+import pytest
+
+import mock_shenbao
+from crawler import CrawlCheckpoint, RecordStore, crawl_window, unit_key
+from http_fetcher import HttpSession
+from window_planner import plan_windows, probe_hits
+
+KEYWORD = "补脑"
+BEGIN = "1927.01.01"
+END = "1927.12.31"
+
+
+class SimulatedStop(Exception):
+    pass
+
+
+class StopAfter:
+    """Session wrapper that fails on the (n + 1)-th page request, like a killed run."""
+
+    def __init__(self, session, opens):
+        self.session = session
+        self.opens = opens
+
+    @property
+    def current_url(self):
+        return self.session.current_url
+
+    def search(self, keyword, begin, end):
+        return self.session.search(keyword, begin, end)
+
+    def open(self, url):
+        if self.opens == 0:
+            raise SimulatedStop(url)
+        self.opens -= 1
+        return self.session.open(url)
+
+
+@pytest.fixture
+def server():
+    srv, base_url = mock_shenbao.serve_in_thread()
+    srv.base_url = base_url
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def new_session(server):
+    """A logged-in session, as replayed from a captured login by the engine."""
+    session = HttpSession({"url": server.base_url + "/search", "cookies": []})
+    session.form()  # Redirected through the portal, which sets the session cookie
+    return session
+
+
+def csv_rows(store, keyword):
+    with open(store.csv_path(keyword), encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def expected_titles(keyword=KEYWORD, begin=BEGIN, end=END):
+    return sorted(r["完整标题"] for r in mock_shenbao.generate_records(keyword, begin, end))
+
+
+def test_planned_crawl_collects_every_record(server, tmp_path):
+    session = new_session(server)
+    store = RecordStore(tmp_path / "raw_ads")
+    checkpoint = CrawlCheckpoint(str(tmp_path / "checkpoint.json"))
+
+    windows = plan_windows(lambda *q: probe_hits(session, *q), KEYWORD, BEGIN, END, max_hits=40)
+    assert len(windows) > 1
+    assert all(w["hits"] <= 40 for w in windows)
+    written = sum(crawl_window(session, store, checkpoint, KEYWORD, w["begin"], w["end"]) for w in windows)
+
+    expected = expected_titles()
+    assert written == len(expected) == store.count(KEYWORD)
+    assert sorted(r["完整标题"] for r in csv_rows(store, KEYWORD)) == expected
+    assert all(checkpoint.get(unit_key(KEYWORD, w["begin"], w["end"]))["done"] for w in windows)
+
+
+def test_crawl_resumes_from_checkpoint(server, tmp_path):
+    store = RecordStore(tmp_path / "raw_ads")
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    key = unit_key(KEYWORD, BEGIN, END)
+
+    with pytest.raises(SimulatedStop):
+        crawl_window(StopAfter(new_session(server), opens=2), store, CrawlCheckpoint(checkpoint_path),
+                     KEYWORD, BEGIN, END)
+    state = CrawlCheckpoint(checkpoint_path).get(key)
+    assert state["pages_done"] == 3 and not state["done"]
+    assert store.count(KEYWORD) == 3 * mock_shenbao.PAGE_SIZE
+
+    # A restarted run (new session, checkpoint reloaded from disk) continues from the saved page
+    requests_before = server.state.requests
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    written = crawl_window(new_session(server), RecordStore(tmp_path / "raw_ads"), checkpoint, KEYWORD, BEGIN, END)
+
+    expected = expected_titles()
+    pages = -(-len(expected) // mock_shenbao.PAGE_SIZE)
+    assert written == len(expected) - 3 * mock_shenbao.PAGE_SIZE
+    assert checkpoint.get(key)["done"] and checkpoint.get(key)["pages_done"] == pages
+    # Login (portal redirect + search form) and the remaining pages; the first three are not fetched again
+    assert server.state.requests - requests_before == 3 + pages - 3
+    assert sorted(r["完整标题"] for r in csv_rows(store, KEYWORD)) == expected
+
+
+def test_resume_after_result_set_expired(server, tmp_path):
+    store = RecordStore(tmp_path / "raw_ads")
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    with pytest.raises(SimulatedStop):
+        crawl_window(StopAfter(new_session(server), opens=1), store, CrawlCheckpoint(checkpoint_path),
+                     KEYWORD, BEGIN, END)
+    server.state.results.clear()  # The saved next-page URL now points to an expired result set
+
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    crawl_window(new_session(server), store, checkpoint, KEYWORD, BEGIN, END)
+    assert checkpoint.get(unit_key(KEYWORD, BEGIN, END))["done"]
+    assert sorted(r["完整标题"] for r in csv_rows(store, KEYWORD)) == expected_titles()
+
+
+def test_reappending_adds_no_duplicates(server, tmp_path):
+    session = new_session(server)
+    store = RecordStore(tmp_path / "raw_ads")
+    crawl_window(session, store, CrawlCheckpoint(str(tmp_path / "checkpoint.json")), KEYWORD, BEGIN, END)
+    rows = csv_rows(store, KEYWORD)
+
+    assert store.append(KEYWORD, rows) == 0
+    # The seen-set is rebuilt from the CSV by a new store (e.g. after a restart)
+    assert RecordStore(tmp_path / "raw_ads").append(KEYWORD, rows) == 0
+    # A fresh crawl of the same window (new checkpoint) finds nothing new either
+    fresh = crawl_window(session, RecordStore(tmp_path / "raw_ads"), CrawlCheckpoint(str(tmp_path / "other.json")),
+                         KEYWORD, BEGIN, END)
+    assert fresh == 0
+    assert len(csv_rows(store, KEYWORD)) == len(rows) == len(expected_titles())
+
+
+def test_export_merges_existing_workbook(server, tmp_path):
+    import pandas as pd
+
+    store = RecordStore(tmp_path / "raw_ads")
+    curated = pd.DataFrame([{"关键词": KEYWORD, "日期": "1926.05.01", "版次": "3",
+                             "完整标题": "艾罗补脑汁", "详情": "中法大药房", "链接": ""}])
+    curated.to_excel(store.xlsx_path(KEYWORD), index=False)
+
+    crawl_window(new_session(server), store, CrawlCheckpoint(str(tmp_path / "checkpoint.json")), KEYWORD, BEGIN, END)
+    store.export_xlsx(KEYWORD)
+
+    exported = pd.read_excel(store.xlsx_path(KEYWORD), dtype=str)
+    assert sorted(exported["完整标题"]) == sorted(expected_titles() + ["艾罗补脑汁"])
+    assert not any(name.endswith(".tmp.xlsx") for name in os.listdir(store.output_dir))
@@ -0,0 +1,28 @@
+"""
+Module: Excel Streaming Tests
+Description: TitleDeduplicator keeps the same rows as drop_duplicates(keep='first').
+"""
+
+import pandas as pd
+
+from excel_stream import TitleDeduplicator
+
+
+def dedup_rows(df, batch_size=5):
+    dedup = TitleDeduplicator()
+    batches = [dedup.filter(df.iloc[i:i + batch_size], "完整标题") for i in range(0, len(df), batch_size)]
+    return pd.concat(batches)["Row"].tolist()
+
+
+def test_mixed_types_match_drop_duplicates():
+    titles = ["美容霜", 1, "1", 1.0, float("nan"), "美容霜", 2.5, "2.5", True, "nan", float("nan"), "None"]
+    df = pd.DataFrame({"完整标题": pd.Series(titles, dtype=object), "Row": range(len(titles))})
+    expected = df.drop_duplicates(subset=["完整标题"], keep="first")
+    assert dedup_rows(df) == expected["Row"].tolist()
+
+
+def test_missing_titles_form_one_group():
+    titles = ["美容霜", None, "函授", float("nan"), "美容霜", None]
+    df = pd.DataFrame({"完整标题": pd.Series(titles, dtype="str"), "Row": range(len(titles))})
+    expected = df.drop_duplicates(subset=["完整标题"], keep="first")
+    assert dedup_rows(df, batch_size=2) == expected["Row"].tolist() == [0, 1, 2]
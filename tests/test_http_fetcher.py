@@ -0,0 +1,71 @@
+"""
+Module: HTTP Fetcher Tests
+Description: Request headers and retry behaviour of HttpSession against a local server.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_fetcher import FetchError, HttpSession
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """/flaky answers 503 to the first request of each method; /login sets a cookie."""
+
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        server.requests.append((self.command, self.path, dict(self.headers)))
+        if self.path == "/flaky" and self.command not in server.failed:
+            server.failed.add(self.command)
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"<html><body>ok</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/login":
+            self.send_header("Set-Cookie", "sid=abc; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    srv.requests = []
+    srv.failed = set()
+    srv.base_url = f"http://127.0.0.1:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_cookie_header_only_when_the_jar_has_one(server):
+    session = HttpSession({"url": server.base_url + "/search", "cookies": []})
+    session.request("GET", server.base_url + "/page")
+    session.request("GET", server.base_url + "/login")
+    session.request("GET", server.base_url + "/page")
+    cookies = [headers.get("Cookie") for _, _, headers in server.requests]
+    assert cookies == [None, None, "sid=abc"]
+
+
+def test_server_errors_are_retried_for_get_only(server):
+    session = HttpSession({"url": server.base_url + "/search", "cookies": []})
+    assert "ok" in session.request("GET", server.base_url + "/flaky")
+    with pytest.raises(FetchError, match="HTTP 503"):
+        session.request("POST", server.base_url + "/flaky", {"q": "补脑"})
+    assert [(method, path) for method, path, _ in server.requests] == [
+        ("GET", "/flaky"), ("GET", "/flaky"), ("POST", "/flaky")]
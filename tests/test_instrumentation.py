@@ -0,0 +1,36 @@
+"""
+Module: Instrumentation Tests
+Description: Counters of stages running side by side in one run stay separate.
+"""
+
+import threading
+
+import instrumentation
+
+
+def test_scoped_counters_are_kept_per_stage(tmp_path):
+    def stage(name, rows):
+        with instrumentation.scope(name):
+            with instrumentation.span("write"):
+                instrumentation.count("rows_written", rows)
+            instrumentation.gauge("last_batch", rows)
+
+    with instrumentation.run("pipeline", report_dir=str(tmp_path), quiet=True) as current:
+        threads = [threading.Thread(target=stage, args=args) for args in (("coding", 669), ("survey", 19))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        instrumentation.count("stages_run", 2)
+
+    report = current.report()
+    assert report["counters"] == {"coding/rows_written": 669, "survey/rows_written": 19, "stages_run": 2}
+    assert report["gauges"] == {"coding/last_batch": 669, "survey/last_batch": 19}
+    assert {s["name"] for s in report["spans"]} == {"coding", "coding/write", "survey", "survey/write"}
+
+
+def test_unscoped_counters_keep_their_names(tmp_path):
+    with instrumentation.run("2_data_coding", report_dir=str(tmp_path), quiet=True) as current:
+        with instrumentation.span("dedup"):
+            instrumentation.count("rows_loaded", 10)
+    assert current.report()["counters"] == {"rows_loaded": 10}
@@ -0,0 +1,97 @@
+"""
+Module: Near-Duplicate Tests
+Description: Clustering of reprinted headlines and the Cluster_Size bookkeeping of
+             collapse_near_duplicates.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+
+import near_dedup as nd
+
+TITLES = [
+    "醫學博士發明補腦汁",     # Traditional
+    "医学博士 发明补脑汁",    # Simplified, half-width space
+    "美国卫生专家证明功效",
+    "医学博士　发明补脑汁",   # Full-width space
+    "",
+    "百龄机 专治 神经衰弱",
+    None,
+    "美國衛生專家證明功效！",
+    float("nan"),
+    "百龄机专治神经衰弱",
+    None,
+]
+
+
+def test_variants_share_a_cluster():
+    clusters = nd.near_duplicate_clusters(TITLES)
+    assert clusters.tolist() == [0, 0, 2, 0, 4, 5, 6, 2, 8, 5, 10]
+
+
+def test_missing_and_empty_titles_stay_singletons():
+    titles = [None, "", float("nan"), None, "", "美国卫生专家证明功效"]
+    assert nd.near_duplicate_clusters(titles).tolist() == list(range(len(titles)))
+
+
+def test_threshold_separates_different_headlines():
+    titles = ["美国卫生专家证明功效", "德国化学博士研究原理", "美国卫生专家证明功效确有"]
+    assert nd.near_duplicate_clusters(titles, threshold=1.0).tolist() == [0, 1, 2]
+    assert nd.near_duplicate_clusters(titles, threshold=0.5).tolist() == [0, 1, 0]
+
+
+def test_cluster_size_counts_every_loaded_row():
+    loaded = pd.DataFrame({"完整标题": TITLES + ["医学博士 发明补脑汁", "百龄机专治神经衰弱", None]})
+    loaded["Row"] = range(len(loaded))
+    copies = loaded.groupby("完整标题", sort=False, dropna=False)["完整标题"].transform("size")
+    deduped = loaded.drop_duplicates(subset=["完整标题"], keep="first")
+
+    out = nd.collapse_near_duplicates(deduped, "完整标题", copies=copies.loc[deduped.index])
+    assert out["Cluster_Size"].sum() == len(loaded)
+    # Missing titles are one drop_duplicates group (kept as row 6) standing for all four
+    assert out["Row"].tolist() == [0, 2, 4, 5, 6]
+    assert out["Cluster_Size"].tolist() == [4, 2, 1, 3, 4]
+
+
+def test_cluster_size_defaults_to_row_count():
+    df = pd.DataFrame({"完整标题": TITLES})
+    out = nd.collapse_near_duplicates(df)
+    assert out["Cluster_Size"].sum() == len(df)
+    assert out.index.tolist() == [0, 2, 4, 5, 6, 8, 10]
+
+
+def test_connected_labels_match_union_find():
+    rng = np.random.default_rng(3)
+    n = 500
+    # A long reversed chain needs several propagation rounds, plus random extra edges
+    left = np.r_[np.arange(n - 1, 200, -1), rng.integers(0, n, 150)]
+    right = np.r_[np.arange(n - 2, 199, -1), rng.integers(0, n, 150)]
+
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in zip(left.tolist(), right.tolist()):
+        ru, rv = find(u), find(v)
+        parent[max(ru, rv)] = min(ru, rv)
+    expected = [min(i for i in range(n) if find(i) == find(x)) for x in range(n)]
+    assert nd._connected_labels(n, left, right).tolist() == expected
+
+
+def test_signatures_match_per_text_minimum():
+    rng = random.Random(5)
+    texts = ["".join(rng.choices("医学博士发明补脑汁美国卫生", k=rng.randint(1, 15))) for _ in range(200)]
+    a, b = nd._permutations(nd.NUM_PERM)
+    expected = np.array([
+        [min((int(a[j]) * h + int(b[j])) % int(nd._PRIME) for h in nd.shingle_hashes(t)) for j in range(nd.NUM_PERM)]
+        for t in texts
+    ], dtype=np.uint32)
+    # Chunk boundaries move the reduceat offsets; the result must not depend on them
+    for chunk_size in (7, 64, len(texts)):
+        assert np.array_equal(nd.minhash_signatures(texts, chunk_size=chunk_size), expected)
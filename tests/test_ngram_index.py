@@ -0,0 +1,131 @@
+"""
+Module: N-gram Index Tests
+Description: Index searches agree with a plain substring scan over the headlines, across
+             scripts, segment flushes, dead docs, compaction and a reload from disk.
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ngram_index as ni
+from zh_convert import to_simplified
+
+ALPHABET = "医学博士发明补脑汁美国卫生专家证明功效百龄机专治神经衰弱"
+QUERIES = ["医", "补", "脑汁", "专家", "补脑汁", "神经衰弱", "医学博士", "龄机专治", "汁百", "不存在"]
+
+
+def make_corpus(n, seed=11, prefix=""):
+    rng = random.Random(seed)
+    titles = [prefix + "".join(rng.choices(ALPHABET, k=rng.randint(1, 14))) for _ in range(n)]
+    return pd.DataFrame({
+        "完整标题": titles,
+        "Category": [rng.choice(["Health", "Beauty"]) for _ in titles],
+        "Strategy": [rng.choice(["1_Fear_Appeal", "2_Scientific_Authority"]) for _ in titles],
+    }).drop_duplicates(subset=["完整标题"], ignore_index=True)
+
+
+def scan(index, query, category=None):
+    """Doc ids found by checking every live headline."""
+    text = to_simplified(query)
+    docs = index.docs
+    return [i for i in range(len(docs))
+            if docs["Live"].iat[i] and text in to_simplified(docs["完整标题"].iat[i])
+            and (category is None or docs["Category"].iat[i] == category)]
+
+
+def assert_matches_scan(index, df):
+    for query in QUERIES:
+        ids = index.search(query)
+        assert ids.tolist() == scan(index, query), query
+        assert set(index.docs["完整标题"].iloc[ids]) == {t for t in df["完整标题"] if query in t}, query
+    ids = index.search("医", category="Health")
+    assert ids.tolist() == scan(index, "医", category="Health")
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 2**31, 2**40 + 5, 2**62], dtype=np.int64)
+    blob, nbytes = ni.encode_varints(values)
+    assert nbytes.tolist() == [1, 1, 1, 2, 2, 2, 3, 5, 6, 9]
+    assert len(blob) == nbytes.sum()
+    assert np.array_equal(ni.decode_varints(blob), values)
+
+
+def test_search_matches_substring_scan(tmp_path):
+    df = make_corpus(800)
+    index = ni.build_index(df, str(tmp_path))
+    assert len(index) == len(df)
+    assert_matches_scan(index, df)
+    assert_matches_scan(ni.load_index(str(tmp_path)), df)
+
+
+def test_traditional_and_simplified_find_the_same_docs(tmp_path):
+    df = pd.DataFrame({"完整标题": ["醫學博士發明補腦汁", "医学博士发明补脑汁", "美國衛生專家", "美国卫生"]})
+    index = ni.build_index(df, str(tmp_path))
+    for simplified, traditional, expected in [("医学", "醫學", [0, 1]), ("卫生", "衛生", [2, 3]),
+                                              ("补脑汁", "補腦汁", [0, 1]), ("美国卫生专家", "美國衛生專家", [2])]:
+        assert index.search(simplified).tolist() == index.search(traditional).tolist() == expected
+    # KWIC shows the original spelling of each headline
+    assert [line[2] for line in index.kwic(index.search("醫學"), "醫學")] == ["醫學", "医学"]
+
+
+def test_removed_rows_are_marked_dead_and_compacted(tmp_path, monkeypatch):
+    df = make_corpus(400)
+    ni.build_index(df, str(tmp_path))
+
+    kept = df.iloc[::5].copy()
+    kept["Category"] = "Education"  # Metadata of surviving headlines is refreshed
+    monkeypatch.setattr(ni, "MAX_DEAD_SHARE", 1.0)  # No compaction yet: removed docs stay, dead
+    index = ni.NgramIndex(str(tmp_path))
+    added, removed = index.sync(kept)
+    assert (added, removed) == (0, len(df) - len(kept))
+    assert len(index.docs) == len(df) and len(index) == len(kept)
+    assert_matches_scan(index, kept)
+    assert index.counts(index.search("医"), "Category").index.tolist() == ["Education"]
+
+    monkeypatch.setattr(ni, "MAX_DEAD_SHARE", 0.3)
+    extra = make_corpus(50, seed=12, prefix="新")
+    index = ni.NgramIndex(str(tmp_path))
+    added, removed = index.sync(pd.concat([kept, extra], ignore_index=True))
+    assert (added, removed) == (len(extra), 0)
+    # Compacted: one segment over the live docs only, renumbered from 0
+    assert len(index.segments) == 1 and index.docs["Live"].all()
+    assert index.docs["完整标题"].tolist() == kept["完整标题"].tolist() + extra["完整标题"].tolist()
+    reloaded = ni.NgramIndex(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.glob("segment_*")) == reloaded.manifest["segments"]
+    assert_matches_scan(reloaded, pd.concat([kept, extra]))
+
+
+def test_streamed_sync_flushes_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(ni, "SEGMENT_ROWS", 64)
+    monkeypatch.setattr(ni, "MAX_SEGMENTS", 100)
+    df = make_corpus(700)
+    update = ni.NgramIndex(str(tmp_path)).updater()
+    for start in range(0, len(df), 50):
+        update.add(df.iloc[start:start + 50])
+        # Buffered rows never exceed one segment plus one batch
+        assert update.pending_rows < ni.SEGMENT_ROWS
+    added, removed = update.commit()
+    assert (added, removed) == (len(df), 0)
+
+    index = ni.NgramIndex(str(tmp_path))
+    assert len(index.segments) == -(-len(df) // 100)  # A flush every second batch of 50 new rows
+    # Postings of a common gram span every segment and still decode to ascending absolute ids
+    ids = index.postings(ni.query_keys("医")[0])
+    assert np.all(np.diff(ids) > 0)
+    assert ids.tolist() == [i for i, t in enumerate(df["完整标题"]) if "医" in t]
+    assert_matches_scan(index, df)
+
+
+@pytest.mark.parametrize("segment_rows", [1, 3, 1000])
+def test_segment_boundaries_do_not_change_results(tmp_path, monkeypatch, segment_rows):
+    monkeypatch.setattr(ni, "SEGMENT_ROWS", segment_rows)
+    monkeypatch.setattr(ni, "MAX_SEGMENTS", 10_000)
+    df = make_corpus(120, seed=3)
+    update = ni.NgramIndex(str(tmp_path)).updater()
+    for start in range(0, len(df), 7):
+        update.add(df.iloc[start:start + 7])
+    update.commit()
+    assert_matches_scan(ni.NgramIndex(str(tmp_path)), df)
@@ -0,0 +1,103 @@
+"""
+Module: Strategy Matcher Tests
+Description: StrategyClassifier agrees with the original 'kw in text' scoring and
+             Fear > Vision > Science priority rule of 2_data_coding.py.
+"""
+
+import random
+from types import MappingProxyType
+
+import pytest
+
+from strategy_matcher import UNCLASSIFIED, StrategyClassifier, matched_terms
+
+# Overlapping keywords ('美' / '美国' / '美白') and one keyword ('卫生') listed under two strategies
+CODE_DICT = {
+    "1_Fear_Appeal": ["苦", "病", "死", "危险", "卫生"],
+    "2_Scientific_Authority": ["医", "科学", "美国", "卫生", "博士"],
+    "3_Vision_Desire": ["美", "白", "美白", "健", "成功"],
+}
+
+
+def reference_strategy(text, code_dict=CODE_DICT):
+    """The baseline determine_strategy(): each keyword scores once if present."""
+    if not isinstance(text, str):
+        return UNCLASSIFIED
+    scores = {key: 0 for key in code_dict}
+    for category, keywords in code_dict.items():
+        for kw in keywords:
+            if kw in text:
+                scores[category] += 1
+    max_score = max(scores.values())
+    if max_score == 0:
+        return UNCLASSIFIED
+    if scores["1_Fear_Appeal"] == max_score:
+        return "1_Fear_Appeal"
+    elif scores["3_Vision_Desire"] == max_score:
+        return "3_Vision_Desire"
+    else:
+        return "2_Scientific_Authority"
+
+
+@pytest.fixture
+def classifier():
+    return StrategyClassifier(CODE_DICT)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("病苦", "1_Fear_Appeal"),
+    ("科学博士", "2_Scientific_Authority"),
+    ("美白", "3_Vision_Desire"),
+    ("病医", "1_Fear_Appeal"),              # Fear ties Science
+    ("医美", "3_Vision_Desire"),            # Vision ties Science
+    ("死健", "1_Fear_Appeal"),              # Fear ties Vision
+    ("卫生", "1_Fear_Appeal"),              # One keyword, two strategies
+    ("美国卫生", "2_Scientific_Authority"), # '美国' and '卫生' for Science beat '美' and '卫生'
+    ("今日新闻", UNCLASSIFIED),
+    ("", UNCLASSIFIED),
+])
+def test_priority_rule(classifier, text, expected):
+    assert reference_strategy(text) == expected
+    assert classifier.classify([text])[0]["strategy"] == expected
+
+
+def test_matches_reference_on_random_headlines(classifier):
+    rng = random.Random(7)
+    alphabet = "苦病死危险卫生医科学美国博士白健成功今日新报"
+    texts = ["".join(rng.choices(alphabet, k=rng.randint(0, 12))) for _ in range(3000)]
+    results = classifier.classify(texts)
+    assert [r["strategy"] for r in results] == [reference_strategy(t) for t in texts]
+    for text, res in zip(texts, results):
+        for strategy, keywords in CODE_DICT.items():
+            present = tuple(kw for kw in keywords if kw in text)
+            assert res["matched"][strategy] == present
+            assert res["scores"][strategy] == len(present)
+
+
+def test_repeated_keyword_scores_once(classifier):
+    res = classifier.classify(["病病病医医"])[0]
+    assert dict(res["scores"]) == {"1_Fear_Appeal": 1, "2_Scientific_Authority": 1, "3_Vision_Desire": 0}
+    assert matched_terms(res) == "病/医"
+
+
+@pytest.mark.parametrize("value", [None, float("nan"), 12, b"\xe7\x97\x85"])
+def test_non_str_input_is_unclassified(classifier, value):
+    res = classifier.classify([value])[0]
+    assert res["strategy"] == UNCLASSIFIED
+    assert all(score == 0 for score in res["scores"].values())
+    assert matched_terms(res) == ""
+
+
+def test_results_are_read_only_and_shared(classifier):
+    first, second = classifier.classify(["病医", "病医"])
+    assert first is second  # Memoized: repeated headlines share one result
+    assert isinstance(first, MappingProxyType)
+    assert isinstance(first["scores"], MappingProxyType)
+    assert isinstance(first["matched"], MappingProxyType)
+    with pytest.raises(TypeError):
+        first["strategy"] = UNCLASSIFIED
+    with pytest.raises(TypeError):
+        first["scores"]["1_Fear_Appeal"] = 5
+    with pytest.raises(TypeError):
+        first["matched"]["1_Fear_Appeal"] = ("死",)
+    assert first["matched"]["1_Fear_Appeal"] == ("病",)
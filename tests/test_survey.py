@@ -0,0 +1,98 @@
+"""
+Module: Survey Tests
+Description: Likert conversion of 5_survey_cleaner.py against the original per-column
+             mapping, and worker-independent PLS-SEM bootstraps.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+import pls_sem
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+@pytest.fixture(scope="module")
+def cleaner():
+    spec = importlib.util.spec_from_file_location("stage_5_survey_cleaner", os.path.join(SRC_DIR, "5_survey_cleaner.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reference_column(cleaner, column):
+    """The original conversion: map labels of string answers, then pd.to_numeric."""
+    mapped = column.apply(lambda x: cleaner.LIKERT_MAP.get(str(x).strip(), x) if isinstance(x, str) else x)
+    return pd.to_numeric(mapped, errors="coerce")
+
+
+def test_likert_block_matches_per_column_mapping(cleaner):
+    df = pd.DataFrame({
+        "labels": ["完全符合", "一般 ", "比较不符合", "完全不同意"],
+        "digits": ["1", "5", "3", "2"],
+        "ints": [1, 2, 3, 4],
+        "whole_floats": [1.0, 2.0, 5.0, 4.0],  # Stays float64, as read_csv would give it
+        "with_nan": ["同意", None, "一般", "不同意"],
+        "float_nan": [1.0, np.nan, 3.0, 2.0],
+        "junk": ["同意", "不知道", "4", "5"],
+        "decimals": ["3.5", "4", "一般", "2"],
+    }, index=[10, 11, 13, 14])
+    likert = [(f"Anx_Test_{i}", col) for i, col in enumerate(df.columns, 1)]
+    block = cleaner.likert_block(df, likert)
+
+    expected = pd.DataFrame({var: reference_column(cleaner, df[col]) for var, col in likert})
+    pdt.assert_frame_equal(block, expected)
+    assert block.dtypes.astype(str).tolist() == ["int64", "int64", "int64", "float64",
+                                                 "float64", "float64", "float64", "float64"]
+
+
+def test_likert_block_keeps_float_columns_next_to_int_ones(cleaner):
+    # 1 and 1.0 are equal dict keys; the float column must not inherit the int score
+    df = pd.DataFrame({"a": [1, 2, 3], "b": [1.0, 2.0, 3.0]})
+    block = cleaner.likert_block(df, [("Anx_A_1", "a"), ("Anx_B_1", "b")])
+    assert block.dtypes.astype(str).tolist() == ["int64", "float64"]
+
+
+@pytest.fixture(scope="module")
+def survey():
+    data, model, _ = pls_sem.load_data()
+    return data, model
+
+
+def test_bootstrap_does_not_depend_on_worker_count(survey):
+    data, model = survey
+    serial = pls_sem.bootstrap(data, model, resamples=90, workers=1, batch_size=20, seed=7)
+    parallel = pls_sem.bootstrap(data, model, resamples=90, workers=2, batch_size=20, seed=7)
+    assert serial[0].shape == (90, len(model.paths))
+    assert serial[1].shape == (90, len(model.columns))
+    for a, b in zip(serial, parallel):
+        assert np.array_equal(a, b, equal_nan=True)
+    other = pls_sem.bootstrap(data, model, resamples=90, workers=1, batch_size=20, seed=8)
+    assert not np.array_equal(serial[0], other[0], equal_nan=True)
+
+
+def test_stacked_estimate_matches_single_samples(survey):
+    data, model = survey
+    rng = np.random.default_rng(0)
+    samples = np.stack([data] + [data[rng.integers(0, len(data), len(data))] for _ in range(4)])
+    stacked = pls_sem.estimate(samples, model)
+    for k in range(len(samples)):
+        single = pls_sem.estimate(samples[k:k + 1], model)
+        np.testing.assert_allclose(stacked[0][k], single[0][0], rtol=1e-6)
+        np.testing.assert_allclose(stacked[1][k], single[1][0], rtol=1e-6)
+
+
+def test_main_writes_the_same_table_for_any_worker_count(tmp_path):
+    tables = []
+    for workers in (1, 2):
+        output = tmp_path / f"pls_{workers}.csv"
+        result = pls_sem.main(resamples=60, workers=workers, batch_size=25, output_file=str(output))
+        assert result is not None and output.exists()
+        tables.append(pd.read_csv(output))
+    pdt.assert_frame_equal(tables[0], tables[1])
+    assert set(tables[0]["Type"]) == {"Path", "Loading", "R2"}